@@ -0,0 +1,599 @@
+"""
+Reproducible benchmarks of all endpoints
+
+Sends requests directly to the ASGI app, without any network or HTTP
+server in between. The queries are generated from the loaded Ontology
+with a fixed seed, so that every run uses the same queries.
+
+Run all benchmarks and store the results::
+
+    python -m pyhpoapi.benchmark --output results.json
+
+Compare a run to previous results. The command fails if the latency
+of an endpoint increased by more than the threshold::
+
+    python -m pyhpoapi.benchmark --compare results.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import math
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import urlencode
+
+import pyhpo
+from pyhpo import Ontology
+
+from pyhpoapi import config, synthetic
+
+logger = logging.getLogger("uvicorn.error")
+
+SIMILARITY_METHODS = (
+    'graphic', 'resnik', 'lin', 'jc', 'jc2', 'rel', 'ic', 'dist', 'equal'
+)
+
+# Number of other sets, genes or diseases in batch requests
+BATCH_SIZE = 100
+
+
+class Case(NamedTuple):
+    """
+    A single request
+    """
+    method: str
+    path: str
+    params: Dict[str, Any] = {}
+    body: Optional[Any] = None
+
+
+class Queries(NamedTuple):
+    """
+    Query data for all benchmarks, generated from the loaded Ontology
+    """
+    terms: List[str]
+    sets: List[str]
+    words: List[str]
+    genes: List[str]
+    omim: List[int]
+
+
+def build_queries(n: int = 50, seed: int = 42) -> Queries:
+    """
+    Generates random, but reproducible queries
+
+    Parameters
+    ----------
+    n: int, default ``50``
+        Number of queries of every kind
+    seed: int, default ``42``
+        Seed of the random number generator
+
+    Returns
+    -------
+    Queries
+    """
+    rng = random.Random(seed)
+    all_terms = sorted(Ontology, key=lambda term: term.index)
+    annotated = [
+        term for term in all_terms if term.genes or term.omim_diseases
+    ] or all_terms
+
+    terms = [rng.choice(annotated) for _ in range(n)]
+    sets = [
+        rng.sample(annotated, min(rng.randint(3, 8), len(annotated)))
+        for _ in range(n)
+    ]
+    words = []
+    for term in rng.choices(all_terms, k=n):
+        long_words = [x for x in term.name.split() if len(x) > 3]
+        words.append((long_words[0] if long_words else term.name).lower())
+
+    genes = sorted(gene.name for gene in Ontology.genes)
+    omim = sorted(disease.id for disease in Ontology.omim_diseases)
+    return Queries(
+        terms=[term.id for term in terms],
+        sets=[','.join(term.id for term in hposet) for hposet in sets],
+        words=words,
+        genes=rng.sample(genes, min(n, len(genes))),
+        omim=rng.sample(omim, min(n, len(omim)))
+    )
+
+
+def build_cases(
+    queries: Queries,
+    methods: Sequence[str] = SIMILARITY_METHODS
+) -> Dict[str, List[Case]]:
+    """
+    Builds the requests for every endpoint
+
+    Parameters
+    ----------
+    queries: Queries
+        See :func:`build_queries`
+    methods: list of str
+        Similarity methods to benchmark
+
+    Returns
+    -------
+    dict
+        The requests of every benchmark, by name
+    """
+    cases: Dict[str, List[Case]] = {}
+    sets = queries.sets
+    pairs = list(zip(sets, sets[1:] + sets[:1]))
+
+    for suffix in ('', '/parents', '/children', '/neighbours', '/genes',
+                   '/omim'):
+        cases[f'GET /term/{{term_id}}{suffix}'] = [
+            Case('GET', f'/term/{term}{suffix}') for term in queries.terms
+        ]
+
+    cases['GET /terms/search/{query}'] = [
+        Case('GET', f'/terms/search/{word}') for word in queries.words
+    ]
+    for path in ('/terms/intersect/genes', '/terms/intersect/omim',
+                 '/terms/union/genes', '/terms/union/omim',
+                 '/terms/hierarchy', '/terms/enrichment/genes',
+                 '/terms/enrichment/omim', '/terms/suggest'):
+        cases[f'GET {path}'] = [
+            Case('GET', path, {'set1': set1}) for set1 in sets
+        ]
+
+    for method in methods:
+        cases[f'GET /terms/similarity [{method}]'] = [
+            Case(
+                'GET',
+                '/terms/similarity',
+                {'set1': set1, 'set2': set2, 'method': method}
+            )
+            for set1, set2 in pairs
+        ]
+    for method in methods:
+        cases[f'GET /similarity/omim [{method}]'] = [
+            Case(
+                'GET',
+                '/similarity/omim',
+                {'set1': set1, 'omim': omim, 'method': method}
+            )
+            for set1, omim in zip(sets, _cycle(queries.omim, len(sets)))
+        ]
+    for method in methods:
+        cases[f'GET /similarity/gene [{method}]'] = [
+            Case(
+                'GET',
+                '/similarity/gene',
+                {'set1': set1, 'gene': gene, 'method': method}
+            )
+            for set1, gene in zip(sets, _cycle(queries.genes, len(sets)))
+        ]
+
+    cases['POST /terms/similarity'] = [
+        Case('POST', '/terms/similarity', body={
+            'set1': set1,
+            'other_sets': [
+                {'name': str(idx), 'set2': set2}
+                for idx, set2 in enumerate(_cycle(sets, BATCH_SIZE))
+            ]
+        })
+        for set1 in sets
+    ]
+    cases['POST /similarity/omim'] = [
+        Case('POST', '/similarity/omim', body={
+            'set1': set1,
+            'omim_diseases': queries.omim[:BATCH_SIZE]
+        })
+        for set1 in sets
+    ]
+    cases['POST /similarity/gene'] = [
+        Case('POST', '/similarity/gene', body={
+            'set1': set1,
+            'genes': queries.genes[:BATCH_SIZE]
+        })
+        for set1 in sets
+    ]
+    for path in ('/similarity/omim/all', '/similarity/gene/all'):
+        cases[f'GET {path}'] = [
+            Case('GET', path, {'set1': set1, 'limit': 10, 'sort': 'desc'})
+            for set1 in sets
+        ]
+    return {name: requests for name, requests in cases.items() if requests}
+
+
+def select_cases(
+    cases: Dict[str, List[Case]],
+    patterns: Sequence[str]
+) -> Dict[str, List[Case]]:
+    """
+    Returns all benchmarks whose name contains any of the patterns
+    """
+    if not patterns:
+        return cases
+    return {
+        name: requests
+        for name, requests in cases.items()
+        if any(pattern in name for pattern in patterns)
+    }
+
+
+def _cycle(items: Sequence, n: int) -> List:
+    if not items:
+        return []
+    return [items[idx % len(items)] for idx in range(n)]
+
+
+async def call(app, case: Case) -> int:
+    """
+    Sends a request directly to the ASGI app
+
+    Returns
+    -------
+    int
+        The HTTP status of the response
+    """
+    body = b'' if case.body is None else json.dumps(case.body).encode()
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': case.method,
+        'scheme': 'http',
+        'path': case.path,
+        'raw_path': case.path.encode(),
+        'root_path': '',
+        'query_string': urlencode(case.params).encode(),
+        'headers': [
+            (b'host', b'benchmark'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('benchmark', 80),
+    }
+    request_sent = False
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # The client never disconnects
+        await asyncio.Event().wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+def clear_caches() -> None:
+    """
+    Removes all cached results, so that every request is calculated
+    """
+    from pyhpoapi import compression, helpers, enrichment, fragments
+    from pyhpoapi.routers import terms
+
+    helpers.term_set_cache.clear()
+    helpers.similarity_cache.clear()
+    enrichment.enrichment_cache.clear()
+    fragments.fragment_cache.clear()
+    compression.response_cache.clear()
+    if terms.search_index is not None:
+        terms.search_index._cache.clear()
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    The ``q``-th percentile of the sorted ``values`` (nearest rank)
+    """
+    if not values:
+        return 0.0
+    idx = max(0, math.ceil(q / 100 * len(values)) - 1)
+    return values[idx]
+
+
+def summarize(
+    latencies: List[float],
+    errors: int,
+    elapsed: float
+) -> Dict[str, float]:
+    """
+    Throughput and latency percentiles of a benchmark
+
+    Parameters
+    ----------
+    latencies: list of float
+        The duration of every request in seconds
+    errors: int
+        Number of failed requests
+    elapsed: float
+        Total duration of the benchmark in seconds
+
+    Returns
+    -------
+    dict
+        All latencies in milliseconds, throughput in requests per second
+    """
+    latencies = sorted(latencies)
+    n = len(latencies)
+    return {
+        'requests': n,
+        'errors': errors,
+        'throughput': n / elapsed if elapsed > 0 else 0.0,
+        'mean': 1000 * sum(latencies) / n if n else 0.0,
+        'p50': 1000 * percentile(latencies, 50),
+        'p95': 1000 * percentile(latencies, 95),
+        'p99': 1000 * percentile(latencies, 99),
+    }
+
+
+async def run_case(
+    app,
+    requests: List[Case],
+    iterations: int,
+    warmup: int = 3,
+    concurrency: int = 1,
+    warm_cache: bool = False
+) -> Dict[str, float]:
+    """
+    Benchmarks a single endpoint
+
+    Parameters
+    ----------
+    app: ASGI application
+    requests: list of Case
+        The requests are sent in turn
+    iterations: int
+        Number of measured requests
+    warmup: int, default ``3``
+        Number of requests before the measurement starts
+    concurrency: int, default ``1``
+        Number of requests that are sent at the same time
+    warm_cache: bool, default ``False``
+        Keep cached results between requests
+
+    Returns
+    -------
+    dict
+        See :func:`summarize`
+    """
+    for idx in range(warmup):
+        await call(app, requests[idx % len(requests)])
+
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(range(iterations))
+
+    async def worker() -> None:
+        nonlocal errors
+        for idx in queue:
+            if not warm_cache:
+                clear_caches()
+            start = time.perf_counter()
+            status = await call(app, requests[idx % len(requests)])
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(max(concurrency, 1))])
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run(
+    app,
+    cases: Dict[str, List[Case]],
+    iterations: int = 50,
+    warmup: int = 3,
+    concurrency: int = 1,
+    warm_cache: bool = False
+) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks all endpoints, one after the other
+
+    See :func:`run_case` for the parameters
+
+    Returns
+    -------
+    dict
+        The results of every benchmark, by name
+    """
+    results = {}
+    for name, requests in cases.items():
+        results[name] = await run_case(
+            app,
+            requests,
+            iterations,
+            warmup=warmup,
+            concurrency=concurrency,
+            warm_cache=warm_cache
+        )
+        logger.info(f'{name}: {results[name]["p50"]:.2f} ms')
+    return results
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float,
+    metric: str = 'p50'
+) -> List[str]:
+    """
+    Finds all benchmarks that got slower than the baseline
+
+    Parameters
+    ----------
+    baseline: dict
+        Previous results, as written by :func:`main`
+    current: dict
+        The current results
+    threshold: float
+        Maximum relative increase of the latency, e.g. ``0.2`` for 20%
+    metric: str, default ``p50``
+        The compared latency metric
+
+    Returns
+    -------
+    list of str
+        A description of every regression
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base or base[metric] <= 0:
+            continue
+        change = result[metric] / base[metric] - 1
+        if change > threshold:
+            regressions.append(
+                f'{name}: {metric} {base[metric]:.2f} ms -> '
+                f'{result[metric]:.2f} ms (+{change:.0%})'
+            )
+    return regressions
+
+
+def format_results(
+    results: Dict[str, Dict[str, float]],
+    title: str = 'Benchmark'
+) -> str:
+    width = max([len(name) for name in results] + [len(title)])
+    lines = ['{:<{w}} {:>8} {:>6} {:>9} {:>9} {:>9} {:>9}'.format(
+        title, 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms',
+        'p99 ms', w=width
+    )]
+    for name, res in results.items():
+        lines.append(
+            '{:<{w}} {:>8} {:>6} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+                name, res['requests'], res['errors'], res['throughput'],
+                res['p50'], res['p95'], res['p99'], w=width
+            )
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    # Imported here, because the server imports most other modules
+    from pyhpoapi import server
+    from pyhpoapi.executor import compute, ranking
+
+    parser = argparse.ArgumentParser(
+        prog='python -m pyhpoapi.benchmark',
+        description='Benchmarks all PyHPO-API endpoints'
+    )
+    parser.add_argument('--output', help='Save the results as JSON')
+    parser.add_argument('--compare', help='Compare to previous results')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument(
+        '--metric',
+        default='p50',
+        choices=('mean', 'p50', 'p95', 'p99')
+    )
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--methods',
+        nargs='+',
+        default=list(SIMILARITY_METHODS)
+    )
+    parser.add_argument(
+        '--only',
+        nargs='+',
+        default=[],
+        help='Only run benchmarks that contain any of these strings'
+    )
+    parser.add_argument(
+        '--synthetic',
+        type=float,
+        metavar='SCALE',
+        help=(
+            'Use a synthetic Ontology, SCALE times the size of the HPO, '
+            'instead of the master data'
+        )
+    )
+    parser.add_argument(
+        '--warm-cache',
+        action='store_true',
+        help='Keep cached results between requests'
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    data = config.MASTER_DATA or 'builtin'
+    if args.synthetic:
+        folder = tempfile.mkdtemp(prefix='pyhpoapi-synthetic-')
+        synthetic.generate(folder, seed=args.seed, scale=args.synthetic)
+        config.MASTER_DATA = folder
+        config.SNAPSHOT = ''
+        data = f'synthetic x{args.synthetic}'
+    try:
+        server.initialize_ontology()
+    finally:
+        if args.synthetic:
+            shutil.rmtree(folder)
+    app = server.main()
+    cases = select_cases(
+        build_cases(build_queries(args.queries, args.seed), args.methods),
+        args.only
+    )
+    try:
+        results = asyncio.run(run(
+            app,
+            cases,
+            iterations=args.iterations,
+            warmup=args.warmup,
+            concurrency=args.concurrency,
+            warm_cache=args.warm_cache
+        ))
+    finally:
+        compute.shutdown()
+        ranking.shutdown()
+
+    current = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'pyhpoapi': config.VERSION,
+            'pyhpo': pyhpo.__version__,
+            'python': platform.python_version(),
+            'data': data,
+            'executor': config.EXECUTOR,
+            'iterations': args.iterations,
+            'concurrency': args.concurrency,
+            'queries': args.queries,
+            'seed': args.seed,
+            'warm_cache': args.warm_cache,
+        },
+        'results': results
+    }
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(current, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(baseline, current, args.threshold, args.metric)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,216 @@
+"""
+Binary response formats for bulk endpoints
+
+Batch similarity, ``/all`` similarity and enrichment responses can be
+sent as MessagePack or as an Arrow IPC stream instead of JSON. Clients
+select the format via the ``Accept`` header of the request:
+
+* ``application/msgpack`` - Same structure as the JSON response.
+  Requires the optional ``msgpack`` package
+* ``application/vnd.apache.arrow.stream`` - A single table with one
+  row per result and ``float64`` score columns. Requires the optional
+  ``pyarrow`` package
+
+All other requests receive JSON, as before. If a client only accepts a
+binary format that is not installed on the server, the request fails
+with HTTP 406.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from pyhpoapi.responses import json_response
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+ARROW = 'arrow'
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Response format of every accepted media type
+MEDIA_TYPES = {
+    'application/json': JSON,
+    'application/*': JSON,
+    '*/*': JSON,
+    MSGPACK_MEDIA_TYPE: MSGPACK,
+    'application/x-msgpack': MSGPACK,
+    ARROW_MEDIA_TYPE: ARROW,
+}
+
+CONTENT_TYPES = {
+    MSGPACK: MSGPACK_MEDIA_TYPE,
+    ARROW: ARROW_MEDIA_TYPE,
+}
+
+# Additional content types in the OpenAPI schema of the routes
+BINARY_RESPONSES: Dict[Union[int, str], Dict[str, Any]] = {
+    200: {
+        'content': {
+            MSGPACK_MEDIA_TYPE: {},
+            ARROW_MEDIA_TYPE: {}
+        }
+    }
+}
+
+
+def is_available(output_format: str) -> bool:
+    """
+    Indicates if the server can send responses in ``output_format``
+    """
+    if output_format == MSGPACK:
+        return HAS_MSGPACK
+    if output_format == ARROW:
+        return HAS_PYARROW
+    return True
+
+
+def _parse_accept(accept: str) -> List[Tuple[float, int, str]]:
+    """
+    All media types of the ``Accept`` header, by descending quality
+    """
+    media_types = []
+    for idx, part in enumerate(accept.split(',')):
+        media_type, *params = [x.strip() for x in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            media_types.append((-quality, idx, media_type.lower()))
+    return sorted(media_types)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    The response format for the ``Accept`` header of a request
+
+    Parameters
+    ----------
+    accept: str, optional
+        The ``Accept`` header
+
+    Returns
+    -------
+    str
+        ``json``, ``msgpack`` or ``arrow``. Defaults to ``json`` if
+        the header does not contain any supported media type
+
+    Raises
+    ------
+    HTTPException
+        406, if only binary formats are accepted that require a
+        package that is not installed
+    """
+    if not accept:
+        return JSON
+    unavailable = []
+    for _, _, media_type in _parse_accept(accept):
+        output_format = MEDIA_TYPES.get(media_type)
+        if output_format is None:
+            continue
+        if is_available(output_format):
+            return output_format
+        unavailable.append(media_type)
+    if unavailable:
+        raise HTTPException(
+            status_code=406,
+            detail=f"`{unavailable[0]}` responses are not supported"
+        )
+    return JSON
+
+
+def _to_builtin(obj: Any) -> Any:
+    # numpy scalars, e.g. the counts of the enrichment models
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f'Can not serialize {type(obj).__name__}')
+
+
+def msgpack_body(content: Any) -> bytes:
+    """
+    Encodes ``content`` as MessagePack
+
+    Floats are always encoded as ``float64``
+    """
+    return msgpack.packb(content, use_bin_type=True, default=_to_builtin)
+
+
+def arrow_body(
+    columns: Dict[str, Iterable[Any]],
+    floats: Iterable[str] = (),
+    metadata: Optional[Dict[str, Any]] = None
+) -> bytes:
+    """
+    Encodes a table as Arrow IPC stream
+
+    Parameters
+    ----------
+    columns: dict
+        The values of every column, by name
+    floats: list of str
+        Names of the columns that are stored as ``float64``. The types
+        of all other columns are inferred from the values
+    metadata: dict, optional
+        Added as JSON to the schema metadata, e.g. the query set
+
+    Returns
+    -------
+    bytes
+    """
+    float_columns = set(floats)
+    table = pyarrow.table({
+        name: pyarrow.array(
+            list(values),
+            type=pyarrow.float64() if name in float_columns else None
+        )
+        for name, values in columns.items()
+    })
+    if metadata:
+        table = table.replace_schema_metadata({
+            key: json.dumps(value) for key, value in metadata.items()
+        })
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def respond(output_format: str, content: Any) -> Any:
+    """
+    The response of a route in the negotiated format
+
+    Parameters
+    ----------
+    output_format: str
+        The result of :func:`negotiate`
+    content: dict, list or bytes
+        The JSON content (see :func:`responses.json_response`) or the
+        already encoded binary response
+
+    Returns
+    -------
+    Response
+    """
+    if output_format == JSON:
+        return json_response(content)
+    return Response(content, media_type=CONTENT_TYPES[output_format])
@@ -0,0 +1,126 @@
+"""
+Bitset-backed indicies of HPOTerm annotations
+
+Every gene or disease gets a dense integer id, and every HPOTerm gets
+a bitset (a Python ``int``) of all its annotated genes or diseases.
+Unions and intersections of the annotations of several terms are then
+bitwise OR and AND operations.
+"""
+from typing import Callable, Dict, Iterable, List
+
+from pyhpo import Ontology
+
+
+class AnnotationIndex:
+    """
+    Maps every HPOTerm to a bitset of its genes or diseases
+
+    Parameters
+    ----------
+    terms: iterable of HPOTerm
+        All terms to index
+    attribute: callable
+        Returns the annotation items of a term, e.g. ``term.genes``
+    """
+    def __init__(self, terms: Iterable, attribute: Callable) -> None:
+        terms = list(terms)
+        items = set()
+        for term in terms:
+            items.update(attribute(term))
+        self._items: List = sorted(items, key=lambda x: x.id)
+        positions = {item: idx for idx, item in enumerate(self._items)}
+
+        self._bits: Dict[int, int] = {}
+        self._counts: Dict[int, int] = {}
+        for term in terms:
+            bits = 0
+            for item in attribute(term):
+                bits |= 1 << positions[item]
+            self._bits[int(term)] = bits
+            self._counts[int(term)] = len(attribute(term))
+
+    def union(self, hposet: Iterable) -> List:
+        """
+        All items that are annotated to any of the terms
+
+        Parameters
+        ----------
+        hposet: HPOSet or list of HPOTerm
+
+        Returns
+        -------
+        list
+            Genes or diseases, sorted by their id
+        """
+        bits = 0
+        for term in hposet:
+            bits |= self._bits.get(int(term), 0)
+        return self._lookup(bits)
+
+    def intersection(self, hposet: Iterable) -> List:
+        """
+        All items that are annotated to every one of the terms
+
+        Terms are processed in order of increasing number of annotations,
+        so that the result shrinks as fast as possible.
+
+        Parameters
+        ----------
+        hposet: HPOSet or list of HPOTerm
+
+        Returns
+        -------
+        list
+            Genes or diseases, sorted by their id
+        """
+        ids = sorted(
+            (int(term) for term in hposet),
+            key=lambda x: self._counts.get(x, 0)
+        )
+        if not ids:
+            return []
+        bits = self._bits.get(ids[0], 0)
+        for term_id in ids[1:]:
+            if not bits:
+                break
+            bits &= self._bits.get(term_id, 0)
+        return self._lookup(bits)
+
+    def _lookup(self, bits: int) -> List:
+        return [self._items[idx] for idx in bit_positions(bits)]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @classmethod
+    def genes(cls) -> 'AnnotationIndex':
+        """
+        Builds the index of all gene annotations
+        """
+        return cls(Ontology, lambda term: term.genes)
+
+    @classmethod
+    def omim(cls) -> 'AnnotationIndex':
+        """
+        Builds the index of all OMIM disease annotations
+        """
+        return cls(Ontology, lambda term: term.omim_diseases)
+
+
+def bit_positions(bits: int) -> List[int]:
+    """
+    Indicies of all set bits, in ascending order
+    """
+    binary = bin(bits)
+    if binary.count('1') > len(binary) // 64:
+        return [
+            idx for idx, bit in enumerate(reversed(binary[2:])) if bit == '1'
+        ]
+
+    # Sparse bitsets: Only visit the set bits
+    positions = []
+    while bits:
+        lowest = bits & -bits
+        positions.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return positions
@@ -0,0 +1,214 @@
+"""
+In-memory caches for expensive, repeated calculations
+
+All caches share the same interface (``get``, ``set``, ``clear``),
+so that any object that provides these methods can be plugged in
+instead, e.g. to share a cache between several workers.
+
+Worker processes are forked from a running, multi-threaded server.
+Another thread might hold the lock of a cache at that moment, which
+would never be released in the forked process. All caches are
+therefore emptied and get a new lock in every forked process.
+"""
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+CACHE_KINDS = ('lru', 'none')
+
+
+class LRUCache:
+    """
+    A thread-safe, bounded least-recently-used cache
+
+    Parameters
+    ----------
+    maxsize: int
+        Maximum number of entries. ``0`` disables the cache.
+    ttl: float, default ``None``
+        Time in seconds after which an entry expires.
+        ``None`` keeps entries until they are evicted.
+    max_bytes: int, default ``None``
+        Approximate maximum memory usage of all cached keys and values.
+        ``None`` only limits the number of entries.
+
+    Attributes
+    ----------
+    hits: int
+        Number of lookups that returned a cached value
+    misses: int
+        Number of lookups that did not find a cached value
+    """
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value or ``None``
+        """
+        with self._lock:
+            try:
+                value, expires, _ = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires is not None and expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Adds a value to the cache and evicts the least recently used
+        entries if the cache is full
+        """
+        if self.maxsize <= 0:
+            return
+        size = _sizeof(key) + _sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if self.ttl is None:
+            expires = None
+        else:
+            expires = time.monotonic() + self.ttl
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires, size)
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._data)))
+
+    def clear(self) -> None:
+        """
+        Removes all entries and resets the counters
+        """
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _reset_after_fork(self) -> None:
+        # The forked process has only one thread, no lock is required.
+        # Cached values might hold locks of their own, so they are dropped
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.nbytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self.nbytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getstate__(self) -> dict:
+        # Cached values are not pickled, only the configuration
+        return {
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'max_bytes': self.max_bytes
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)  # type: ignore[misc]
+
+
+_caches: 'weakref.WeakSet[LRUCache]' = weakref.WeakSet()
+
+
+def _reset_after_fork() -> None:
+    for cache in list(_caches):
+        cache._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class NullCache:
+    """
+    A cache that never caches anything
+    """
+    hits = 0
+    misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+
+def make_cache(
+    kind: str,
+    maxsize: int,
+    ttl: Optional[float] = None,
+    max_bytes: Optional[int] = None
+):
+    """
+    Creates a cache
+
+    Parameters
+    ----------
+    kind: str
+        The type of the cache
+
+        * **lru** - :class:`LRUCache`
+        * **none** - :class:`NullCache`
+
+    maxsize, ttl, max_bytes:
+        See :class:`LRUCache`
+
+    Returns
+    -------
+    LRUCache or NullCache
+    """
+    if kind == 'lru':
+        return LRUCache(maxsize, ttl=ttl, max_bytes=max_bytes)
+    if kind == 'none':
+        return NullCache()
+    raise ValueError(f'Invalid cache kind {kind}')
+
+
+def _sizeof(obj: Any) -> int:
+    """
+    Approximate memory usage of an object, including the items
+    of tuples, lists and dicts
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(_sizeof(x) for x in obj)
+    elif isinstance(obj, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    return size
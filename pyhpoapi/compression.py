@@ -0,0 +1,308 @@
+"""
+Compressed responses
+
+Similarity results of all genes or diseases and the HPO hierarchy are
+large, but highly compressible. The :class:`CompressionMiddleware`
+compresses all responses above a minimum size with ``brotli`` (if the
+optional ``brotli`` package is installed) or ``gzip``, depending on the
+``Accept-Encoding`` header of the request. Streaming responses are
+compressed chunk by chunk, so that every chunk is still sent right away.
+
+Some responses only depend on the Ontology and the request, e.g. the
+details and neighbours of a term or the hierarchy. Their final,
+compressed bytes are cached in :data:`response_cache`, so that repeated
+requests skip the handler and the compression entirely. The cache is
+cleared whenever the Ontology is (re-)loaded.
+"""
+import gzip
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pyhpoapi import binary, config
+from pyhpoapi.cache import LRUCache
+from pyhpoapi.metrics import route_template
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+ENABLED = config.COMPRESSION
+
+IDENTITY = 'identity'
+
+# Responses of these routes are cached
+CACHED_ROUTES = (
+    '/term/{term_id}',
+    '/term/{term_id}/neighbours',
+    '/terms/hierarchy',
+)
+
+# Only these content types are compressed, e.g. not the logo
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/msgpack',
+    'application/vnd.apache.arrow.stream',
+    'text/',
+)
+
+response_cache = LRUCache(
+    config.RESPONSE_CACHE_SIZE,
+    max_bytes=int(config.RESPONSE_CACHE_MB * 1024 * 1024)
+)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class CachedResponse(NamedTuple):
+    route: str
+    status: int
+    headers: Headers
+    body: bytes
+
+
+def encodings() -> Tuple[str, ...]:
+    """
+    All supported content encodings, by preference
+    """
+    return ('br', 'gzip') if HAS_BROTLI else ('gzip',)
+
+
+def select_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    The content encoding for the ``Accept-Encoding`` header of a request
+
+    Returns
+    -------
+    str
+        ``br``, ``gzip`` or ``identity``
+    """
+    if not accept_encoding:
+        return IDENTITY
+    accepted = {
+        coding for _, _, coding in binary._parse_accept(accept_encoding)
+    }
+    for encoding in encodings():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return IDENTITY
+
+
+def compress(
+    body: bytes,
+    encoding: str,
+    gzip_level: int = config.GZIP_LEVEL,
+    brotli_quality: int = config.BROTLI_QUALITY
+) -> bytes:
+    """
+    Compresses a complete response body
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    # A fixed mtime, so that equal bodies are compressed to equal bytes
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class _StreamCompressor:
+    """
+    Compresses a streaming response body chunk by chunk
+    """
+    def __init__(
+        self,
+        encoding: str,
+        gzip_level: int,
+        brotli_quality: int
+    ) -> None:
+        self._brotli = encoding == 'br'
+        if self._brotli:
+            self._compressor: Any = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(
+                gzip_level,
+                zlib.DEFLATED,
+                16 + zlib.MAX_WBITS
+            )
+
+    def compress(self, chunk: bytes) -> bytes:
+        """
+        Compresses and flushes a chunk, so that the client can
+        decompress it right away
+        """
+        if self._brotli:
+            return (
+                self._compressor.process(chunk) + self._compressor.flush()
+            )
+        return (
+            self._compressor.compress(chunk) +
+            self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.finish() if self._brotli else (
+            self._compressor.flush()
+        )
+
+
+def _header(headers: Headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if _header(headers, b'content-encoding') is not None:
+        return False
+    content_type = _header(headers, b'content-type')
+    if content_type is None:
+        return False
+    media_type = content_type.decode('latin-1').split(';')[0].strip()
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _compressed_headers(
+    headers: Headers,
+    encoding: str,
+    length: Optional[int]
+) -> Headers:
+    res = [
+        (key, value) for key, value in headers
+        if key.lower() not in (b'content-length', b'vary')
+    ]
+    vary = _header(headers, b'vary')
+    res.append((
+        b'vary',
+        vary + b', Accept-Encoding' if vary else b'Accept-Encoding'
+    ))
+    res.append((b'content-encoding', encoding.encode('latin-1')))
+    if length is not None:
+        res.append((b'content-length', str(length).encode('latin-1')))
+    return res
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses responses and caches the responses
+    of :data:`CACHED_ROUTES`
+
+    Parameters
+    ----------
+    app: ASGI application
+    minimum_size: int
+        Smaller responses are not compressed
+    gzip_level: int
+        Compression level of ``gzip``, from 1 (fastest) to 9
+    brotli_quality: int
+        Compression quality of ``brotli``, from 0 (fastest) to 11
+    cache: LRUCache
+        Cache of the final responses, by path, query and encoding
+    """
+    def __init__(
+        self,
+        app,
+        minimum_size: int = config.COMPRESSION_MIN_SIZE,
+        gzip_level: int = config.GZIP_LEVEL,
+        brotli_quality: int = config.BROTLI_QUALITY,
+        cache: Any = response_cache
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = _header(scope['headers'], b'accept-encoding')
+        encoding = select_encoding(
+            accept_encoding.decode('latin-1') if accept_encoding else None
+        )
+
+        key = None
+        if scope['method'] == 'GET':
+            key = (scope['path'], scope['query_string'], encoding)
+            cached = self.cache.get(key)
+            if cached is not None:
+                # Reported as the route of the request, e.g. in the metrics
+                scope['pyhpoapi.route'] = cached.route
+                await send({
+                    'type': 'http.response.start',
+                    'status': cached.status,
+                    'headers': cached.headers
+                })
+                await send({
+                    'type': 'http.response.body',
+                    'body': cached.body
+                })
+                return
+
+        start: Dict[str, Any] = {}
+        stream: Optional[_StreamCompressor] = None
+
+        async def compressing_send(message) -> None:
+            nonlocal stream
+            if message['type'] == 'http.response.start':
+                start.update(message)
+                return
+            if stream is not None:
+                body = stream.compress(message.get('body', b''))
+                if not message.get('more_body', False):
+                    body += stream.finish()
+                await send({**message, 'body': body})
+                return
+            if message['type'] != 'http.response.body' or not start:
+                await send(message)
+                return
+
+            headers = list(start['headers'])
+            body = message.get('body', b'')
+            compressible = (
+                encoding != IDENTITY and _is_compressible(headers)
+            )
+
+            if message.get('more_body', False):
+                # Streaming response of unknown size
+                if compressible:
+                    stream = _StreamCompressor(
+                        encoding,
+                        self.gzip_level,
+                        self.brotli_quality
+                    )
+                    start['headers'] = _compressed_headers(
+                        headers, encoding, None
+                    )
+                    message = {**message, 'body': stream.compress(body)}
+                await send(start)
+                start.clear()
+                await send(message)
+                return
+
+            if compressible and len(body) >= self.minimum_size:
+                body = compress(
+                    body,
+                    encoding,
+                    self.gzip_level,
+                    self.brotli_quality
+                )
+                headers = _compressed_headers(headers, encoding, len(body))
+                start['headers'] = headers
+
+            route = route_template(scope)
+            if key is not None and start['status'] == 200 and (
+                route in CACHED_ROUTES
+            ):
+                self.cache.set(
+                    key,
+                    CachedResponse(route, start['status'], headers, body)
+                )
+
+            await send(start)
+            start.clear()
+            await send({**message, 'body': body})
+
+        await self.app(scope, receive, compressing_send)
@@ -30,6 +30,113 @@ CORS_HEADERS = config_item_list(
     os.environ.get("PYHPOAPI_CORS_HEADERS", "")
 )
 
+# Path of the Ontology snapshot file. An empty value disables snapshots
+SNAPSHOT = os.environ.get("PYHPOAPI_SNAPSHOT", "")
+
+# Load the Ontology in the background after the server started
+STAGED_STARTUP = os.environ.get("PYHPOAPI_STAGED_STARTUP", "1") != "0"
+
+# Maximum number of seconds a request waits for a startup stage,
+# e.g. for the enrichment models, before it fails with HTTP 503
+STAGE_TIMEOUT = float(os.environ.get("PYHPOAPI_STAGE_TIMEOUT", 30))
+
+# Record Prometheus metrics and serve them at ``/metrics``.
+# Requires the ``prometheus_client`` package
+METRICS = os.environ.get("PYHPOAPI_METRICS", "1") != "0"
+
+# Add a ``Server-Timing`` header with the duration of
+# parsing, computing, JSON building and validation to all responses
+SERVER_TIMING = os.environ.get("PYHPOAPI_SERVER_TIMING", "1") != "0"
+
+# Send large responses of batch endpoints without validating them
+# against their response model. Uses ``orjson``, if installed
+FAST_JSON = os.environ.get("PYHPOAPI_FAST_JSON", "0") != "0"
+
+# Number of pre-encoded HPOTerms, genes and diseases for
+# fast JSON responses. ``0`` disables the cache
+FRAGMENT_CACHE_SIZE = int(
+    os.environ.get("PYHPOAPI_FRAGMENT_CACHE_SIZE", 100000)
+)
+
+# Compress responses with ``brotli`` (if installed) or ``gzip``
+COMPRESSION = os.environ.get("PYHPOAPI_COMPRESSION", "1") != "0"
+
+# Responses smaller than this number of bytes are not compressed
+COMPRESSION_MIN_SIZE = int(
+    os.environ.get("PYHPOAPI_COMPRESSION_MIN_SIZE", 1024)
+)
+
+# Compression level of ``gzip``, from 1 (fastest) to 9 (smallest)
+GZIP_LEVEL = int(os.environ.get("PYHPOAPI_GZIP_LEVEL", 6))
+
+# Compression quality of ``brotli``, from 0 (fastest) to 11 (smallest)
+BROTLI_QUALITY = int(os.environ.get("PYHPOAPI_BROTLI_QUALITY", 4))
+
+# Number of cached responses of term details, neighbours and the
+# hierarchy. ``0`` disables the cache
+RESPONSE_CACHE_SIZE = int(
+    os.environ.get("PYHPOAPI_RESPONSE_CACHE_SIZE", 4096)
+)
+
+# Approximate maximum memory usage of the response cache in MB
+RESPONSE_CACHE_MB = float(
+    os.environ.get("PYHPOAPI_RESPONSE_CACHE_MB", 64)
+)
+
+# Profile requests that have an ``X-Profile`` header
+PROFILING = os.environ.get("PYHPOAPI_PROFILING", "0") != "0"
+
+# Directory for the request profiles. If empty, the profile
+# is returned instead of the actual response
+PROFILE_DIR = os.environ.get("PYHPOAPI_PROFILE_DIR", "")
+
+# Executor for CPU-heavy request handlers.
+# Options are ``thread``, ``process`` or ``inline``
+EXECUTOR = os.environ.get("PYHPOAPI_EXECUTOR", "thread")
+
+# Maximum number of parallel workers per endpoint class
+EXECUTOR_LIMITS = {
+    'lookup': int(os.environ.get("PYHPOAPI_WORKERS_LOOKUP", 4)),
+    'similarity': int(os.environ.get("PYHPOAPI_WORKERS_SIMILARITY", 4)),
+    'batch': int(os.environ.get("PYHPOAPI_WORKERS_BATCH", 2)),
+    'enrichment': int(os.environ.get("PYHPOAPI_WORKERS_ENRICHMENT", 2)),
+}
+
+# Number of worker processes to score all genes or diseases in parallel
+# ``0`` disables sharded scoring
+RANKING_PROCESSES = int(os.environ.get("PYHPOAPI_RANKING_PROCESSES", 0))
+
+# Number of parsed HPOSet queries to cache. ``0`` disables the cache
+TERM_SET_CACHE_SIZE = int(os.environ.get("PYHPOAPI_TERM_SET_CACHE_SIZE", 1024))
+
+# Cache for similarity scores between two HPOSets
+# Options are ``lru`` or ``none``
+SIMILARITY_CACHE = os.environ.get("PYHPOAPI_SIMILARITY_CACHE", "lru")
+
+SIMILARITY_CACHE_SIZE = int(
+    os.environ.get("PYHPOAPI_SIMILARITY_CACHE_SIZE", 200000)
+)
+
+# Time in seconds until a cached score expires. ``0`` means no expiry
+SIMILARITY_CACHE_TTL = float(
+    os.environ.get("PYHPOAPI_SIMILARITY_CACHE_TTL", 0)
+)
+
+# Approximate maximum memory usage in MB
+SIMILARITY_CACHE_MB = float(
+    os.environ.get("PYHPOAPI_SIMILARITY_CACHE_MB", 256)
+)
+
+# Implementation of the enrichment models
+# Options are ``vector`` (numpy/scipy) or ``pyhpo``
+ENRICHMENT = os.environ.get("PYHPOAPI_ENRICHMENT", "vector")
+
+# Number of HPOSet queries whose enrichment scores are cached,
+# per gene or disease model. ``0`` disables the cache
+ENRICHMENT_CACHE_SIZE = int(
+    os.environ.get("PYHPOAPI_ENRICHMENT_CACHE_SIZE", 64)
+)
+
 OPENAPI_TAGS = [
     {
         'name': 'term',
@@ -67,6 +174,10 @@ OPENAPI_TAGS = [
             'with genes or diseases and calculate similarity scores'
         ),
     },
+    {
+        'name': 'health',
+        'description': 'Liveness and readiness of the server',
+    },
     {
         'name': 'enrichment',
         'description': (
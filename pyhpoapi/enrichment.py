@@ -0,0 +1,312 @@
+"""
+Vectorized, cached and partially sorted enrichment results
+
+:class:`pyhpo.stats.EnrichmentModel` and :class:`pyhpo.stats.HPOEnrichment`
+run the hypergeometric test for one gene, disease or HPOTerm at a time.
+:class:`VectorEnrichmentModel` and :class:`VectorHPOEnrichment` are
+drop-in replacements that count the annotations of a query with a sparse
+matrix and test all items with a single call to scipy.
+
+Even then, every item is scored and sorted, although clients usually
+only request the first page of results. :func:`ranked_enrichment` keeps
+the unsorted scores of recent queries in a cache and only sorts as many
+results as are needed for the requested page.
+"""
+import heapq
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.stats import hypergeom
+
+from pyhpo import HPOSet, Ontology
+
+from pyhpoapi import config
+from pyhpoapi.cache import LRUCache
+
+# Maps an enrichment model, the method and the HPOTerm ids of
+# an HPOSet to the :class:`EnrichmentRanking` of the results
+enrichment_cache = LRUCache(config.ENRICHMENT_CACHE_SIZE)
+
+
+def _score(res: dict) -> float:
+    return res['enrichment']
+
+
+class EnrichmentRanking:
+    """
+    The enrichment scores of all items, sorted on demand
+
+    Parameters
+    ----------
+    results: list of dict
+        The unsorted enrichment results with the keys
+        ``item``, ``count`` and ``enrichment``
+    """
+    def __init__(self, results: List[dict]) -> None:
+        self._results = results
+        self._sorted: List[dict] = []
+        self._lock = threading.Lock()
+
+    def top(self, n: int) -> List[dict]:
+        """
+        The ``n`` best results, sorted by ascending enrichment score
+
+        Results with the same score keep their original order, identical
+        to :func:`pyhpo.stats.EnrichmentModel.enrichment`.
+        """
+        with self._lock:
+            if len(self._sorted) < min(n, len(self._results)):
+                if n * 4 < len(self._results):
+                    self._sorted = heapq.nsmallest(
+                        n, self._results, key=_score
+                    )
+                else:
+                    self._sorted = sorted(self._results, key=_score)
+            return self._sorted[:n]
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class _VectorEnrichment:
+    """
+    Hypergeometric enrichment of items (columns) in a subset of the rows
+    of a binary annotation matrix
+
+    Parameters
+    ----------
+    rows: iterable of tuple
+        Every row is a ``(key, annotated items)`` tuple
+    """
+    def __init__(self, rows: Iterable[Tuple[Any, Iterable[Any]]]) -> None:
+        self._rows: Dict[Any, int] = {}
+        columns: Dict[Any, int] = {}
+        row_idx: List[int] = []
+        col_idx: List[int] = []
+        for key, items in rows:
+            row = self._rows.setdefault(key, len(self._rows))
+            for item in items:
+                row_idx.append(row)
+                col_idx.append(columns.setdefault(item, len(columns)))
+
+        self._items: List[Any] = list(columns)
+        self._matrix = csr_matrix(
+            (np.ones(len(row_idx), dtype=np.int64), (row_idx, col_idx)),
+            shape=(len(self._rows), len(self._items))
+        )
+        self._matrix.sum_duplicates()
+        self._matrix.data[:] = 1
+        self._population = np.asarray(self._matrix.sum(axis=0)).ravel()
+        self._total = int(self._population.sum())
+
+    def _scores(
+        self,
+        method: str,
+        keys: Iterable[Any]
+    ) -> Tuple[List[Any], List[int], List[float]]:
+        """
+        Counts and enrichment scores of all items that are annotated
+        to at least one of the ``keys``
+
+        Returns
+        -------
+        tuple
+            Three lists with the items, their counts and their scores
+            in the order of the item columns
+        """
+        if method != 'hypergeom':
+            raise NotImplementedError('Enrichment method not implemented')
+        try:
+            rows = sorted(set(self._rows[key] for key in keys))
+        except KeyError as ex:
+            raise RuntimeError(
+                f'{ex} is not present in the reference population'
+            )
+
+        counts = np.asarray(self._matrix[rows].sum(axis=0)).ravel()
+        columns = np.flatnonzero(counts)
+        counts = counts[columns]
+        scores = hypergeom.sf(
+            counts - 1,
+            self._total,
+            self._population[columns],
+            int(counts.sum())
+        )
+        return (
+            [self._items[idx] for idx in columns],
+            counts.tolist(),
+            scores.tolist()
+        )
+
+
+class VectorEnrichmentModel(_VectorEnrichment):
+    """
+    Enrichment of genes or diseases in an HPOSet
+
+    Same interface and results as :class:`pyhpo.stats.EnrichmentModel`.
+    Items with the same score are sorted by their order in the Ontology
+    instead of their order in the HPOSet.
+
+    Parameters
+    ----------
+    category: str
+        ``gene``, ``omim``, ``orpha`` or ``decipher``
+    """
+    attribute_lookup: Dict[str, Callable] = {
+        'gene': lambda x: x.genes,
+        'omim': lambda x: x.omim_diseases,
+        'orpha': lambda x: x.orpha_diseases,
+        'decipher': lambda x: x.decipher_diseases,
+    }
+
+    def __init__(self, category: str) -> None:
+        attribute = self.attribute_lookup[category]
+        super().__init__((int(term), attribute(term)) for term in Ontology)
+
+    def scores(self, method: str, hposet: HPOSet) -> List[dict]:
+        """
+        The enrichment of all annotation items of the HPOSet, unsorted
+
+        Parameters
+        ----------
+        method: str
+            The statistical test for enrichment. Only ``hypergeom``
+            is supported
+        hposet: HPOSet
+
+        Returns
+        -------
+        list of dict
+            See :func:`pyhpo.stats.EnrichmentModel.enrichment`
+        """
+        items, counts, scores = self._scores(
+            method, (int(term) for term in hposet)
+        )
+        return [
+            {'item': item, 'count': count, 'enrichment': score}
+            for item, count, score in zip(items, counts, scores)
+        ]
+
+    def enrichment(self, method: str, hposet: HPOSet) -> List[dict]:
+        """
+        The enrichment of all annotation items of the HPOSet, sorted
+        by ascending score
+
+        See :func:`pyhpo.stats.EnrichmentModel.enrichment`
+        """
+        return sorted(self.scores(method, hposet), key=_score)
+
+
+class VectorHPOEnrichment(_VectorEnrichment):
+    """
+    Enrichment of HPOTerms in a list of genes or diseases
+
+    Same interface and results as :class:`pyhpo.stats.HPOEnrichment`
+
+    Parameters
+    ----------
+    category: str
+        ``gene`` or ``omim``
+    """
+    def __init__(self, category: str) -> None:
+        items = {
+            'gene': Ontology.genes,
+            'omim': Ontology.omim_diseases
+        }[category]
+        super().__init__((item, item.hpo) for item in items)
+
+    def enrichment(self, method: str, annotation_sets: List) -> List[dict]:
+        """
+        The enrichment of all HPOTerms of the annotation items, sorted
+        by ascending score
+
+        See :func:`pyhpo.stats.HPOEnrichment.enrichment`
+        """
+        hpos, counts, scores = self._scores(method, annotation_sets)
+        res = [
+            {'hpo': Ontology[hpo], 'count': count, 'enrichment': score}
+            for hpo, count, score in zip(hpos, counts, scores)
+        ]
+        return sorted(res, key=_score)
+
+
+def score_enrichment(model: Any, method: str, hposet: HPOSet) -> List[dict]:
+    """
+    Calculates the enrichment of all items, without sorting them
+
+    Parameters
+    ----------
+    model: EnrichmentModel
+        The enrichment model for genes or diseases
+    method: str
+        The statistical test for enrichment
+    hposet: HPOSet
+
+    Returns
+    -------
+    list of dict
+        Same as :func:`pyhpo.stats.EnrichmentModel.enrichment`, but
+        unsorted
+
+    Raises
+    ------
+    NotImplementedError
+        Invalid ``method``
+    RuntimeError
+        An item is missing in the reference population
+    """
+    if isinstance(model, VectorEnrichmentModel):
+        return model.scores(method, hposet)
+
+    list_counts, list_total = model._population_count(hposet)
+    return [
+        {
+            'item': item,
+            'count': count,
+            'enrichment': model._single_enrichment(
+                method, item, count, list_total
+            )
+        }
+        for item, count in list_counts.items()
+    ]
+
+
+def ranked_enrichment(
+    model: Any,
+    method: str,
+    hposet: HPOSet,
+    limit: int,
+    offset: int = 0
+) -> List[dict]:
+    """
+    Returns one page of the enrichment results of an HPOSet
+
+    Parameters
+    ----------
+    model: EnrichmentModel
+        The enrichment model for genes or diseases
+    method: str
+        The statistical test for enrichment
+    hposet: HPOSet
+    limit: int
+        The number of results to return
+    offset: int, default 0
+        The offset of the first result
+
+    Returns
+    -------
+    list of dict
+        See :func:`pyhpo.stats.EnrichmentModel.enrichment`
+
+    Raises
+    ------
+    See :func:`score_enrichment`
+    """
+    key = (id(model), method, tuple(sorted(int(x) for x in hposet)))
+    ranking = enrichment_cache.get(key)
+    if ranking is None:
+        ranking = EnrichmentRanking(score_enrichment(model, method, hposet))
+        enrichment_cache.set(key, ranking)
+    return ranking.top(limit + offset)[offset:]
@@ -0,0 +1,364 @@
+"""
+Executor to run CPU-heavy request handlers outside of the event loop
+
+All routes are declared ``async``, but most of them do pure CPU work.
+Running this work directly in the event loop blocks the whole worker,
+so that cheap requests queue behind expensive ones. The handlers
+dispatch their work into a :class:`ComputeExecutor` instead.
+
+Every endpoint class (e.g. ``similarity`` or ``enrichment``) uses a
+separate pool, so that a burst of expensive requests of one class
+can not use up all workers.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException
+
+from pyhpoapi import config, profiling, timing
+
+logger = logging.getLogger("uvicorn.error")
+
+EXECUTOR_KINDS = ('thread', 'process', 'inline')
+
+
+class RemoteHTTPError(NamedTuple):
+    """
+    An ``HTTPException`` that was raised inside a worker process
+
+    ``HTTPException`` can not be unpickled, which breaks the whole
+    process pool. Worker processes return this tuple instead and the
+    main process raises it again, see :func:`call_remote`.
+    """
+    status_code: int
+    detail: Any
+    headers: Optional[Dict[str, str]]
+
+    def exception(self) -> HTTPException:
+        return HTTPException(
+            status_code=self.status_code,
+            detail=self.detail,
+            headers=self.headers
+        )
+
+
+def call_remote(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs ``func`` inside a worker process and returns an
+    ``HTTPException`` as :class:`RemoteHTTPError`
+    """
+    try:
+        return func(*args, **kwargs)
+    except HTTPException as ex:
+        return RemoteHTTPError(
+            ex.status_code,
+            ex.detail,
+            dict(ex.headers) if ex.headers else None
+        )
+
+
+def raise_remote(res: Any) -> Any:
+    """
+    Raises the ``HTTPException`` of a worker process again,
+    or returns the result unchanged
+    """
+    if isinstance(res, RemoteHTTPError):
+        raise res.exception()
+    return res
+
+
+def _pool_crashed() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="A worker process crashed, please try again"
+    )
+
+
+class ComputeExecutor:
+    """
+    Manages one worker pool per endpoint class
+
+    Process pools are forked by :meth:`start` after the Ontology is
+    loaded, before the server accepts requests, so that all worker
+    processes inherit the Ontology (see :func:`server.lifespan`).
+    Pools of crashed workers are replaced on demand.
+
+    Parameters
+    ----------
+    kind: str
+        The type of executor
+
+        * **thread** - Use a thread pool
+        * **process** - Use a (forked) process pool
+        * **inline** - Run all work directly in the event loop
+
+    limits: dict
+        Maximum number of workers per endpoint class
+    """
+    def __init__(self, kind: str, limits: Dict[str, int]) -> None:
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f'Invalid executor kind {kind}')
+        self.kind = kind
+        self.limits = limits
+        self._pools: Dict[str, Executor] = {}
+
+    def pool(self, endpoint_class: str) -> Optional[Executor]:
+        """
+        Returns the worker pool for the endpoint class
+
+        Parameters
+        ----------
+        endpoint_class: str
+            The endpoint class, e.g. ``similarity`` or ``enrichment``
+
+        Returns
+        -------
+        Executor or None
+            ``None`` if work should be done inline
+        """
+        if self.kind == 'inline':
+            return None
+        if endpoint_class not in self._pools:
+            max_workers = self.limits[endpoint_class]
+            if self.kind == 'process':
+                self._pools[endpoint_class] = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('fork')
+                )
+            else:
+                self._pools[endpoint_class] = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix=f'pyhpoapi-{endpoint_class}'
+                )
+            logger.debug(
+                f'Started {self.kind} pool for {endpoint_class} '
+                f'with {max_workers} workers'
+            )
+        return self._pools[endpoint_class]
+
+    async def run(
+        self,
+        endpoint_class: str,
+        func: Callable,
+        *args: Any,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Runs ``func`` in the pool of the endpoint class
+
+        When using a process pool, ``func`` and all arguments must be
+        picklable, i.e. ``func`` must be defined on module level.
+        If a worker process crashes, the pool is replaced and the
+        request fails with HTTP 503.
+
+        Parameters
+        ----------
+        endpoint_class: str
+            The endpoint class, e.g. ``similarity`` or ``enrichment``
+        func: Callable
+            The function to run
+        args, kwargs:
+            Arguments passed to ``func``
+
+        Returns
+        -------
+        Any
+            The return value of ``func``
+        """
+        pool = self.pool(endpoint_class)
+        if pool is None:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        if self.kind == 'thread':
+            func = timing.bind(profiling.bind(func))
+            return await loop.run_in_executor(
+                pool,
+                functools.partial(func, *args, **kwargs)
+            )
+        try:
+            res = await loop.run_in_executor(
+                pool,
+                functools.partial(call_remote, func, *args, **kwargs)
+            )
+        except BrokenProcessPool:
+            logger.error(f'The {endpoint_class} process pool is broken')
+            self._discard(endpoint_class, pool)
+            raise _pool_crashed()
+        return raise_remote(res)
+
+    def start(self) -> None:
+        """
+        Forks all worker processes of a process executor right away
+
+        Worker processes only inherit the models that are built when
+        they are forked, see :func:`server.initialize_ontology`.
+        """
+        if self.kind != 'process':
+            return
+        for endpoint_class in self.limits:
+            pool = self.pool(endpoint_class)
+            assert pool is not None
+            pool.submit(int).result()
+
+    def _discard(self, endpoint_class: str, pool: Executor) -> None:
+        """
+        Removes a broken pool, the next request creates a new one
+        """
+        if self._pools.get(endpoint_class) is pool:
+            del self._pools[endpoint_class]
+        pool.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        """
+        Shuts down all worker pools
+        """
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+        self._pools = {}
+
+
+def split_shards(items: Sequence, n_shards: int) -> List[Sequence]:
+    """
+    Splits ``items`` into ``n_shards`` contiguous shards of similar size
+
+    Parameters
+    ----------
+    items: list
+        The items to split
+    n_shards: int
+        The maximum number of shards
+
+    Returns
+    -------
+    list
+        The shards. Concatenating all shards returns the original items
+    """
+    if not items:
+        return []
+    size = -(-len(items) // max(n_shards, 1))
+    return [items[i:i+size] for i in range(0, len(items), size)]
+
+
+class ShardedExecutor:
+    """
+    Scores large lists of items on a pool of forked worker processes
+
+    The item list is split into one shard per process. All workers
+    are forked from the main process and inherit the loaded Ontology
+    copy-on-write, so only the item identifiers and the results
+    have to be transferred between the processes.
+
+    Parameters
+    ----------
+    processes: int
+        Number of worker processes. ``0`` disables sharding.
+    """
+    def __init__(self, processes: int) -> None:
+        self.processes = processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    def start(self) -> None:
+        """
+        Forks all worker processes right away, see
+        :meth:`ComputeExecutor.start`
+        """
+        if self.enabled:
+            self.pool().submit(int).result()
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('fork')
+            )
+            logger.debug(
+                f'Started sharded process pool with {self.processes} workers'
+            )
+        return self._pool
+
+    async def map(
+        self,
+        func: Callable,
+        items: Sequence,
+        *args: Any
+    ) -> List[Any]:
+        """
+        Runs ``func(shard, *args)`` for every shard of ``items``
+
+        ``func`` must return a list of results, one for every item in
+        the shard. The results of all shards are merged in the original
+        order of ``items``. ``HTTPException`` of any shard is raised
+        again. If a worker process crashes, the pool is replaced and
+        the request fails with HTTP 503.
+
+        Parameters
+        ----------
+        func: Callable
+            Module level function to process a single shard
+        items: list
+            The items to process
+        args:
+            Additional arguments passed to ``func``
+
+        Returns
+        -------
+        list
+            The results of all shards, in order
+        """
+        pool = self.pool()
+        loop = asyncio.get_running_loop()
+        try:
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    pool,
+                    functools.partial(call_remote, func, shard, *args)
+                )
+                for shard in split_shards(items, self.processes)
+            ])
+        except BrokenProcessPool:
+            logger.error('The sharded process pool is broken')
+            if self._pool is pool:
+                self._pool = None
+            pool.shutdown(wait=False)
+            raise _pool_crashed()
+        return [item for shard in results for item in raise_remote(shard)]
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+compute = ComputeExecutor(config.EXECUTOR, config.EXECUTOR_LIMITS)
+ranking = ShardedExecutor(config.RANKING_PROCESSES)
+
+
+def forks_workers() -> bool:
+    """
+    Indicates if any work runs in forked worker processes
+    """
+    return compute.kind == 'process' or ranking.enabled
+
+
+async def run_compute(
+    endpoint_class: str,
+    func: Callable,
+    *args: Any,
+    **kwargs: Any
+) -> Any:
+    """
+    Runs ``func`` in the global :class:`ComputeExecutor`
+
+    See :func:`ComputeExecutor.run` for details
+    """
+    return await compute.run(endpoint_class, func, *args, **kwargs)
@@ -0,0 +1,168 @@
+"""
+Pre-encoded JSON of HPOTerms, genes and diseases
+
+HPOTerms, genes and diseases never change while the server is running,
+but popular ones are part of thousands of responses. Instead of calling
+``toJSON``, validating and encoding them for every response, their JSON
+is encoded once and cached. Responses are assembled by joining the
+cached fragments.
+
+Fragments are only used for fast JSON responses
+(``PYHPOAPI_FAST_JSON=1``, see :mod:`pyhpoapi.responses`). Otherwise,
+all functions return plain dicts and lists, which FastAPI validates
+against the response model of the route.
+
+Every fragment is encoded from the validated response model, so the
+response is exactly the same as without fragments.
+"""
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, List, Optional, Type
+)
+
+from pydantic import BaseModel
+
+from pyhpoapi import config, models, responses
+from pyhpoapi.cache import LRUCache
+
+fragment_cache = LRUCache(config.FRAGMENT_CACHE_SIZE)
+
+
+def fragment(
+    kind: Hashable,
+    item: Any,
+    encode: Callable[[Any], bytes]
+) -> bytes:
+    """
+    The cached JSON of an HPOTerm, gene or disease
+
+    Parameters
+    ----------
+    kind: Hashable
+        Identifies the shape of the JSON, e.g. the response model
+    item: HPOTerm, Gene or Disease
+    encode: Callable
+        Encodes ``item`` if it is not cached yet
+
+    Returns
+    -------
+    bytes
+    """
+    key = (kind, type(item).__name__, item.id)
+    res = fragment_cache.get(key)
+    if res is None:
+        res = encode(item)
+        fragment_cache.set(key, res)
+    return res
+
+
+def item_fragment(
+    item: Any,
+    model: Optional[Type[BaseModel]] = None,
+    verbose: bool = False,
+    exclude_none: bool = False
+) -> bytes:
+    """
+    The cached JSON of ``item.toJSON(verbose)``
+
+    Parameters
+    ----------
+    item: HPOTerm, Gene or Disease
+    model: pydantic model, optional
+        Encode the item in the shape of this response model
+    verbose: bool, default ``False``
+        Passed to ``toJSON``
+    exclude_none: bool, default ``False``
+        Omit ``None`` values of the response model
+
+    Returns
+    -------
+    bytes
+    """
+    def encode(item: Any) -> bytes:
+        data = item.toJSON(verbose)
+        if model is None:
+            return responses.dumps(data)
+        return model.model_validate(data).model_dump_json(
+            exclude_none=exclude_none
+        ).encode('utf-8')
+
+    name = model.__name__ if model is not None else None
+    return fragment((name, verbose, exclude_none), item, encode)
+
+
+def array(fragments: Iterable[bytes]) -> bytes:
+    """
+    Joins encoded JSON values to an array
+    """
+    return b'[' + b','.join(fragments) + b']'
+
+
+def items_json(
+    items: Iterable[Any],
+    model: Optional[Type[BaseModel]] = None,
+    verbose: bool = False,
+    exclude_none: bool = False
+) -> Any:
+    """
+    A list of HPOTerms, genes or diseases
+
+    See :func:`item_fragment` for the parameters
+
+    Returns
+    -------
+    bytes or list of dict
+        The joined fragments, if fast JSON responses are enabled,
+        otherwise the ``toJSON`` dicts of all items
+    """
+    if not responses.ENABLED:
+        return [item.toJSON(verbose) for item in items]
+    return array(
+        item_fragment(item, model, verbose, exclude_none) for item in items
+    )
+
+
+def hposet_terms(hposet: Any) -> List[Any]:
+    """
+    The HPOTerms of an HPOSet, by ascending ID
+
+    The order of the set itself is arbitrary, so all responses
+    list the terms of a query set in this order.
+    """
+    return sorted(hposet, key=int)
+
+
+def hposet_json(hposet: Any) -> Any:
+    """
+    The minimal JSON of all HPOTerms of an HPOSet
+
+    Returns
+    -------
+    bytes or list of dict
+        See :func:`items_json`
+    """
+    return items_json(hposet_terms(hposet), models.HpoTermMinimal)
+
+
+def object_json(members: Dict[str, Any]) -> Any:
+    """
+    A JSON object with already encoded members
+
+    Parameters
+    ----------
+    members: dict
+        Values are either encoded JSON (``bytes``) or plain Python types
+
+    Returns
+    -------
+    bytes or dict
+        The encoded object, if fast JSON responses are enabled,
+        otherwise ``members`` itself
+    """
+    if not responses.ENABLED:
+        return members
+    return b'{' + b','.join(
+        responses.dumps(key) + b':' + (
+            value if isinstance(value, bytes) else responses.dumps(value)
+        )
+        for key, value in members.items()
+    ) + b'}'
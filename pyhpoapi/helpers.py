@@ -1,7 +1,7 @@
 """
 Helper functions to convert REST-API GET/POST query parameters to PyHPO objects
 """
-from typing import Union
+from typing import Dict, Optional, Union
 
 from fastapi import HTTPException
 
@@ -9,6 +9,10 @@ from pyhpo import HPOTerm
 from pyhpo import Ontology
 from pyhpo import HPOSet
 
+from pyhpoapi import config
+from pyhpoapi.timing import timed
+from pyhpoapi.cache import LRUCache, make_cache
+
 
 class MockHPOEnrichment:
     def __init__(self, *args, **kwargs):
@@ -17,6 +21,7 @@ class MockHPOEnrichment:
     def enrichment(self, *args, **kwargs):
         raise NotImplemented
 
+@timed('parse')
 def get_hpo_term(termid: Union[int, str]) -> HPOTerm:
     """
     Convert the HPO-ID from a REST-API query parameter to an HPOTerm object
@@ -52,10 +57,54 @@ def get_hpo_term(termid: Union[int, str]) -> HPOTerm:
         )
 
 
+# Maps the canonical identifiers of HPOSet queries to the resolved HPOTerms
+term_set_cache = LRUCache(config.TERM_SET_CACHE_SIZE)
+
+# Maps two HPOSets and the similarity parameters to the similarity score.
+# Can be replaced by any object with ``get``, ``set`` and ``clear`` methods
+similarity_cache = make_cache(
+    config.SIMILARITY_CACHE,
+    config.SIMILARITY_CACHE_SIZE,
+    ttl=config.SIMILARITY_CACHE_TTL or None,
+    max_bytes=int(config.SIMILARITY_CACHE_MB * 1024 * 1024)
+)
+
+
+def normalize_identifier(termid: str) -> Union[int, str]:
+    """
+    Converts an HPO-ID query parameter into a canonical form
+
+    ``'HP:0000012'``, ``'0000012'`` and ``'12'`` are all normalized
+    to ``12``. Term names are kept as they are.
+
+    Parameters
+    ----------
+    termid: str
+        The HPO-id passed to the REST API
+
+    Returns
+    -------
+    int or str
+    """
+    termid = termid.strip()
+    if termid.startswith('HP:'):
+        numeric = termid[3:]
+    else:
+        numeric = termid
+    try:
+        return int(numeric)
+    except ValueError:
+        return termid
+
+
+@timed('parse')
 def get_hpo_set(set_query: str) -> HPOSet:
     """
     Build an HPOSet from a set of HPO-IDs passed as parameter to REST API
 
+    The resolved HPOTerms are cached, independent of the order and
+    formatting of the identifiers in the query.
+
     Parameters
     ----------
     set_query: str
@@ -72,10 +121,20 @@ def get_hpo_set(set_query: str) -> HPOSet:
         message in the header (either ``X-TermNotFound`` or ``X-Error``)    .
     """
     try:
-        return HPOSet([
-            get_hpo_term(x.strip())
-            for x in set_query.split(',')
-        ])
+        queries = [x.strip() for x in set_query.split(',')]
+        identifiers = [normalize_identifier(x) for x in queries]
+        key = tuple(sorted(set(identifiers), key=repr))
+
+        terms: Optional[Dict[Union[int, str], HPOTerm]]
+        terms = term_set_cache.get(key)
+        if terms is None:
+            terms = {
+                identifier: get_hpo_term(query)
+                for query, identifier in zip(queries, identifiers)
+            }
+            term_set_cache.set(key, terms)
+
+        return HPOSet([terms[x] for x in identifiers])
     except HTTPException as ex:
         raise HTTPException(
             status_code=400,
@@ -89,3 +148,55 @@ def get_hpo_set(set_query: str) -> HPOSet:
             detail='Invalid query',
             headers={'X-Error': 'Invalid query provided'}
         )
+
+
+def set_similarity(
+    set1: HPOSet,
+    set2: HPOSet,
+    kind: str,
+    method: str,
+    combine: str
+) -> float:
+    """
+    Calculates the similarity score of two HPOSets
+
+    Scores are cached in ``similarity_cache``, keyed on the sorted
+    HPOTerm ids of both sets and the similarity parameters.
+
+    Parameters
+    ----------
+    set1: HPOSet
+    set2: HPOSet
+    kind: str
+        Which kind of information content should be calculated.
+    method: string
+        The method to use to calculate the similarity.
+    combine: string
+        The method to combine similarity measures.
+
+    Returns
+    -------
+    float
+        The similarity score
+
+    Raises
+    ------
+    See :func:`pyhpo.HPOSet.similarity`
+    """
+    key = (
+        tuple(sorted(int(x) for x in set1)),
+        tuple(sorted(int(x) for x in set2)),
+        method,
+        combine,
+        kind
+    )
+    score = similarity_cache.get(key)
+    if score is None:
+        score = set1.similarity(
+            set2,
+            kind=kind,
+            method=method,
+            combine=combine
+        )
+        similarity_cache.set(key, score)
+    return score
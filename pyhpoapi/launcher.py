@@ -0,0 +1,141 @@
+"""
+Preforking launcher that shares one loaded Ontology between all workers
+
+``uvicorn pyhpoapi.main:app --workers N`` starts N fresh interpreters,
+each of which loads the Ontology and builds all models on its own.
+The launcher loads everything once in the master process and then
+forks the serving workers. All workers share the memory pages of the
+master copy-on-write, so every additional worker only needs a few MB.
+
+Start the API with::
+
+    python -m pyhpoapi.launcher --workers 15
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from pyhpoapi import metrics, server
+
+logger = logging.getLogger("uvicorn.error")
+
+# Workers that die faster than this after they were forked are not
+# restarted, to prevent a fork loop if the app can not start at all
+MIN_WORKER_LIFETIME = 5
+
+
+class Launcher:
+    """
+    Forks and supervises the serving worker processes
+
+    Parameters
+    ----------
+    config: uvicorn.Config
+        The configuration of the uvicorn servers in the workers
+    workers: int
+        Number of worker processes
+    """
+    def __init__(self, config: uvicorn.Config, workers: int) -> None:
+        self.config = config
+        self.workers = workers
+        self.should_exit = False
+        self._children: Dict[int, float] = {}
+
+    def run(self) -> None:
+        """
+        Binds the socket, forks all workers and restarts workers that
+        exit unexpectedly, until the master receives SIGINT or SIGTERM
+        """
+        sock = self.config.bind_socket()
+        metrics.clear_multiprocess_dir()
+
+        # Objects that exist now are never collected. This prevents the
+        # garbage collector from writing to all pages of the Ontology
+        # in every worker, which would copy the whole heap
+        gc.collect()
+        gc.freeze()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_exit)
+
+        for _ in range(self.workers):
+            self._fork([sock])
+
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self._children.pop(pid, None)
+            metrics.worker_exited(pid)
+            if started is None or self.should_exit:
+                continue
+            logger.warning(f'Worker {pid} exited with status {status}')
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                logger.error('Worker failed during startup, shutting down')
+                self._handle_exit(signal.SIGTERM, None)
+                continue
+            self._fork([sock])
+
+        sock.close()
+
+    def _fork(self, sockets: List) -> None:
+        pid = os.fork()
+        if pid:
+            self._children[pid] = time.monotonic()
+            logger.info(f'Started worker process {pid}')
+            return
+
+        # Worker process
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, signal.SIG_DFL)
+        try:
+            uvicorn.Server(self.config).run(sockets=sockets)
+        finally:
+            os._exit(0)
+
+    def _handle_exit(self, sig: int, frame: Optional[object]) -> None:
+        self.should_exit = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m pyhpoapi.launcher',
+        description=(
+            'Loads the Ontology once and forks the PyHPO-API workers'
+        )
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper())
+
+    server.initialize_ontology()
+    config = uvicorn.Config(
+        server.main(),
+        host=args.host,
+        port=args.port,
+        log_level=args.log_level
+    )
+    Launcher(config, args.workers).run()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
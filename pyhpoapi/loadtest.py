@@ -0,0 +1,402 @@
+"""
+Load tests against a running PyHPO-API server
+
+Replays a mixed workload of term lookups, searches, similarity,
+batch similarity and enrichment requests over HTTP. The queries are
+generated from the local Ontology, the same way as in
+:mod:`pyhpoapi.benchmark`, so the server must use the same master data
+(``PYHPOAPI_DATA_DIR`` or the builtin data).
+
+Requires the optional ``httpx`` package.
+
+The load is either generated by a fixed number of concurrent clients,
+each sending the next request as soon as the previous one is answered::
+
+    python -m pyhpoapi.loadtest http://localhost:8000 --concurrency 16
+
+or at a fixed request rate, independent of the response times::
+
+    python -m pyhpoapi.loadtest http://localhost:8000 --rate 200
+
+In rate mode, the latency is measured from the moment the request was
+scheduled, so that a slow server can not hide its queueing delay by
+slowing down the load generator.
+"""
+import argparse
+import asyncio
+import bisect
+import datetime
+import itertools
+import json
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from pyhpoapi import config
+from pyhpoapi.benchmark import (
+    Case,
+    build_cases,
+    build_queries,
+    format_results,
+    summarize,
+)
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+logger = logging.getLogger("uvicorn.error")
+
+# Share of every route in the workload
+WORKLOAD: Dict[str, float] = {
+    'GET /term/{term_id}': 30,
+    'GET /terms/search/{query}': 20,
+    'GET /terms/similarity [graphic]': 20,
+    'POST /terms/similarity': 10,
+    'GET /terms/enrichment/genes': 10,
+    'GET /terms/enrichment/omim': 10,
+}
+
+
+def build_workload(
+    cases: Mapping[str, List[Case]],
+    weights: Mapping[str, float] = WORKLOAD
+) -> Dict[str, Tuple[float, List[Case]]]:
+    """
+    Selects the requests of all routes of the workload
+
+    Parameters
+    ----------
+    cases: dict
+        The requests of every route, see :func:`benchmark.build_cases`
+    weights: dict
+        The share of every route in the workload
+
+    Returns
+    -------
+    dict
+        The weight and the requests of every route, by name
+    """
+    unknown = [name for name in weights if name not in cases]
+    if unknown:
+        raise ValueError(f'Unknown routes: {", ".join(unknown)}')
+    return {
+        name: (weight, cases[name])
+        for name, weight in weights.items()
+        if weight > 0
+    }
+
+
+def schedule(
+    workload: Mapping[str, Tuple[float, List[Case]]],
+    seed: int = 42
+) -> Iterator[Tuple[str, Case]]:
+    """
+    Endless, reproducible sequence of requests of the workload
+
+    The route of every request is chosen randomly according to its
+    weight, the requests of every route are sent in turn.
+    """
+    rng = random.Random(seed)
+    names = list(workload)
+    cum_weights = list(itertools.accumulate(
+        workload[name][0] for name in names
+    ))
+    counters = {name: itertools.count() for name in names}
+    while True:
+        idx = bisect.bisect_right(cum_weights, rng.random() * cum_weights[-1])
+        name = names[min(idx, len(names) - 1)]
+        requests = workload[name][1]
+        yield name, requests[next(counters[name]) % len(requests)]
+
+
+class Recorder:
+    """
+    Collects the latencies and errors of all routes
+    """
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.start = 0.0
+        self.end = 0.0
+
+    def record(self, name: str, latency: float, ok: bool) -> None:
+        self.latencies[name].append(latency)
+        if not ok:
+            self.errors[name] += 1
+
+    def results(self) -> Dict[str, Dict[str, float]]:
+        """
+        Throughput, error rate and latency percentiles of every route
+        and of all requests (``total``)
+
+        See :func:`benchmark.summarize`
+        """
+        elapsed = self.end - self.start
+        results = {}
+        for name in sorted(self.latencies):
+            results[name] = summarize(
+                self.latencies[name],
+                self.errors[name],
+                elapsed
+            )
+        results['total'] = summarize(
+            list(itertools.chain(*self.latencies.values())),
+            sum(self.errors.values()),
+            elapsed
+        )
+        for res in results.values():
+            requests = res['requests']
+            res['error_rate'] = res['errors'] / requests if requests else 0.0
+        return results
+
+
+async def send(client: 'httpx.AsyncClient', case: Case) -> bool:
+    """
+    Sends a single request
+
+    Returns
+    -------
+    bool
+        ``False`` if the request failed or returned an error status
+    """
+    try:
+        response = await client.request(
+            case.method,
+            case.path,
+            params=case.params or None,
+            json=case.body
+        )
+    except httpx.HTTPError as err:
+        logger.debug(f'{case.method} {case.path} failed: {err!r}')
+        return False
+    return response.status_code < 400
+
+
+async def _closed_loop(
+    client: 'httpx.AsyncClient',
+    requests: Iterator[Tuple[str, Case]],
+    recorder: Recorder,
+    concurrency: int,
+    measure_from: float,
+    deadline: float
+) -> None:
+    async def worker() -> None:
+        while True:
+            start = time.perf_counter()
+            if start >= deadline:
+                return
+            name, case = next(requests)
+            ok = await send(client, case)
+            if start >= measure_from:
+                recorder.record(name, time.perf_counter() - start, ok)
+
+    await asyncio.gather(*[worker() for _ in range(max(concurrency, 1))])
+
+
+async def _open_loop(
+    client: 'httpx.AsyncClient',
+    requests: Iterator[Tuple[str, Case]],
+    recorder: Recorder,
+    rate: float,
+    measure_from: float,
+    deadline: float
+) -> None:
+    async def timed(name: str, case: Case, scheduled: float) -> None:
+        ok = await send(client, case)
+        if scheduled >= measure_from:
+            recorder.record(name, time.perf_counter() - scheduled, ok)
+
+    interval = 1 / rate
+    scheduled = time.perf_counter()
+    tasks = []
+    while scheduled < deadline:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name, case = next(requests)
+        tasks.append(asyncio.ensure_future(timed(name, case, scheduled)))
+        scheduled += interval
+    await asyncio.gather(*tasks)
+
+
+async def run(
+    client: 'httpx.AsyncClient',
+    workload: Mapping[str, Tuple[float, List[Case]]],
+    duration: float,
+    warmup: float = 0.0,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    seed: int = 42
+) -> Dict[str, Dict[str, float]]:
+    """
+    Sends the workload to the server
+
+    Parameters
+    ----------
+    client: httpx.AsyncClient
+        The client, with the URL of the server as ``base_url``
+    workload: dict
+        See :func:`build_workload`
+    duration: float
+        Duration of the measurement in seconds
+    warmup: float, default ``0``
+        Seconds of load before the measurement starts
+    concurrency: int, default ``1``
+        Number of concurrent clients. Ignored if ``rate`` is provided
+    rate: float, optional
+        Number of requests per second
+    seed: int, default ``42``
+        Seed of the random order of the requests
+
+    Returns
+    -------
+    dict
+        The results of every route, by name. See :meth:`Recorder.results`
+    """
+    recorder = Recorder()
+    requests = schedule(workload, seed)
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+    if rate:
+        await _open_loop(
+            client, requests, recorder, rate, measure_from, deadline
+        )
+    else:
+        await _closed_loop(
+            client, requests, recorder, concurrency, measure_from, deadline
+        )
+    recorder.start = measure_from
+    recorder.end = time.perf_counter()
+    return recorder.results()
+
+
+def format_report(results: Dict[str, Dict[str, float]]) -> str:
+    lines = [format_results(results, title='Route')]
+    total = results['total']
+    lines.append(
+        f'\n{total["requests"]} requests, {total["throughput"]:.1f} req/s, '
+        f'{total["error_rate"]:.2%} errors'
+    )
+    return '\n'.join(lines)
+
+
+def _parse_mix(values: Sequence[str]) -> Dict[str, float]:
+    weights = {}
+    for value in values:
+        name, _, weight = value.rpartition('=')
+        weights[name] = float(weight)
+    return weights
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    # Imported here, because the server imports most other modules
+    from pyhpoapi import server
+
+    parser = argparse.ArgumentParser(
+        prog='python -m pyhpoapi.loadtest',
+        description='Load tests a running PyHPO-API server'
+    )
+    parser.add_argument(
+        'url',
+        nargs='?',
+        default='http://127.0.0.1:8000',
+        help='URL of the server'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help=(
+            'Number of concurrent clients. In rate mode, the maximum '
+            'number of open connections'
+        )
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        help='Send a fixed number of requests per second'
+    )
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--mix',
+        nargs='+',
+        default=[],
+        metavar='ROUTE=WEIGHT',
+        help=(
+            'Change the share of routes in the workload, e.g. '
+            '"GET /term/{term_id}=0" to disable term lookups'
+        )
+    )
+    parser.add_argument('--output', help='Save the results as JSON')
+    args = parser.parse_args(argv)
+
+    if not HAS_HTTPX:
+        parser.error('The load test requires httpx: pip install httpx')
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    weights = dict(WORKLOAD)
+    weights.update(_parse_mix(args.mix))
+
+    server.load_ontology()
+    cases = build_cases(
+        build_queries(args.queries, args.seed),
+        methods=['graphic']
+    )
+    try:
+        workload = build_workload(cases, weights)
+    except ValueError as err:
+        parser.error(str(err))
+
+    async def _run() -> Dict[str, Dict[str, float]]:
+        connections = max(args.concurrency, 1)
+        async with httpx.AsyncClient(
+            base_url=args.url,
+            timeout=args.timeout,
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=connections
+            )
+        ) as client:
+            return await run(
+                client,
+                workload,
+                args.duration,
+                warmup=args.warmup,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                seed=args.seed
+            )
+
+    results = asyncio.run(_run())
+    print(format_report(results))
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({
+                'meta': {
+                    'date': datetime.datetime.now().isoformat(),
+                    'url': args.url,
+                    'concurrency': args.concurrency,
+                    'rate': args.rate,
+                    'duration': args.duration,
+                    'workload': weights,
+                    'version': config.VERSION,
+                },
+                'results': results,
+            }, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
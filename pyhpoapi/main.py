@@ -1,7 +1,7 @@
 import logging
 import os
 
-from pyhpoapi import server
+from pyhpoapi import config, server
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -9,5 +9,8 @@ if os.environ.get("PYHPOAPI_DEBUG"):
     logger.setLevel(logging.DEBUG)
     logger.debug("Logging level set to DEBUG")
 
-server.initialize_ontology()
-app = server.main()
+if config.STAGED_STARTUP:
+    app = server.main(staged=True)
+else:
+    server.initialize_ontology()
+    app = server.main()
@@ -0,0 +1,251 @@
+"""
+Prometheus metrics of all requests
+
+Requires the optional ``prometheus_client`` package. All metrics are
+recorded by a lightweight ASGI middleware per route template, e.g.
+``/similarity/omim/all`` instead of the actual request path.
+
+When running multiple workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an
+empty directory. All workers then write their metrics to that directory
+and ``/metrics`` reports the sum of all workers.
+"""
+import os
+import time
+from typing import Iterator, Optional, Tuple
+
+from pyhpoapi import config
+from pyhpoapi.cache import LRUCache
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+ENABLED = HAS_PROMETHEUS and config.METRICS
+
+# Maximum number of seconds between two updates of the cache metrics
+CACHE_STATS_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+if ENABLED:
+    REQUESTS = Counter(
+        'pyhpoapi_requests_total',
+        'Number of handled requests',
+        ['method', 'route', 'status']
+    )
+    ERRORS = Counter(
+        'pyhpoapi_request_errors_total',
+        'Number of requests that failed with a server error',
+        ['method', 'route']
+    )
+    LATENCY = Histogram(
+        'pyhpoapi_request_duration_seconds',
+        'Time until the response is completely sent',
+        ['method', 'route'],
+        buckets=LATENCY_BUCKETS
+    )
+    IN_PROGRESS = Gauge(
+        'pyhpoapi_requests_in_progress',
+        'Number of requests that are currently handled',
+        ['method', 'route'],
+        multiprocess_mode='livesum'
+    )
+    BATCH_SIZE = Histogram(
+        'pyhpoapi_batch_size',
+        'Number of HPOSets, genes or diseases scored in a single request',
+        ['route'],
+        buckets=BATCH_SIZE_BUCKETS
+    )
+    CACHE_HITS = Gauge(
+        'pyhpoapi_cache_hits',
+        'Number of cache lookups that returned a cached value',
+        ['cache'],
+        multiprocess_mode='livesum'
+    )
+    CACHE_MISSES = Gauge(
+        'pyhpoapi_cache_misses',
+        'Number of cache lookups that did not find a cached value',
+        ['cache'],
+        multiprocess_mode='livesum'
+    )
+    CACHE_ENTRIES = Gauge(
+        'pyhpoapi_cache_entries',
+        'Number of cached values',
+        ['cache'],
+        multiprocess_mode='livesum'
+    )
+
+_last_cache_update = 0.0
+
+
+def observe_batch_size(route: str, size: int) -> None:
+    """
+    Records the number of items that are scored in a batch request
+
+    Parameters
+    ----------
+    route: str
+        The route template, e.g. ``/terms/similarity``
+    size: int
+        The number of scored HPOSets, genes or diseases
+    """
+    if ENABLED:
+        BATCH_SIZE.labels(route).observe(size)
+
+
+def _caches() -> Iterator[Tuple[str, object]]:
+    # Imported here, because the routers import this module
+    from pyhpoapi import compression, helpers, enrichment, fragments
+    from pyhpoapi.routers import terms
+
+    yield 'term_set', helpers.term_set_cache
+    yield 'similarity', helpers.similarity_cache
+    yield 'enrichment', enrichment.enrichment_cache
+    yield 'fragment', fragments.fragment_cache
+    yield 'response', compression.response_cache
+    if terms.search_index is not None:
+        yield 'search', terms.search_index._cache
+
+
+def update_cache_stats(force: bool = False) -> None:
+    """
+    Copies the hit and miss counters of all caches into the metrics
+
+    Parameters
+    ----------
+    force: bool, default ``False``
+        Update the metrics even if they were updated recently
+    """
+    global _last_cache_update
+    if not ENABLED:
+        return
+    now = time.monotonic()
+    if not force and now - _last_cache_update < CACHE_STATS_INTERVAL:
+        return
+    _last_cache_update = now
+    for name, cache in _caches():
+        CACHE_HITS.labels(name).set(cache.hits)  # type: ignore
+        CACHE_MISSES.labels(name).set(cache.misses)  # type: ignore
+        CACHE_ENTRIES.labels(name).set(len(cache))  # type: ignore
+
+
+def exposition() -> bytes:
+    """
+    All metrics in the Prometheus text format
+
+    Returns the metrics of all workers, if ``PROMETHEUS_MULTIPROC_DIR``
+    is set, otherwise only the metrics of the current process.
+    """
+    update_cache_stats(force=True)
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def clear_multiprocess_dir() -> None:
+    """
+    Removes the metrics of previous runs from ``PROMETHEUS_MULTIPROC_DIR``
+    """
+    folder = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not ENABLED or not folder or not os.path.isdir(folder):
+        return
+    for filename in os.listdir(folder):
+        if filename.endswith('.db'):
+            os.remove(os.path.join(folder, filename))
+
+
+def worker_exited(pid: int) -> None:
+    """
+    Removes the in-progress gauges of a worker process that exited
+    """
+    if ENABLED and 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def route_template(scope) -> Optional[str]:
+    """
+    The path template of the route that handled the request
+
+    Only available after the request was routed, or if the response
+    was cached by the compression middleware.
+    """
+    cached = scope.get('pyhpoapi.route')
+    if cached is not None:
+        return cached
+    # Recent FastAPI versions keep included routers nested and store
+    # the complete path of the route in the effective route context
+    context = scope.get('fastapi', {}).get('effective_route_context')
+    path = getattr(context, 'path', None)
+    if path is None:
+        path = getattr(scope.get('route'), 'path', None)
+    return path
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records the metrics of every HTTP request
+
+    The route of a request is only known after it was handled, so the
+    in-progress gauge uses the route of the previous request to the
+    same path, or ``unmatched`` for the first request.
+
+    Parameters
+    ----------
+    app: ASGI application
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+        self._routes = LRUCache(4096)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        key = (method, scope['path'])
+        route = self._routes.get(key) or 'unmatched'
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        in_progress = IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            template = route_template(scope)
+            if template is None:
+                template = 'unmatched'
+            elif template != route:
+                self._routes.set(key, template)
+            LATENCY.labels(method, template).observe(duration)
+            REQUESTS.labels(method, template, str(status)).inc()
+            if status >= 500:
+                ERRORS.labels(method, template).inc()
+            update_cache_stats()
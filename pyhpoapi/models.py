@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -204,6 +204,23 @@ class SimilarityScore_Batch(BaseModel):
         }
 
 
+class SimilarityScore_Columnar(BaseModel):
+    set1: Optional[List[HpoTermMinimal]] = None
+    names: List[str]
+    scores: List[Optional[float]]
+    errors: Dict[str, str]
+
+    class Config:
+        json_schema_extra = {
+            'example': {
+                'set1': [HpoTermMinimal.Config.json_schema_extra['example']],
+                'names': ['Comparison-Set 123', 'Comparison-Set 124'],
+                'scores': [0.3763421567579537, None],
+                'errors': {'1': 'HP:9999999'}
+            }
+        }
+
+
 class PostBody_Similarity_Omim(BaseModel):
     set1: str
     omim_diseases: List[int]
@@ -0,0 +1,252 @@
+"""
+Profiling of single requests
+
+When profiling is enabled (``PYHPOAPI_PROFILING=1``), every request
+with an ``X-Profile`` header runs under ``cProfile``. The profile is
+written to ``PYHPOAPI_PROFILE_DIR`` or, if no directory is configured,
+returned as plain text instead of the actual response.
+
+The profile contains the work of the request in the event loop
+(e.g. parsing and response validation). The event loop is shared by
+all requests, so the profile also contains every other request that
+is handled at the same time. Only one request is profiled at a time,
+other requests with an ``X-Profile`` header fail with HTTP 409.
+
+The time spent in the compute executor is not included, only the time
+the event loop waits for it. Work in worker processes is never
+profiled. Before Python 3.12, the work in executor threads is profiled
+separately and added to the profile. Since Python 3.12, only one
+``cProfile`` profiler can be active in the interpreter, so executor
+threads can not be profiled while the event loop profiler is active.
+Such profiles are marked as partial with an ``X-Profile-Partial``
+header that contains the number of calls that were not profiled
+(and a note in inline profiles).
+
+When profiling is disabled, the middleware is not installed at all.
+"""
+import cProfile
+import functools
+import io
+import itertools
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional, Tuple
+
+from pyhpoapi import config
+
+ENABLED = config.PROFILING
+
+HEADER = b'x-profile'
+PARTIAL_HEADER = b'x-profile-partial'
+
+# Number of functions listed in inline profiles
+INLINE_LINES = 60
+
+_current: 'ContextVar[Optional[RequestProfile]]' = ContextVar(
+    'pyhpoapi_profile',
+    default=None
+)
+
+# Only one request can be profiled at a time
+_lock = threading.Lock()
+
+_counter = itertools.count()
+
+
+class RequestProfile:
+    """
+    Collects the profiles of all threads that work on a single request
+    """
+    def __init__(self) -> None:
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        # Number of calls that could not be profiled
+        self.skipped = 0
+
+    def run(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Runs ``func`` in the current thread under the profiler
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter
+            with self._lock:
+                self.skipped += 1
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def stats(self) -> pstats.Stats:
+        """
+        The combined statistics of all profiled threads
+        """
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+def bind(func: Callable) -> Callable:
+    """
+    Profiles ``func`` if the current request is profiled
+
+    Used to profile work that is dispatched into other threads.
+
+    Parameters
+    ----------
+    func: Callable
+        The function that will run in another thread
+
+    Returns
+    -------
+    Callable
+        ``func`` itself if the request is not profiled
+    """
+    if not ENABLED:
+        return func
+    profile = _current.get()
+    if profile is None:
+        return func
+    return functools.partial(profile.run, func)
+
+
+def _requested(scope) -> bool:
+    for name, value in scope['headers']:
+        if name == HEADER:
+            return value not in (b'', b'0')
+    return False
+
+
+def _filename(scope) -> str:
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', scope['path']).strip('_')
+    return '{}-{}-{}-{}.prof'.format(
+        time.strftime('%Y%m%d-%H%M%S'),
+        scope['method'],
+        slug or 'root',
+        next(_counter)
+    )
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests with an ``X-Profile`` header
+
+    Parameters
+    ----------
+    app: ASGI application
+    directory: str, default ``""``
+        Directory for the profiles. Profiles are returned inline
+        if no directory is provided.
+    """
+    def __init__(self, app, directory: str = '') -> None:
+        self.app = app
+        self.directory = directory
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http' or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not _lock.acquire(blocking=False):
+            await _conflict(send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            if self.directory:
+                await self._to_file(profile, scope, receive, send)
+            else:
+                await self._inline(profile, scope, receive, send)
+        finally:
+            _current.reset(token)
+            _lock.release()
+
+    async def _run(self, profile: RequestProfile, scope, receive, send):
+        loop_profile = cProfile.Profile()
+        loop_profile.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loop_profile.disable()
+            profile._profiles.insert(0, loop_profile)
+
+    async def _to_file(self, profile: RequestProfile, scope, receive, send):
+        filename = _filename(scope)
+
+        async def send_with_headers(message) -> None:
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [
+                    (HEADER, filename.encode())
+                ] + _partial_headers(profile)
+            await send(message)
+
+        await self._run(profile, scope, receive, send_with_headers)
+        profile.stats().dump_stats(os.path.join(self.directory, filename))
+
+    async def _inline(self, profile: RequestProfile, scope, receive, send):
+        status = 500
+
+        async def discard(message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await self._run(profile, scope, receive, discard)
+
+        output = io.StringIO()
+        stats = profile.stats()
+        stats.stream = output  # type: ignore[attr-defined]
+        if profile.skipped:
+            output.write(
+                f'Partial profile: {profile.skipped} calls in other '
+                'threads were not profiled\n'
+            )
+        stats.sort_stats('cumulative').print_stats(INLINE_LINES)
+        body = output.getvalue().encode()
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/plain; charset=utf-8'),
+                (b'content-length', str(len(body)).encode()),
+                (HEADER, b'inline'),
+                (b'x-profile-status', str(status).encode()),
+            ] + _partial_headers(profile)
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def _partial_headers(profile: RequestProfile) -> List[Tuple[bytes, bytes]]:
+    if not profile.skipped:
+        return []
+    return [(PARTIAL_HEADER, str(profile.skipped).encode())]
+
+
+async def _conflict(send) -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': 409,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (HEADER, b'busy'),
+        ]
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({
+            'detail': 'Another request is being profiled'
+        }).encode()
+    })
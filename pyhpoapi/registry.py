@@ -0,0 +1,85 @@
+"""
+Registry of pre-built HPOSets of all genes and diseases
+
+Building an HPOSet from the annotated HPO ids of a gene or disease
+is expensive. Endpoints that compare a query set against all genes
+or diseases would do so for every single item on every request.
+The registry builds all sets once at startup instead.
+"""
+from typing import Iterable
+
+from pyhpo import HPOSet
+from pyhpo import Ontology
+
+
+class AnnotationSets(dict):
+    """
+    Maps every gene or disease to the HPOSet of its annotated HPOTerms
+
+    Parameters
+    ----------
+    items: iterable of Gene or Omim annotation items
+        All annotation items to add to the registry
+    """
+    def __init__(self, items: Iterable) -> None:
+        super().__init__()
+        for item in items:
+            try:
+                self[item] = build_hposet(item)
+            except RuntimeError:
+                # Items annotated to unknown HPOTerms are not cached
+                # and will be built on demand instead
+                pass
+
+    def hposet(self, item) -> HPOSet:
+        """
+        Returns the HPOSet of the gene or disease
+
+        Items that are missing from the registry are built on demand
+
+        Parameters
+        ----------
+        item: Gene or Omim annotation item
+
+        Returns
+        -------
+        HPOSet
+
+        Raises
+        ------
+        RuntimeError
+            The item is annotated to an unknown HPOTerm
+        """
+        try:
+            return self[item]
+        except KeyError:
+            return build_hposet(item)
+
+    @classmethod
+    def omim(cls) -> 'AnnotationSets':
+        """
+        Builds the registry of all OMIM diseases
+        """
+        return cls(Ontology.omim_diseases)
+
+    @classmethod
+    def genes(cls) -> 'AnnotationSets':
+        """
+        Builds the registry of all genes
+        """
+        return cls(Ontology.genes)
+
+
+def build_hposet(item) -> HPOSet:
+    """
+    Builds the HPOSet of all HPOTerms that are annotated to ``item``
+
+    Parameters
+    ----------
+    item: Gene or Omim annotation item
+
+    Returns
+    -------
+    HPOSet
+    """
+    return HPOSet.from_queries([int(x) for x in item.hpo])
@@ -0,0 +1,83 @@
+"""
+Fast JSON responses for large payloads
+
+FastAPI validates the return value of every handler against its
+``response_model`` and serializes it afterwards. For batch endpoints
+with thousands of items, this costs more than the actual computation.
+The handlers already build dicts in the exact shape of the response
+model, so the validation is redundant.
+
+When fast responses are enabled (``PYHPOAPI_FAST_JSON=1``), the hot
+handlers return a pre-rendered :class:`FastJSONResponse` instead,
+which FastAPI sends unchanged. The ``response_model`` of the route is
+still used for the OpenAPI schema.
+
+The response uses ``orjson`` if it is installed and the standard
+``json`` module otherwise.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from pyhpoapi import config
+from pyhpoapi.timing import stage
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+ENABLED = config.FAST_JSON
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encodes ``content`` as compact JSON
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':')
+    ).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that is rendered with ``orjson``, if available
+
+    Already encoded JSON (``bytes``) is sent unchanged.
+    """
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def json_response(content: Any) -> Any:
+    """
+    Renders ``content`` as :class:`FastJSONResponse`
+
+    ``content`` must match the ``response_model`` of the route,
+    because it is not validated anymore.
+
+    Parameters
+    ----------
+    content: dict, list or bytes
+        The response, built from plain Python types or already
+        encoded, e.g. by :mod:`pyhpoapi.fragments`
+
+    Returns
+    -------
+    FastJSONResponse
+        ``content`` itself, if fast responses are disabled and
+        ``content`` is not encoded yet
+    """
+    if not ENABLED and not isinstance(content, bytes):
+        return content
+    with stage('json'):
+        return FastJSONResponse(content)
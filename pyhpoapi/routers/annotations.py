@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi import APIRouter, Header, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from typing import Any, Iterable, Iterator, List, Optional
 
 from pyhpo import Ontology
 from pyhpo.annotations import Gene, Omim
-from pyhpo import HPOSet
 
-from pyhpoapi.helpers import get_hpo_set
-from pyhpoapi import models
+from pyhpoapi.helpers import get_hpo_set, set_similarity
+from pyhpoapi.executor import run_compute, ranking
+from pyhpoapi import binary, metrics, models
+from pyhpoapi.registry import AnnotationSets
+from pyhpoapi.selection import TopK
+from pyhpoapi.streaming import ndjson_response, NDJSON_RESPONSE
+from pyhpoapi.timing import TimedRoute, stage
 from pyhpoapi.routers import terms
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+omim_sets: Optional[AnnotationSets] = None
+gene_sets: Optional[AnnotationSets] = None
 
 
 @router.get(
@@ -39,19 +48,21 @@ async def omim_disease(
 
     """
     try:
-        res = Omim.get(omim_id).toJSON(verbose=verbose)
+        disease = Omim.get(omim_id)
     except (KeyError, RuntimeError):
         raise HTTPException(
             status_code=404,
             detail='OMIM disease does not exist'
         )
-    try:
-        res['hpo'] = [
-            Ontology.get_hpo_object(int(x)).toJSON()
-            for x in res['hpo']
-        ]
-    except (KeyError, RuntimeError):
-        pass
+    with stage('json'):
+        res = disease.toJSON(verbose=verbose)
+        try:
+            res['hpo'] = [
+                Ontology.get_hpo_object(int(x)).toJSON()
+                for x in res['hpo']
+            ]
+        except (KeyError, RuntimeError):
+            pass
     return res
 
 
@@ -82,16 +93,18 @@ async def gene(
 
     """
     try:
-        res = Gene.get(gene_id).toJSON(verbose=verbose)
+        actual_gene = Gene.get(gene_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Gene does not exist")
-    try:
-        res['hpo'] = [
-            Ontology.get_hpo_object(int(x)).toJSON()
-            for x in res['hpo']
-        ]
-    except (KeyError, RuntimeError):
-        pass
+    with stage('json'):
+        res = actual_gene.toJSON(verbose=verbose)
+        try:
+            res['hpo'] = [
+                Ontology.get_hpo_object(int(x)).toJSON()
+                for x in res['hpo']
+            ]
+        except (KeyError, RuntimeError):
+            pass
     return res
 
 
@@ -111,6 +124,24 @@ async def omim_similarity(
     """
     Similarity score between one HPOSet and an OMIM Disease
     """
+    return await run_compute(
+        'similarity',
+        _omim_similarity,
+        set1,
+        omim,
+        method,
+        combine,
+        kind
+    )
+
+
+def _omim_similarity(
+    set1: str,
+    omim: int,
+    method: str,
+    combine: str,
+    kind: str
+) -> dict:
     hposet = get_hpo_set(set1)
     try:
         disease = Omim.get(omim)
@@ -119,20 +150,16 @@ async def omim_similarity(
             status_code=404,
             detail="OMIM disease does not exist"
         )
-    set2 = HPOSet.from_queries([int(x) for x in disease.hpo])
+    set2 = _omim_registry().hposet(disease)
 
     try:
-        return {
-            'set1': hposet.toJSON(),
-            'set2': set2.toJSON(),
-            'omim': disease.toJSON(),
-            'similarity': hposet.similarity(
-                set2,
-                kind=kind,
-                method=method,
-                combine=combine
-            )
-        }
+        similarity = set_similarity(
+            hposet,
+            set2,
+            kind=kind,
+            method=method,
+            combine=combine
+        )
     except NotImplementedError:
         raise HTTPException(
             status_code=400,
@@ -149,78 +176,203 @@ async def omim_similarity(
             detail="Invalid information content kind specified"
             )
 
+    with stage('json'):
+        return {
+            'set1': hposet.toJSON(),
+            'set2': set2.toJSON(),
+            'omim': disease.toJSON(),
+            'similarity': similarity
+        }
 
 
 @router.post(
     '/similarity/omim',
     tags=['similarity', 'terms', 'disease'],
     response_description='Similarity score',
-    response_model=models.SimilarityScore_Batch
+    response_model=terms.BatchResponse,
+    responses=binary.BINARY_RESPONSES
     )
 async def batch_omim_similarity(
     data: models.PostBody_Similarity_Omim,
     method: str = 'graphic',
     combine: str = 'funSimAvg',
-    kind: str = 'omim'
+    kind: str = 'omim',
+    output_format: str = Query('rows', alias='format'),
+    include_set1: bool = True,
+    accept: Optional[str] = Header(None, include_in_schema=False)
 ) -> dict:
     """
     Similarity score between one HPOSet and several OMIM Diseases
-    """
-    other_sets = []
-
-    for other in data.omim_diseases:
-        try:
-            disease = Omim.get(other)
-            hpos = ','.join([str(x) for x in disease.hpo])
-        except KeyError:
-            hpos = f"unknown Omim disease {other}"
-
-        other_sets.append(
-            models.NamedHpoSet(
-                set2=hpos,
-                name=str(other)
-            )
-        )
 
-    res = await terms.batch_similarity(
-        data=models.PostBody_HpoSets(
-            set1=data.set1,
-            other_sets=other_sets
-            ),
-        method=method,
-        combine=combine,
-        kind=kind
+    See ``POST /terms/similarity`` for the ``format`` and
+    ``include_set1`` parameters and the binary response formats
+    """
+    terms._check_format(output_format)
+    media = binary.negotiate(accept)
+    metrics.observe_batch_size('/similarity/omim', len(data.omim_diseases))
+    return binary.respond(media, await run_compute(
+        'batch',
+        _batch_omim_similarity,
+        data.set1,
+        data.omim_diseases,
+        method,
+        combine,
+        kind,
+        None,
+        output_format,
+        include_set1,
+        media
+    ))
+
+
+def _batch_omim_similarity(
+    set1: str,
+    omim_diseases: List[int],
+    method: str,
+    combine: str,
+    kind: str,
+    selection: Optional[TopK] = None,
+    output_format: str = 'rows',
+    include_set1: bool = True,
+    media: str = binary.JSON
+) -> Any:
+    hposet = get_hpo_set(set1)
+    scores = terms._iter_scores(
+        hposet,
+        _omim_named_sets(omim_diseases),
+        method,
+        combine,
+        kind
     )
-    return res
+    selected = selection.select(scores) if selection else list(scores)
+    with stage('json'):
+        return terms._batch_content(
+            hposet,
+            selected,
+            output_format,
+            include_set1,
+            media
+        )
 
 
 @router.get(
     '/similarity/omim/all',
     tags=['similarity', 'terms', 'disease'],
     response_description='Similarity score',
-    response_model=models.SimilarityScore_Batch
+    response_model=terms.BatchResponse,
+    responses=binary.BINARY_RESPONSES
     )
 async def all_omim_similarity(
     set1: str = Query(..., example='HP:0007401,HP:0010885,HP:0006530'),
     method: str = 'graphic',
     combine: str = 'funSimAvg',
-    kind: str = 'omim'
+    kind: str = 'omim',
+    limit: Optional[int] = None,
+    min_similarity: Optional[float] = None,
+    sort: str = 'none',
+    output_format: str = Query('rows', alias='format'),
+    include_set1: bool = True,
+    accept: Optional[str] = Header(None, include_in_schema=False)
 ) -> dict:
     """
     Calculate Similarity scores between query set and all OMIM diseases
+
+    Parameters
+    ----------
+    limit: int, default ``None``
+        Only return the top ``limit`` results
+    min_similarity: float, default ``None``
+        Only return results with at least this similarity score
+    sort: str, default ``none``
+        Sort order of the results
+
+        * **none** - Unsorted. With ``limit``, same as ``desc``
+        * **desc** - Highest similarity first
+        * **asc** - Lowest similarity first
+    format: str, default ``rows``
+        Output format, see ``POST /terms/similarity``
+    include_set1: bool, default ``True``
+        Include the terms of ``set1`` in ``columnar`` responses
+
+    See ``POST /terms/similarity`` for the binary response formats
     """
+    terms._check_format(output_format)
+    media = binary.negotiate(accept)
+    selection = _selection(limit, min_similarity, sort)
+    omim_diseases = [x.id for x in Ontology.omim_diseases]
+    metrics.observe_batch_size('/similarity/omim/all', len(omim_diseases))
+
+    if ranking.enabled:
+        scores = await ranking.map(
+            _omim_shard_similarity,
+            omim_diseases,
+            set1,
+            method,
+            combine,
+            kind,
+            selection
+        )
+        return binary.respond(media, await run_compute(
+            'batch',
+            _ranked_batch,
+            set1,
+            scores,
+            selection,
+            output_format,
+            include_set1,
+            media
+        ))
+
+    return binary.respond(media, await run_compute(
+        'batch',
+        _batch_omim_similarity,
+        set1,
+        omim_diseases,
+        method,
+        combine,
+        kind,
+        selection,
+        output_format,
+        include_set1,
+        media
+    ))
+
 
-    data = models.PostBody_Similarity_Omim(
-        set1=set1,
-        omim_diseases=[x.id for x in Ontology.omim_diseases]
+@router.get(
+    '/similarity/omim/all/stream',
+    tags=['similarity', 'terms', 'disease'],
+    response_class=StreamingResponse,
+    responses=NDJSON_RESPONSE
     )
-    res = await batch_omim_similarity(
-        data=data,
-        method=method,
-        combine=combine,
-        kind=kind
+async def all_omim_similarity_stream(
+    set1: str = Query(..., example='HP:0007401,HP:0010885,HP:0006530'),
+    method: str = 'graphic',
+    combine: str = 'funSimAvg',
+    kind: str = 'omim',
+    min_similarity: Optional[float] = None
+) -> StreamingResponse:
+    """
+    Calculate Similarity scores between query set and all OMIM diseases
+    and stream the results
+
+    Every similarity score is sent as a single line of JSON as soon
+    as it is calculated (``application/x-ndjson``).
+    """
+    metrics.observe_batch_size(
+        '/similarity/omim/all/stream',
+        len(Ontology.omim_diseases)
+    )
+    selection = TopK(min_similarity=min_similarity)
+    scores = terms._stream_hpo_scores(
+        set1,
+        _omim_named_sets(x.id for x in Ontology.omim_diseases),
+        method,
+        combine,
+        kind
+    )
+    return await ndjson_response(
+        res for res in scores if selection.keep(res)
     )
-    return res
 
 
 @router.get(
@@ -239,25 +391,39 @@ async def gene_similarity(
     """
     Similarity score between one HPOSet and an OMIM Disease
     """
+    return await run_compute(
+        'similarity',
+        _gene_similarity,
+        set1,
+        gene,
+        method,
+        combine,
+        kind
+    )
+
+
+def _gene_similarity(
+    set1: str,
+    gene: str,
+    method: str,
+    combine: str,
+    kind: str
+) -> dict:
     hposet = get_hpo_set(set1)
     try:
         actual_gene = Gene.get(gene)
     except KeyError:
         raise HTTPException(status_code=404, detail="Gene does not exist")
-    set2 = HPOSet.from_queries([int(x) for x in actual_gene.hpo])
+    set2 = _gene_registry().hposet(actual_gene)
 
     try:
-        return {
-            'set1': hposet.toJSON(),
-            'set2': set2.toJSON(),
-            'gene': actual_gene.toJSON(),
-            'similarity': hposet.similarity(
-                set2,
-                kind=kind,
-                method=method,
-                combine=combine
-            )
-        }
+        similarity = set_similarity(
+            hposet,
+            set2,
+            kind=kind,
+            method=method,
+            combine=combine
+        )
     except NotImplementedError:
         raise HTTPException(
             status_code=400,
@@ -274,74 +440,310 @@ async def gene_similarity(
             detail="Invalid information content kind specified"
             )
 
+    with stage('json'):
+        return {
+            'set1': hposet.toJSON(),
+            'set2': set2.toJSON(),
+            'gene': actual_gene.toJSON(),
+            'similarity': similarity
+        }
+
 
 @router.post(
     '/similarity/gene',
     tags=['similarity', 'terms', 'gene'],
     response_description='Similarity score',
-    response_model=models.SimilarityScore_Batch
+    response_model=terms.BatchResponse,
+    responses=binary.BINARY_RESPONSES
     )
 async def batch_gene_similarity(
     data: models.PostBody_Similarity_Gene,
     method: str = 'graphic',
     combine: str = 'funSimAvg',
-    kind: str = 'omim'
+    kind: str = 'omim',
+    output_format: str = Query('rows', alias='format'),
+    include_set1: bool = True,
+    accept: Optional[str] = Header(None, include_in_schema=False)
 ) -> dict:
     """
     Similarity score between one HPOSet and several OMIM Diseases
-    """
-    other_sets = []
 
-    for other in data.genes:
-        try:
-            actual_gene = Gene.get(other)
-            hpos = ','.join([str(x) for x in actual_gene.hpo])
-        except KeyError:
-            hpos = f"unknown gene {other}"
-
-        other_sets.append(
-            models.NamedHpoSet(
-                set2=hpos,
-                name=other
-            )
-        )
-
-    res = await terms.batch_similarity(
-        data=models.PostBody_HpoSets(
-            set1=data.set1,
-            other_sets=other_sets
-            ),
-        method=method,
-        combine=combine,
-        kind=kind
+    See ``POST /terms/similarity`` for the ``format`` and
+    ``include_set1`` parameters and the binary response formats
+    """
+    terms._check_format(output_format)
+    media = binary.negotiate(accept)
+    metrics.observe_batch_size('/similarity/gene', len(data.genes))
+    return binary.respond(media, await run_compute(
+        'batch',
+        _batch_gene_similarity,
+        data.set1,
+        data.genes,
+        method,
+        combine,
+        kind,
+        None,
+        output_format,
+        include_set1,
+        media
+    ))
+
+
+def _batch_gene_similarity(
+    set1: str,
+    genes: List[str],
+    method: str,
+    combine: str,
+    kind: str,
+    selection: Optional[TopK] = None,
+    output_format: str = 'rows',
+    include_set1: bool = True,
+    media: str = binary.JSON
+) -> Any:
+    hposet = get_hpo_set(set1)
+    scores = terms._iter_scores(
+        hposet,
+        _gene_named_sets(genes),
+        method,
+        combine,
+        kind
     )
-    return res
+    selected = selection.select(scores) if selection else list(scores)
+    with stage('json'):
+        return terms._batch_content(
+            hposet,
+            selected,
+            output_format,
+            include_set1,
+            media
+        )
 
 
 @router.get(
     '/similarity/gene/all',
     tags=['similarity', 'terms', 'gene'],
     response_description='Similarity score',
-    response_model=models.SimilarityScore_Batch
+    response_model=terms.BatchResponse,
+    responses=binary.BINARY_RESPONSES
     )
 async def all_gene_similarity(
     set1: str = Query(..., example='HP:0007401,HP:0010885,HP:0006530'),
     method: str = 'graphic',
     combine: str = 'funSimAvg',
-    kind: str = 'omim'
+    kind: str = 'omim',
+    limit: Optional[int] = None,
+    min_similarity: Optional[float] = None,
+    sort: str = 'none',
+    output_format: str = Query('rows', alias='format'),
+    include_set1: bool = True,
+    accept: Optional[str] = Header(None, include_in_schema=False)
 ) -> dict:
     """
     Calculate Similarity scores between query set and all genes
+
+    Parameters
+    ----------
+    limit: int, default ``None``
+        Only return the top ``limit`` results
+    min_similarity: float, default ``None``
+        Only return results with at least this similarity score
+    sort: str, default ``none``
+        Sort order of the results
+
+        * **none** - Unsorted. With ``limit``, same as ``desc``
+        * **desc** - Highest similarity first
+        * **asc** - Lowest similarity first
+    format: str, default ``rows``
+        Output format, see ``POST /terms/similarity``
+    include_set1: bool, default ``True``
+        Include the terms of ``set1`` in ``columnar`` responses
+
+    See ``POST /terms/similarity`` for the binary response formats
     """
+    terms._check_format(output_format)
+    media = binary.negotiate(accept)
+    selection = _selection(limit, min_similarity, sort)
+    genes = [x.name for x in Ontology.genes]
+    metrics.observe_batch_size('/similarity/gene/all', len(genes))
+
+    if ranking.enabled:
+        scores = await ranking.map(
+            _gene_shard_similarity,
+            genes,
+            set1,
+            method,
+            combine,
+            kind,
+            selection
+        )
+        return binary.respond(media, await run_compute(
+            'batch',
+            _ranked_batch,
+            set1,
+            scores,
+            selection,
+            output_format,
+            include_set1,
+            media
+        ))
+
+    return binary.respond(media, await run_compute(
+        'batch',
+        _batch_gene_similarity,
+        set1,
+        genes,
+        method,
+        combine,
+        kind,
+        selection,
+        output_format,
+        include_set1,
+        media
+    ))
 
-    data = models.PostBody_Similarity_Gene(
-        set1=set1,
-        genes=[x.name for x in Ontology.genes]
+
+@router.get(
+    '/similarity/gene/all/stream',
+    tags=['similarity', 'terms', 'gene'],
+    response_class=StreamingResponse,
+    responses=NDJSON_RESPONSE
     )
-    res = await batch_gene_similarity(
-        data=data,
-        method=method,
-        combine=combine,
-        kind=kind
+async def all_gene_similarity_stream(
+    set1: str = Query(..., example='HP:0007401,HP:0010885,HP:0006530'),
+    method: str = 'graphic',
+    combine: str = 'funSimAvg',
+    kind: str = 'omim',
+    min_similarity: Optional[float] = None
+) -> StreamingResponse:
+    """
+    Calculate Similarity scores between query set and all genes
+    and stream the results
+
+    Every similarity score is sent as a single line of JSON as soon
+    as it is calculated (``application/x-ndjson``).
+    """
+    metrics.observe_batch_size(
+        '/similarity/gene/all/stream',
+        len(Ontology.genes)
     )
-    return res
+    selection = TopK(min_similarity=min_similarity)
+    scores = terms._stream_hpo_scores(
+        set1,
+        _gene_named_sets(x.name for x in Ontology.genes),
+        method,
+        combine,
+        kind
+    )
+    return await ndjson_response(
+        res for res in scores if selection.keep(res)
+    )
+
+
+def _selection(
+    limit: Optional[int],
+    min_similarity: Optional[float],
+    sort: str
+) -> TopK:
+    try:
+        return TopK(limit, min_similarity, sort, key=terms.SIMILARITY)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid `limit` or `sort` parameter"
+        )
+
+
+def _omim_registry() -> AnnotationSets:
+    return omim_sets or AnnotationSets([])
+
+
+def _gene_registry() -> AnnotationSets:
+    return gene_sets or AnnotationSets([])
+
+
+def _omim_named_sets(
+    omim_diseases: Iterable[int]
+) -> Iterator[terms.NamedSet]:
+    registry = _omim_registry()
+    for other in omim_diseases:
+        try:
+            disease = Omim.get(other)
+            yield (str(other), registry.hposet(disease), None)
+        except (KeyError, RuntimeError):
+            yield (str(other), None, f"unknown Omim disease {other}")
+
+
+def _gene_named_sets(genes: Iterable[str]) -> Iterator[terms.NamedSet]:
+    registry = _gene_registry()
+    for other in genes:
+        try:
+            actual_gene = Gene.get(other)
+            yield (other, registry.hposet(actual_gene), None)
+        except (KeyError, RuntimeError):
+            yield (other, None, f"unknown gene {other}")
+
+
+def _ranked_batch(
+    set1: str,
+    scores: List[terms.Score],
+    selection: TopK,
+    output_format: str,
+    include_set1: bool,
+    media: str
+) -> Any:
+    """
+    The response of the sharded ``/all`` similarity requests,
+    from the merged scores of all shards
+    """
+    hposet = get_hpo_set(set1)
+    selected = selection.select(scores)
+    with stage('json'):
+        return terms._batch_content(
+            hposet,
+            selected,
+            output_format,
+            include_set1,
+            media
+        )
+
+
+def _omim_shard_similarity(
+    omim_diseases: List[int],
+    set1: str,
+    method: str,
+    combine: str,
+    kind: str,
+    selection: TopK
+) -> List[terms.Score]:
+    """
+    Similarity scores of one shard of OMIM diseases.
+    Runs inside a forked worker process of the sharded executor
+    """
+    return selection.select(terms._iter_scores(
+        get_hpo_set(set1),
+        _omim_named_sets(omim_diseases),
+        method,
+        combine,
+        kind
+    ))
+
+
+def _gene_shard_similarity(
+    genes: List[str],
+    set1: str,
+    method: str,
+    combine: str,
+    kind: str,
+    selection: TopK
+) -> List[terms.Score]:
+    """
+    Similarity scores of one shard of genes.
+    Runs inside a forked worker process of the sharded executor
+    """
+    return selection.select(terms._iter_scores(
+        get_hpo_set(set1),
+        _gene_named_sets(genes),
+        method,
+        combine,
+        kind
+    ))
@@ -0,0 +1,60 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from pyhpoapi.stages import stages
+
+router = APIRouter()
+
+
+@router.get(
+    '/live',
+    response_description='Liveness of the server'
+)
+async def live() -> JSONResponse:
+    """
+    Indicates if the server is running
+
+    Returns HTTP 503 if the startup failed and the server
+    should be restarted.
+
+    Returns
+    -------
+    dict
+        ``status`` and, if the startup failed, the ``error``
+    """
+    if stages.error is not None:
+        return JSONResponse(
+            status_code=503,
+            content={'status': 'failed', 'error': stages.error}
+        )
+    return JSONResponse(content={'status': 'ok'})
+
+
+@router.get(
+    '/ready',
+    response_description='Readiness of the server'
+)
+async def ready() -> JSONResponse:
+    """
+    Indicates if the server can handle requests
+
+    The server is ready as soon as the Ontology is loaded.
+    Enrichment requests that arrive before the enrichment models
+    are built wait for them. With worker processes, the server is
+    only ready after all stages are completed.
+
+    Returns HTTP 503 until the server is ready.
+
+    Returns
+    -------
+    dict
+        * **ready** - If the server is ready
+        * **stages** - The time in seconds after which every startup
+          stage was completed, ``null`` if it is not completed yet.
+          Stages are ``ontology``, ``indicies`` and ``enrichment``
+    """
+    is_ready = stages.is_ready()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={'ready': is_ready, 'stages': stages.status()}
+    )
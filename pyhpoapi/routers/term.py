@@ -3,9 +3,11 @@ from typing import List, Dict
 
 from pyhpo import HPOSet
 from pyhpoapi.helpers import get_hpo_term
-from pyhpoapi import models
+from pyhpoapi import fragments, models, responses
+from pyhpoapi.responses import json_response
+from pyhpoapi.timing import TimedRoute, stage
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get(
@@ -39,9 +41,15 @@ async def HPO_term(
         HPOTerm as JSON object
 
     """
-    term = get_hpo_term(term_id).toJSON(bool(verbose))
-    res = models.HpoTerm(**term)
-    return res.model_dump()
+    term = get_hpo_term(term_id)
+    if responses.ENABLED:
+        return json_response(
+            fragments.item_fragment(term, models.HpoTerm, bool(verbose))
+        )
+    with stage('json'):
+        data = term.toJSON(bool(verbose))
+    with stage('validate'):
+        return models.HpoTerm(**data).model_dump()
 
 
 @router.get(
@@ -75,10 +83,11 @@ async def parent_terms(
         Array of HPOTerms
 
     """
-    return [
-        t.toJSON(verbose)
-        for t in get_hpo_term(term_id).parents
-        ]
+    term = get_hpo_term(term_id)
+    with stage('json'):
+        return json_response(
+            fragments.items_json(term.parents, models.HpoTerm, verbose)
+        )
 
 
 @router.get(
@@ -113,10 +122,11 @@ async def child_terms(
         Array of HPOTerms
 
     """
-    return [
-        t.toJSON(verbose)
-        for t in get_hpo_term(term_id).children
-        ]
+    term = get_hpo_term(term_id)
+    with stage('json'):
+        return json_response(
+            fragments.items_json(term.children, models.HpoTerm, verbose)
+        )
 
 
 @router.get(
@@ -168,12 +178,18 @@ async def neighbour_terms(
             if t != term and t not in parents and t not in children:
                 neighbours.add(t)
 
-    res = {
-        'parents': [t.toJSON(verbose) for t in parents],
-        'children': [t.toJSON(verbose) for t in children],
-        'neighbours': [t.toJSON(verbose) for t in neighbours]
-    }
-    return res
+    with stage('json'):
+        return json_response(fragments.object_json({
+            'parents': fragments.items_json(
+                parents, models.HpoTerm, verbose
+            ),
+            'children': fragments.items_json(
+                children, models.HpoTerm, verbose
+            ),
+            'neighbours': fragments.items_json(
+                neighbours, models.HpoTerm, verbose
+            )
+        }))
 
 
 @router.get(
@@ -205,10 +221,9 @@ async def term_associated_genes(
     array
         Array of Genes
     """
-    return [
-        g.toJSON()
-        for g in get_hpo_term(term_id).genes
-    ]
+    term = get_hpo_term(term_id)
+    with stage('json'):
+        return json_response(fragments.items_json(term.genes, models.Gene))
 
 
 @router.get(
@@ -239,7 +254,8 @@ async def term_associated_OMIM_diseases(
     array
         Array of OMIM diseases
     """
-    return [
-        d.toJSON()
-        for d in get_hpo_term(term_id).omim_diseases
-    ]
+    term = get_hpo_term(term_id)
+    with stage('json'):
+        return json_response(
+            fragments.items_json(term.omim_diseases, models.Omim)
+        )
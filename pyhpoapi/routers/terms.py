@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Query, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, Header, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import (
+    Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+)
 
 from pyhpo import Ontology
 from pyhpo.stats import EnrichmentModel
@@ -9,16 +12,55 @@ except ImportError:
     from pyhpoapi.helpers import MockHPOEnrichment as HPOEnrichment
 
 from pyhpo import HPOTerm
+from pyhpo import HPOSet
+
+from pyhpoapi.helpers import get_hpo_set, set_similarity
+from pyhpoapi.executor import run_compute
+from pyhpoapi.bitsets import AnnotationIndex
+from pyhpoapi.enrichment import (
+    ranked_enrichment, VectorEnrichmentModel, VectorHPOEnrichment
+)
+from pyhpoapi.search import SearchIndex
+from pyhpoapi.streaming import ndjson_response, NDJSON_RESPONSE
+from pyhpoapi.responses import json_response
+from pyhpoapi.stages import stages
+from pyhpoapi.timing import TimedRoute, stage
+from pyhpoapi import binary, fragments, metrics, models, responses
+
+router = APIRouter(route_class=TimedRoute)
+
+gene_model: Optional[Union[EnrichmentModel, VectorEnrichmentModel]] = None
+omim_model: Optional[Union[EnrichmentModel, VectorEnrichmentModel]] = None
+hpo_model_genes: Optional[Union[HPOEnrichment, VectorHPOEnrichment]] = None
+hpo_model_omim: Optional[Union[HPOEnrichment, VectorHPOEnrichment]] = None
+search_index: Optional[SearchIndex] = None
+gene_index: Optional[AnnotationIndex] = None
+omim_index: Optional[AnnotationIndex] = None
+
+# Name, HPOSet and error message of an HPOSet to compare against
+NamedSet = Tuple[str, Optional[HPOSet], Optional[str]]
+
+# Output formats of batch similarity requests
+FORMATS = ('rows', 'columnar')
+
+# Response of batch similarity requests, in any of the ``FORMATS``
+BatchResponse = Union[
+    models.SimilarityScore_Batch,
+    models.SimilarityScore_Columnar
+]
+
 
-from pyhpoapi.helpers import get_hpo_set
-from pyhpoapi import models
+class Score(NamedTuple):
+    """
+    Similarity score to one other set
+    """
+    name: str
+    similarity: Optional[float]
+    error: Optional[str]
 
-router = APIRouter()
 
-gene_model: Optional[EnrichmentModel] = None
-omim_model: Optional[EnrichmentModel] = None
-hpo_model_genes: Optional[HPOEnrichment] = None
-hpo_model_omim: Optional[HPOEnrichment] = None
+# Index of the similarity in a :class:`Score`, see :class:`TopK`
+SIMILARITY = 1
 
 
 @router.get(
@@ -55,14 +97,35 @@ async def HPO_search(
         Array of HPOTerms
 
     """
-    res = []
-    for idx, term in enumerate(Ontology.search(query)):
-        if idx > (offset + limit-1):
-            break
-        if idx < offset:
-            continue
-        res.append(term)
-    return [t.toJSON(bool(verbose)) for t in res]
+    return json_response(
+        await run_compute('lookup', _search, query, verbose, limit, offset)
+    )
+
+
+def _search(
+    query: str,
+    verbose: bool,
+    limit: int,
+    offset: int
+) -> List[dict]:
+    if search_index is not None:
+        offset = max(offset, 0)
+        res = search_index.search(query)[offset:offset+max(limit, 0)]
+    else:
+        res = []
+        for idx, term in enumerate(Ontology.search(query)):
+            if idx > (offset + limit-1):
+                break
+            if idx < offset:
+                continue
+            res.append(term)
+    with stage('json'):
+        return fragments.items_json(
+            res,
+            models.HpoTerm,
+            bool(verbose),
+            exclude_none=True
+        )
 
 
 @router.get(
@@ -96,14 +159,21 @@ async def intersecting_OMIM_diseases(
     array
         Array of OMIM diseases
     """
+    return json_response(
+        await run_compute('lookup', _intersecting_OMIM_diseases, set1)
+    )
+
+
+def _intersecting_OMIM_diseases(set1: str) -> List[dict]:
     hposet = get_hpo_set(set1)
-    diseases = hposet.omim_diseases()
-    for term in hposet:
-        diseases = diseases & term.omim_diseases
-    return [
-            d.toJSON()
-            for d in diseases
-        ]
+    if omim_index is not None:
+        diseases = omim_index.intersection(hposet)
+    else:
+        diseases = hposet.omim_diseases()
+        for term in hposet:
+            diseases = diseases & term.omim_diseases
+    with stage('json'):
+        return fragments.items_json(diseases, models.Omim)
 
 
 @router.get(
@@ -136,14 +206,21 @@ async def intersecting_genes(
     array
         Array of Genes
     """
+    return json_response(
+        await run_compute('lookup', _intersecting_genes, set1)
+    )
+
+
+def _intersecting_genes(set1: str) -> List[dict]:
     hposet = get_hpo_set(set1)
-    genes = hposet.all_genes()
-    for term in hposet:
-        genes = genes & term.genes
-    return [
-            g.toJSON()
-            for g in genes
-        ]
+    if gene_index is not None:
+        genes = gene_index.intersection(hposet)
+    else:
+        genes = hposet.all_genes()
+        for term in hposet:
+            genes = genes & term.genes
+    with stage('json'):
+        return fragments.items_json(genes, models.Gene)
 
 
 @router.get(
@@ -175,12 +252,19 @@ async def union_OMIM_diseases(
     array
         Array of OMIM diseases
     """
+    return json_response(
+        await run_compute('lookup', _union_OMIM_diseases, set1)
+    )
+
+
+def _union_OMIM_diseases(set1: str) -> List[dict]:
     hposet = get_hpo_set(set1)
-    diseases = hposet.omim_diseases()
-    return [
-            d.toJSON()
-            for d in diseases
-        ]
+    if omim_index is not None:
+        diseases = omim_index.union(hposet)
+    else:
+        diseases = hposet.omim_diseases()
+    with stage('json'):
+        return fragments.items_json(diseases, models.Omim)
 
 
 @router.get(
@@ -212,12 +296,19 @@ async def union_genes(
     array
         Array of Genes
     """
+    return json_response(
+        await run_compute('lookup', _union_genes, set1)
+    )
+
+
+def _union_genes(set1: str) -> List[dict]:
     hposet = get_hpo_set(set1)
-    genes = hposet.all_genes()
-    return [
-            g.toJSON()
-            for g in genes
-        ]
+    if gene_index is not None:
+        genes = gene_index.union(hposet)
+    else:
+        genes = hposet.all_genes()
+    with stage('json'):
+        return fragments.items_json(genes, models.Gene)
 
 
 @router.get(
@@ -287,20 +378,35 @@ async def terms_similarity(
     float
         The similarity score to the other HPOSet
     """
+    return await run_compute(
+        'similarity',
+        _terms_similarity,
+        set1,
+        set2,
+        method,
+        combine,
+        kind
+    )
+
+
+def _terms_similarity(
+    set1: str,
+    set2: str,
+    method: str,
+    combine: str,
+    kind: str
+) -> dict:
     hposet1 = get_hpo_set(set1)
     hposet2 = get_hpo_set(set2)
 
     try:
-        return {
-            'set1': hposet1.toJSON(),
-            'set2': hposet2.toJSON(),
-            'similarity': hposet1.similarity(
-                hposet2,
-                kind=kind,
-                method=method,
-                combine=combine
-            )
-        }
+        similarity = set_similarity(
+            hposet1,
+            hposet2,
+            kind=kind,
+            method=method,
+            combine=combine
+        )
     except NotImplementedError:
         raise HTTPException(
             status_code=400,
@@ -317,6 +423,12 @@ async def terms_similarity(
             detail="Invalid information content kind specified"
             )
 
+    with stage('json'):
+        return {
+            'set1': hposet1.toJSON(),
+            'set2': hposet2.toJSON(),
+            'similarity': similarity
+        }
 
 
 @router.post('/similarity/', include_in_schema=False)
@@ -324,13 +436,17 @@ async def terms_similarity(
     '/similarity',
     tags=['similarity'],
     response_description='Similarity scores',
-    response_model=models.SimilarityScore_Batch
+    response_model=BatchResponse,
+    responses=binary.BINARY_RESPONSES
 )
 async def batch_similarity(
     data: models.PostBody_HpoSets,
     method: str = 'graphic',
     combine: str = 'funSimAvg',
-    kind: str = 'omim'
+    kind: str = 'omim',
+    output_format: str = Query('rows', alias='format'),
+    include_set1: bool = True,
+    accept: Optional[str] = Header(None, include_in_schema=False)
 ) -> dict:
     """
     Calculate similarity scores between one base and
@@ -380,64 +496,342 @@ async def batch_similarity(
         * **funSimMax** - Schlicker A, BMC Bioinformatics, (2006)
         * **BMA** - Deng Y, et. al., PLoS One, (2015)
 
+    format: str, default ``rows``
+        The format of the response
+
+        * **rows** - One object with name, similarity and error
+          for every other set
+        * **columnar** - Parallel arrays of all ``names`` and
+          ``scores``. ``errors`` maps the index of the failed sets
+          to their error message
+
+    include_set1: bool, default ``True``
+        Include the terms of ``set1`` in ``columnar`` responses
+
+    The response is sent as MessagePack or as Arrow IPC stream,
+    if the ``Accept`` header requests it:
+
+    * ``application/msgpack`` - Same structure as the JSON response
+    * ``application/vnd.apache.arrow.stream`` - Columns ``name``,
+      ``similarity`` (``float64``) and ``error``, independent of
+      ``format``. ``set1`` is part of the schema metadata
+
     Returns
     -------
     object
         The similarity scores to the other HPOSets
     """
+    _check_format(output_format)
+    media = binary.negotiate(accept)
+    metrics.observe_batch_size('/terms/similarity', len(data.other_sets))
+    return binary.respond(media, await run_compute(
+        'batch',
+        _batch_similarity,
+        data,
+        method,
+        combine,
+        kind,
+        output_format,
+        include_set1,
+        media
+    ))
+
+
+def _batch_similarity(
+    data: models.PostBody_HpoSets,
+    method: str,
+    combine: str,
+    kind: str,
+    output_format: str = 'rows',
+    include_set1: bool = True,
+    media: str = binary.JSON
+) -> Any:
     set1 = get_hpo_set(data.set1)
-    other_sets = []
-    for other in data.other_sets:
-        res = {'name': other.name, 'similarity': 0.0, 'error': None}
-        try:
-            set2 = get_hpo_set(other.set2)
-            res['similarity'] = set1.similarity(
-                set2,
-                kind=kind,
-                method=method,
-                combine=combine
+    scores = list(_iter_scores(
+        set1,
+        _parse_named_sets(data.other_sets),
+        method,
+        combine,
+        kind
+    ))
+    with stage('json'):
+        return _batch_content(
+            set1,
+            scores,
+            output_format,
+            include_set1,
+            media
+        )
+
+
+def _check_format(output_format: str) -> None:
+    """
+    Raises HTTP 400 for unknown output formats of batch requests
+    """
+    if output_format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid `format` parameter"
+        )
+
+
+def _batch_content(
+    set1: HPOSet,
+    scores: List[Score],
+    output_format: str = 'rows',
+    include_set1: bool = True,
+    media: str = binary.JSON
+) -> Any:
+    """
+    The response of batch similarity requests in the negotiated
+    format of :func:`binary.negotiate`
+
+    See :func:`_batch_json` for the other parameters
+
+    Returns
+    -------
+    dict or bytes
+        Only ``json`` responses can be a dict
+    """
+    if media == binary.ARROW:
+        names, similarities, errors = _columns(scores)
+        return binary.arrow_body(
+            {'name': names, 'similarity': similarities, 'error': errors},
+            floats=['similarity'],
+            metadata={'set1': _set1_dicts(set1)} if include_set1 else None
+        )
+    if media == binary.MSGPACK:
+        if output_format == 'columnar':
+            return binary.msgpack_body(
+                _columnar(set1 if include_set1 else None, scores)
             )
+        return binary.msgpack_body({
+            'set1': _set1_dicts(set1),
+            'other_sets': [score._asdict() for score in scores]
+        })
+    return _batch_json(set1, scores, output_format, include_set1)
+
+
+def _batch_json(
+    set1: HPOSet,
+    scores: List[Score],
+    output_format: str = 'rows',
+    include_set1: bool = True
+) -> Any:
+    """
+    The response of batch similarity requests
+
+    Parameters
+    ----------
+    set1: HPOSet
+        The query set
+    scores: list of Score
+        The similarity scores to all other sets
+    output_format: str, default ``rows``
+        ``rows`` or ``columnar``
+    include_set1: bool, default ``True``
+        Include ``set1`` in ``columnar`` responses
+
+    Returns
+    -------
+    dict or bytes
+        ``columnar`` responses are always encoded, ``rows`` responses
+        only for fast JSON responses
+    """
+    if output_format == 'columnar':
+        return responses.dumps(
+            _columnar(set1 if include_set1 else None, scores)
+        )
+    return fragments.object_json({
+        'set1': fragments.hposet_json(set1),
+        'other_sets': [score._asdict() for score in scores]
+    })
+
+
+def _set1_dicts(set1: HPOSet) -> List[dict]:
+    """
+    The query set of batch responses, see :func:`fragments.hposet_terms`
+    """
+    return [term.toJSON() for term in fragments.hposet_terms(set1)]
+
+
+def _columns(scores: List[Score]) -> Tuple[Tuple[Any, ...], ...]:
+    """
+    The names, similarity scores and errors as separate columns
+    """
+    if not scores:
+        return ((), (), ())
+    return tuple(zip(*scores))
+
+
+def _columnar(set1: Optional[HPOSet], scores: List[Score]) -> Dict[str, Any]:
+    """
+    The scores as parallel arrays, without a dict for every row
+    """
+    names, similarities, errors = _columns(scores)
+    res: Dict[str, Any] = {}
+    if set1 is not None:
+        res['set1'] = _set1_dicts(set1)
+    res['names'] = names
+    res['scores'] = similarities
+    res['errors'] = {
+        str(idx): error
+        for idx, error in enumerate(errors)
+        if error is not None
+    }
+    return res
+
+
+@router.post(
+    '/similarity/stream',
+    tags=['similarity'],
+    response_class=StreamingResponse,
+    responses=NDJSON_RESPONSE
+)
+async def batch_similarity_stream(
+    data: models.PostBody_HpoSets,
+    method: str = 'graphic',
+    combine: str = 'funSimAvg',
+    kind: str = 'omim'
+) -> StreamingResponse:
+    """
+    Calculate similarity scores between one base and
+    several other HPOSets and stream the results
+
+    Same as ``POST /terms/similarity``, but every similarity score
+    is sent as a single line of JSON as soon as it is calculated
+    (``application/x-ndjson``).
+    """
+    metrics.observe_batch_size(
+        '/terms/similarity/stream',
+        len(data.other_sets)
+    )
+    return await ndjson_response(_stream_hpo_scores(
+        data.set1,
+        _parse_named_sets(data.other_sets),
+        method,
+        combine,
+        kind
+    ))
+
+
+def _parse_named_sets(
+    other_sets: Iterable[models.NamedHpoSet]
+) -> Iterator[NamedSet]:
+    for other in other_sets:
+        try:
+            yield (other.name, get_hpo_set(other.set2), None)
         except HTTPException as ex:
-            res['similarity'] = None
             if ex.headers:
-                res['error'] = ex.headers.get(
-                    'X-TermNotFound', 'Unknown error'
-                )
+                error = ex.headers.get('X-TermNotFound', 'Unknown error')
             else:
-                res['error'] = 'Unknown error'
-        except NotImplementedError:
-            raise HTTPException(
-                status_code=400,
-                detail="The similarity method is not properly implemented"
-                )
-        except RuntimeError:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid `method` or `combine` parameter"
-                )
-        except AttributeError:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid information content kind specified"
+                error = 'Unknown error'
+            yield (other.name, None, error)
+
+
+def _iter_scores(
+    set1: HPOSet,
+    named_sets: Iterable[NamedSet],
+    method: str,
+    combine: str,
+    kind: str
+) -> Iterator[Score]:
+    """
+    Yields the similarity scores of ``set1`` to already built HPOSets
+
+    Parameters
+    ----------
+    set1: HPOSet
+        The query set
+    named_sets: iterable of tuple
+        Every tuple contains the name of the other set, the HPOSet
+        and an error message. If the HPOSet is ``None``, the similarity
+        is not calculated and the error is returned instead.
+
+    Yields
+    ------
+    Score
+        The similarity score to one other set
+    """
+    for name, set2, error in named_sets:
+        similarity = None
+        if set2 is not None:
+            try:
+                similarity = set_similarity(
+                    set1,
+                    set2,
+                    kind=kind,
+                    method=method,
+                    combine=combine
                 )
+            except NotImplementedError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="The similarity method is not properly implemented"
+                    )
+            except RuntimeError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Invalid `method` or `combine` parameter"
+                    )
+            except AttributeError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Invalid information content kind specified"
+                    )
+
+        yield Score(name, similarity, error)
+
+
+def _iter_hpo_scores(
+    set1: HPOSet,
+    named_sets: Iterable[NamedSet],
+    method: str,
+    combine: str,
+    kind: str
+) -> Iterator[dict]:
+    """
+    Same as :func:`_iter_scores`, but yields a dict for every score
+    """
+    for score in _iter_scores(set1, named_sets, method, combine, kind):
+        yield score._asdict()
 
-        other_sets.append(res)
-    return {
-        'set1': set1.toJSON(),
-        'other_sets': other_sets
-    }
+
+def _stream_hpo_scores(
+    set1: str,
+    named_sets: Iterable[NamedSet],
+    method: str,
+    combine: str,
+    kind: str
+) -> Iterator[dict]:
+    """
+    Same as :func:`_iter_hpo_scores`, but the query set is resolved
+    only when the first row is requested
+
+    :func:`streaming.ndjson_response` requests all rows in the
+    threadpool, so no HPOSet is built in the event loop.
+    """
+    yield from _iter_hpo_scores(
+        get_hpo_set(set1),
+        named_sets,
+        method,
+        combine,
+        kind
+    )
 
 
 @router.get(
     '/enrichment/genes',
     tags=['enrichment'],
-    response_description='Enrichment scores'
+    response_description='Enrichment scores',
+    responses=binary.BINARY_RESPONSES
 )
 async def gene_enrichment(
     set1: str = Query(..., example='HP:0007401,HP:0010885,HP:0006530'),
     method: str = 'hypergeom',
     limit: int = 10,
-    offset: int = 0
+    offset: int = 0,
+    accept: Optional[str] = Header(None, include_in_schema=False)
 ) -> List[dict]:
     """
     Enrichment of genes in an HPOSet
@@ -460,38 +854,61 @@ async def gene_enrichment(
     offset: int, default 0
         For paging, the offset of the first result to show
 
+    The response is sent as MessagePack or as Arrow IPC stream,
+    if the ``Accept`` header requests it, see ``POST /terms/similarity``
+
     Returns
     -------
     list of dict
         A ordered list with enriched genes
     """
+    media = binary.negotiate(accept)
+    return binary.respond(media, await run_compute(
+        'enrichment',
+        _gene_enrichment,
+        set1,
+        method,
+        limit,
+        offset,
+        media
+    ))
+
+
+def _gene_enrichment(
+    set1: str,
+    method: str,
+    limit: int,
+    offset: int,
+    media: str = binary.JSON
+) -> Any:
+    if gene_model is None:
+        stages.wait('enrichment')
     assert gene_model, 'The Gene Enrichment Model is not defined'
     hposet = get_hpo_set(set1)
     try:
-        res = gene_model.enrichment(method, hposet)
+        res = ranked_enrichment(gene_model, method, hposet, limit, offset)
     except (NotImplementedError, RuntimeError):
         raise HTTPException(
             status_code=400,
             detail="Invalid parameter"
             )
 
-    return [{
-        'gene': x['item'].toJSON(),
-        'count': x['count'],
-        'enrichment': x['enrichment']
-    } for x in res[offset:(limit+offset)]]
+    with stage('json'):
+        return _enrichment_content('gene', res, media)
 
 
 @router.get(
     '/enrichment/omim',
     tags=['enrichment'],
-    response_description='Enrichment scores'
+    response_description='Enrichment scores',
+    responses=binary.BINARY_RESPONSES
 )
 async def omim_enrichment(
     set1: str = Query(..., example='HP:0007401,HP:0010885,HP:0006530'),
     method: str = 'hypergeom',
     limit: int = 10,
-    offset: int = 0
+    offset: int = 0,
+    accept: Optional[str] = Header(None, include_in_schema=False)
 ) -> List[dict]:
     """
     Enrichment of OMIM diseases in an HPOSet
@@ -517,27 +934,93 @@ async def omim_enrichment(
     offset: int, default 0
         For paging, the offset of the first result to show
 
+    The response is sent as MessagePack or as Arrow IPC stream,
+    if the ``Accept`` header requests it, see ``POST /terms/similarity``
+
     Returns
     -------
     list of dict
         A ordered list with enriched genes
     """
+    media = binary.negotiate(accept)
+    return binary.respond(media, await run_compute(
+        'enrichment',
+        _omim_enrichment,
+        set1,
+        method,
+        limit,
+        offset,
+        media
+    ))
+
+
+def _omim_enrichment(
+    set1: str,
+    method: str,
+    limit: int,
+    offset: int,
+    media: str = binary.JSON
+) -> Any:
+    if omim_model is None:
+        stages.wait('enrichment')
     assert omim_model, 'The OMIM Enrichment Model is not defined'
 
     hposet = get_hpo_set(set1)
     try:
-        res = omim_model.enrichment(method, hposet)
+        res = ranked_enrichment(omim_model, method, hposet, limit, offset)
     except (NotImplementedError, RuntimeError):
         raise HTTPException(
             status_code=400,
             detail="Invalid parameter"
             )
 
+    with stage('json'):
+        return _enrichment_content('omim', res, media)
+
+
+def _enrichment_content(key: str, res: List[dict], media: str) -> Any:
+    """
+    The enrichment scores in the negotiated format of
+    :func:`binary.negotiate`
+
+    Arrow IPC streams contain the columns ``key`` (the gene or disease),
+    ``count`` and ``enrichment`` (``float64``)
+    """
+    if media == binary.ARROW:
+        return binary.arrow_body(
+            {
+                key: [x['item'].toJSON() for x in res],
+                'count': [x['count'] for x in res],
+                'enrichment': [x['enrichment'] for x in res]
+            },
+            floats=['enrichment']
+        )
+    if media == binary.MSGPACK:
+        return binary.msgpack_body(_enrichment_rows(key, res))
+    return _enrichment_json(key, res)
+
+
+def _enrichment_rows(key: str, res: List[dict]) -> List[dict]:
     return [{
-        'omim': x['item'].toJSON(),
+        key: x['item'].toJSON(),
         'count': x['count'],
         'enrichment': x['enrichment']
-    } for x in res[offset:(limit+offset)]]
+    } for x in res]
+
+
+def _enrichment_json(key: str, res: List[dict]) -> Any:
+    """
+    The enrichment scores, with the gene or disease under ``key``
+    """
+    if not responses.ENABLED:
+        return _enrichment_rows(key, res)
+    return fragments.array(
+        fragments.object_json({
+            key: fragments.item_fragment(x['item']),
+            'count': x['count'],
+            'enrichment': x['enrichment']
+        }) for x in res
+    )
 
 
 @router.get('/suggest/', include_in_schema=False)
@@ -591,7 +1074,33 @@ async def hpo_suggest(
     n_omim: int, default 5
         Consider HPO terms from the Top X enriched OMIM diseases
     """
-
+    return json_response(await run_compute(
+        'enrichment',
+        _hpo_suggest,
+        set1,
+        method,
+        limit,
+        offset,
+        n_genes,
+        n_omim
+    ))
+
+
+def _hpo_suggest(
+    set1: str,
+    method: str,
+    limit: int,
+    offset: int,
+    n_genes: int,
+    n_omim: int
+) -> List[dict]:
+    if (
+        gene_model is None or
+        omim_model is None or
+        hpo_model_genes is None or
+        hpo_model_omim is None
+    ):
+        stages.wait('enrichment')
     assert gene_model, 'The Gene Enrichment Model is not defined'
     assert omim_model, 'The OMIM Enrichment Model is not defined'
     assert hpo_model_genes, 'The HPO Gene Enrichment Model is not defined'
@@ -632,7 +1141,8 @@ async def hpo_suggest(
         hpo = res.pop(0)['hpo']
         if hpo not in hpos and hpo not in hposet:
             hpos.append(hpo)
-    return [x.toJSON() for x in hpos]
+    with stage('json'):
+        return fragments.items_json(hpos, models.HpoTerm)
 
 
 @router.get('/hierarchy/', include_in_schema=False)
@@ -644,6 +1154,12 @@ async def hpo_suggest(
 async def hierarchy_graph(
     set1: str = Query(..., example='HP:0007401,HP:0010885,HP:0006530')
 ) -> List[dict]:
+    return json_response(
+        await run_compute('lookup', _hierarchy_graph, set1)
+    )
+
+
+def _hierarchy_graph(set1: str) -> Union[List[dict], bytes]:
     hposet = get_hpo_set(set1)
 
     children = set()
@@ -654,11 +1170,25 @@ async def hierarchy_graph(
     for term in hposet:
         children.add(term)
 
-    return [{
+    with stage('json'):
+        if not responses.ENABLED:
+            return [_hierarchy_term(term) for term in children]
+        return fragments.array(
+            fragments.fragment('hierarchy', term, _encode_hierarchy_term)
+            for term in children
+        )
+
+
+def _hierarchy_term(term: HPOTerm) -> dict:
+    return {
         'name': term.name,
         'omim': term.information_content['omim'],
         'gene': term.information_content['gene'],
         'imports': [t.name for t in term.children],
         'diseases': [d.name for d in term.omim_diseases],
         'genes': [g.name for g in term.genes]
-    } for term in (children)]
+    }
+
+
+def _encode_hierarchy_term(term: HPOTerm) -> bytes:
+    return responses.dumps(_hierarchy_term(term))
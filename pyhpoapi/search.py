@@ -0,0 +1,115 @@
+"""
+In-memory substring search index for HPOTerm names and synonyms
+
+:func:`pyhpo.Ontology.search` scans the name and all synonyms of
+every term for every query. The :class:`SearchIndex` is built once
+at startup instead and narrows down the candidates using an n-gram
+index before verifying the actual substring match.
+"""
+from typing import Dict, Iterable, List
+
+from pyhpo import HPOTerm
+
+from pyhpoapi.bitsets import bit_positions
+from pyhpoapi.cache import LRUCache
+
+# Length of the n-grams in the index. Queries shorter than this
+# are looked up via all shorter n-grams, which are indexed as well
+NGRAM_SIZE = 3
+
+
+class SearchIndex:
+    """
+    n-gram index over the names and synonyms of all HPOTerms
+
+    Every n-gram (of length 1 to ``NGRAM_SIZE``) maps to a bitset
+    of all terms that contain it. A query is answered by AND-ing the
+    bitsets of all n-grams of the query and verifying the remaining
+    candidates. The results are identical to
+    :func:`pyhpo.Ontology.search`, including the order.
+
+    Parameters
+    ----------
+    terms: iterable of HPOTerm
+        All terms to index, in the order of the Ontology
+    cache_size: int, default 256
+        Number of search results to cache, so that paging through
+        the results of a query does not search again.
+    """
+    def __init__(self, terms: Iterable[HPOTerm], cache_size: int = 256):
+        self._terms: List[HPOTerm] = []
+        self._texts: List[List[str]] = []
+        self._grams: Dict[str, int] = {}
+        self._cache = LRUCache(cache_size)
+
+        for idx, term in enumerate(terms):
+            texts = [term.name.lower()] + [x.lower() for x in term.synonym]
+            self._terms.append(term)
+            self._texts.append(texts)
+            bit = 1 << idx
+            for gram in set(gram for text in texts for gram in _ngrams(text)):
+                self._grams[gram] = self._grams.get(gram, 0) | bit
+
+        self._all = (1 << len(self._terms)) - 1
+
+    def search(self, query: str) -> List[HPOTerm]:
+        """
+        Returns all terms that contain ``query`` in their name or synonyms
+
+        Parameters
+        ----------
+        query: str
+            The substring to search for
+
+        Returns
+        -------
+        list of HPOTerm
+            All matching terms, in the order of the Ontology
+        """
+        query = query.lower()
+        res = self._cache.get(query)
+        if res is None:
+            if not query:
+                res = list(self._terms)
+            elif len(query) <= NGRAM_SIZE:
+                # The query is an n-gram itself, all candidates match
+                res = [self._terms[idx] for idx in self._candidates(query)]
+            else:
+                res = [
+                    self._terms[idx]
+                    for idx in self._candidates(query)
+                    if any(query in text for text in self._texts[idx])
+                ]
+            self._cache.set(query, res)
+        return res
+
+    def _candidates(self, query: str) -> List[int]:
+        bits = self._all
+        for gram in set(_query_ngrams(query)):
+            bits &= self._grams.get(gram, 0)
+            if not bits:
+                return []
+        return bit_positions(bits)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+def _ngrams(text: str) -> Iterable[str]:
+    """
+    All n-grams of ``text`` with a length of 1 to ``NGRAM_SIZE``
+    """
+    for size in range(1, NGRAM_SIZE + 1):
+        for i in range(len(text) - size + 1):
+            yield text[i:i+size]
+
+
+def _query_ngrams(query: str) -> Iterable[str]:
+    """
+    The longest possible n-grams of the query
+    """
+    if not query:
+        return
+    size = min(len(query), NGRAM_SIZE)
+    for i in range(len(query) - size + 1):
+        yield query[i:i+size]
@@ -0,0 +1,116 @@
+"""
+Selection of the best scoring results of large similarity batches
+
+Scoring a query set against all genes or diseases returns thousands
+of results, but clients are usually only interested in the best hits.
+:class:`TopK` keeps only the ``k`` best results in a bounded heap while
+scoring, so that memory, serialization and transfer cost scale with
+``k`` instead of the number of scored items.
+"""
+import heapq
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+SORT_OPTIONS = ('none', 'desc', 'asc')
+
+
+class TopK:
+    """
+    Selects the top ``limit`` similarity results
+
+    Parameters
+    ----------
+    limit: int, default ``None``
+        Maximum number of results to keep. ``None`` keeps all results
+    min_similarity: float, default ``None``
+        Only keep results with at least this similarity score.
+        Results without a similarity score (due to errors) are dropped.
+    sort: str, default ``none``
+        Order of the results
+
+        * **none** - Keep the input order. If ``limit`` is specified,
+          the results are ranked as with ``desc`` instead, so that
+          the best results are returned
+        * **desc** - Highest similarity first
+        * **asc** - Lowest similarity first
+    key: str or int, default ``similarity``
+        Key or index of the similarity score in every result, e.g.
+        ``1`` for tuples of name and similarity
+
+    Raises
+    ------
+    ValueError
+        Invalid ``limit`` or ``sort`` parameter
+    """
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+        sort: str = 'none',
+        key: Union[str, int] = 'similarity'
+    ) -> None:
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f'Invalid sort option {sort}')
+        if limit is not None and limit < 0:
+            raise ValueError('limit must not be negative')
+        if sort == 'none' and limit is not None:
+            sort = 'desc'
+        self.limit = limit
+        self.min_similarity = min_similarity
+        self.sort = sort
+        self.key = key
+
+    def keep(self, res: Any) -> bool:
+        """
+        Indicates if the result passes the ``min_similarity`` threshold
+        """
+        if self.min_similarity is None:
+            return True
+        return (
+            res[self.key] is not None and
+            res[self.key] >= self.min_similarity
+        )
+
+    def _key(self, res: Any, idx: int) -> Tuple[float, int]:
+        """
+        Heap key: The worst result has the smallest key.
+        On equal scores, the result that comes later in the input is worse
+        """
+        score = res[self.key]
+        if score is None:
+            score = float('-inf') if self.sort == 'desc' else float('inf')
+        if self.sort == 'asc':
+            score = -score
+        return (score, -idx)
+
+    def select(self, results: Iterable[Any]) -> List[Any]:
+        """
+        Selects the top results
+
+        ``results`` is consumed lazily, so that only ``limit`` results
+        are held in memory at any time.
+
+        Parameters
+        ----------
+        results: iterable of dict or tuple
+            Similarity results with (at least) a similarity score
+
+        Returns
+        -------
+        list
+            The selected results in the requested order
+        """
+        if self.sort == 'none':
+            return [res for res in results if self.keep(res)]
+
+        heap: List[Tuple[Tuple[float, int], Any]] = []
+        for idx, res in enumerate(results):
+            if not self.keep(res):
+                continue
+            item = (self._key(res, idx), res)
+            if self.limit is None or len(heap) < self.limit:
+                heapq.heappush(heap, item)
+            elif self.limit and item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+        heap.sort(key=lambda x: x[0], reverse=True)
+        return [res for _, res in heap]
@@ -1,10 +1,13 @@
 import os
 import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 
 from pyhpo import Ontology
 from pyhpo.stats import EnrichmentModel
@@ -15,8 +18,19 @@ except ImportError:
 
 import pyhpo
 
-from pyhpoapi.routers import term, terms, annotations
-from pyhpoapi import config
+from pyhpoapi.routers import term, terms, annotations, health
+from pyhpoapi import compression, config, metrics, profiling, snapshot, timing
+from pyhpoapi.executor import compute, ranking, forks_workers
+from pyhpoapi.bitsets import AnnotationIndex
+from pyhpoapi.registry import AnnotationSets
+from pyhpoapi.search import SearchIndex
+from pyhpoapi.helpers import similarity_cache, term_set_cache
+from pyhpoapi.fragments import fragment_cache
+from pyhpoapi.compression import response_cache
+from pyhpoapi.stages import stages, StartupGate, STAGES
+from pyhpoapi.enrichment import (
+    enrichment_cache, VectorEnrichmentModel, VectorHPOEnrichment
+)
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -41,7 +55,7 @@ def custom_openapi_wrapper(app):
     return custom_openapi
 
 
-def initialize_ontology() -> None:
+def load_ontology() -> None:
     data_dir = config.MASTER_DATA
 
     if data_dir == "":
@@ -51,15 +65,222 @@ def initialize_ontology() -> None:
         logger.info(f"Loading Ontology from {data_dir}")
         _ = Ontology(data_dir)
 
-    terms.gene_model = EnrichmentModel('gene')
-    terms.omim_model = EnrichmentModel('omim')
-    terms.hpo_model_genes = HPOEnrichment('gene')
-    terms.hpo_model_omim = HPOEnrichment('omim')
 
+def build_indicies() -> Dict[str, Any]:
+    """
+    Builds the search and annotation indicies
 
-def main():
+    Returns
+    -------
+    dict
+    """
+    return {
+        'search_index': SearchIndex(Ontology),
+        'gene_index': AnnotationIndex.genes(),
+        'omim_index': AnnotationIndex.omim(),
+        'omim_sets': AnnotationSets.omim(),
+        'gene_sets': AnnotationSets.genes(),
+    }
 
-    app = FastAPI()
+
+def build_enrichment_models(vector: bool) -> Dict[str, Any]:
+    """
+    Builds the enrichment models
+
+    Parameters
+    ----------
+    vector: bool
+        Build the vectorized enrichment models instead of
+        the models of ``pyhpo``
+
+    Returns
+    -------
+    dict
+    """
+    if vector:
+        return {
+            'gene_model': VectorEnrichmentModel('gene'),
+            'omim_model': VectorEnrichmentModel('omim'),
+            'hpo_model_genes': VectorHPOEnrichment('gene'),
+            'hpo_model_omim': VectorHPOEnrichment('omim'),
+        }
+    return {
+        'gene_model': EnrichmentModel('gene'),
+        'omim_model': EnrichmentModel('omim'),
+        'hpo_model_genes': HPOEnrichment('gene'),
+        'hpo_model_omim': HPOEnrichment('omim'),
+    }
+
+
+def build_models(vector: bool) -> Dict[str, Any]:
+    """
+    Builds all indicies and models that are derived from the Ontology
+
+    Parameters
+    ----------
+    vector: bool
+        Build the vectorized enrichment models
+
+    Returns
+    -------
+    dict
+    """
+    models = build_indicies()
+    models.update(build_enrichment_models(vector))
+    return models
+
+
+def install_models(models: Dict[str, Any]) -> None:
+    """
+    Makes the indicies and models available to the routers
+    """
+    for name in (
+        'search_index',
+        'gene_index',
+        'omim_index',
+        'gene_model',
+        'omim_model',
+        'hpo_model_genes',
+        'hpo_model_omim',
+    ):
+        if name in models:
+            setattr(terms, name, models[name])
+    for name in ('omim_sets', 'gene_sets'):
+        if name in models:
+            setattr(annotations, name, models[name])
+
+
+def load_snapshot() -> Optional[Dict[str, Any]]:
+    if not config.SNAPSHOT:
+        return None
+    try:
+        models = snapshot.read_snapshot(config.SNAPSHOT, config.MASTER_DATA)
+    except Exception as ex:
+        logger.warning(f"Unable to load Ontology snapshot: {ex}")
+        return None
+    if models is not None:
+        logger.info(f"Loaded Ontology from {config.SNAPSHOT}")
+    return models
+
+
+def clear_caches() -> None:
+    """
+    Clears all caches of results that depend on the loaded Ontology
+    """
+    term_set_cache.clear()
+    similarity_cache.clear()
+    enrichment_cache.clear()
+    fragment_cache.clear()
+    response_cache.clear()
+
+
+def initialize_ontology(start_pools: bool = False) -> None:
+    """
+    Loads the Ontology and builds all models
+
+    The startup stages are marked as completed as soon as they are
+    done, so that requests can be served while the remaining
+    models are built.
+
+    Parameters
+    ----------
+    start_pools: bool, default ``False``
+        Fork all worker processes after the models are built, but
+        before the last stage is completed. Worker processes only
+        inherit the models that exist when they are forked, so they
+        must not be forked by any request during the startup.
+    """
+    stages.reset()
+    vector = config.ENRICHMENT == 'vector'
+
+    models = load_snapshot()
+    if models is not None:
+        clear_caches()
+        if not vector:
+            models.update(build_enrichment_models(vector))
+        install_models(models)
+        if start_pools:
+            compute.start()
+            ranking.start()
+        for stage in STAGES:
+            stages.done(stage)
+        return
+
+    load_ontology()
+    clear_caches()
+    stages.done('ontology')
+
+    install_models(build_indicies())
+    stages.done('indicies')
+
+    install_models(build_enrichment_models(vector))
+    if start_pools:
+        compute.start()
+        ranking.start()
+    stages.done('enrichment')
+
+
+def _initialize_in_background() -> None:
+    try:
+        initialize_ontology(start_pools=True)
+    except Exception as ex:
+        logger.exception("Unable to initialize the Ontology")
+        stages.fail(str(ex))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if app.state.staged:
+        threading.Thread(
+            target=_initialize_in_background,
+            name='pyhpoapi-init',
+            daemon=True
+        ).start()
+    else:
+        # Worker processes are forked before any request is served,
+        # while no other thread can hold a lock
+        compute.start()
+        ranking.start()
+    yield
+    compute.shutdown()
+    ranking.shutdown()
+
+
+def main(staged: bool = False):
+    """
+    Creates the FastAPI app
+
+    Parameters
+    ----------
+    staged: bool, default ``False``
+        Load the Ontology in the background after the server started.
+        Requests are rejected with HTTP 503 until the Ontology is loaded.
+        With worker processes, requests are rejected until all models
+        are built and the workers are forked.
+        If ``False``, :func:`initialize_ontology` must be called before.
+    """
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.staged = staged
+    if staged:
+        stages.serving_stage = STAGES[-1] if forks_workers() else STAGES[0]
+        app.add_middleware(StartupGate)
+    if compression.ENABLED:
+        app.add_middleware(
+            compression.CompressionMiddleware,
+            minimum_size=config.COMPRESSION_MIN_SIZE,
+            gzip_level=config.GZIP_LEVEL,
+            brotli_quality=config.BROTLI_QUALITY
+        )
+    if metrics.ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)
+    if timing.ENABLED:
+        app.add_middleware(timing.ServerTimingMiddleware)
+    if profiling.ENABLED:
+        app.add_middleware(
+            profiling.ProfilingMiddleware,
+            directory=config.PROFILE_DIR
+        )
 
     app.add_middleware(
         CORSMiddleware,
@@ -68,7 +289,8 @@ def main():
         allow_methods=config.CORS_METHODS,
         allow_headers=config.CORS_HEADERS,
     )
-    app.openapi = custom_openapi_wrapper(app)
+    # Replacing ``app.openapi`` is the documented way to extend the schema
+    app.openapi = custom_openapi_wrapper(app)  # type: ignore[method-assign]
 
     @app.get('/logo', include_in_schema=False)
     def get_logo():
@@ -77,6 +299,20 @@ def main():
             'resources/logo.png'
         ))
 
+    if metrics.ENABLED:
+        @app.get('/metrics', include_in_schema=False)
+        def get_metrics():
+            return Response(
+                metrics.exposition(),
+                media_type=metrics.CONTENT_TYPE_LATEST
+            )
+
+    app.include_router(
+        health.router,
+        prefix='/health',
+        tags=['health']
+    )
+
     app.include_router(
         term.router,
         prefix='/term',
@@ -0,0 +1,236 @@
+"""
+Binary snapshots of the loaded Ontology and all derived models
+
+Parsing the HPO master data and building the search index, annotation
+indicies and enrichment models takes a long time and happens in every
+worker. A snapshot stores the fully linked Ontology, all annotations
+and the derived models in a single file that is much faster to load.
+
+Build a snapshot with::
+
+    python -m pyhpoapi.snapshot /path/to/pyhpoapi.snapshot
+
+Every snapshot is tagged with the HPO data version, checksums of the
+master data files and the versions of ``pyhpo`` and PyHPO-API.
+Snapshots that do not match the current data are ignored. Snapshots
+of a different ``pyhpo`` version are rejected before any HPOTerm is
+unpickled, because the internal state of the terms can change
+between versions.
+
+Snapshots are regular pickle files. The HPOTerms and models are
+unpickled into the memory of every worker, they are not shared.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sys
+from typing import Any, Dict, IO, List, Optional
+
+import pyhpo
+from pyhpo import HPOTerm, Ontology
+from pyhpo.annotations import Decipher, Gene, Omim, Orpha
+
+from pyhpoapi import config
+
+logger = logging.getLogger("uvicorn.error")
+
+# Increase whenever the layout of the snapshot file changes
+SNAPSHOT_FORMAT = 1
+
+ANNOTATION_REGISTRIES = {
+    'gene': Gene,
+    'omim': Omim,
+    'orpha': Orpha,
+    'decipher': Decipher,
+}
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Stores references to HPOTerms as their index
+
+    HPOTerms are connected to their parents and children, pickling
+    them directly would recurse through the whole Ontology.
+    """
+    def persistent_id(self, obj: Any) -> Optional[int]:
+        if isinstance(obj, HPOTerm):
+            return obj.index
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, fh: IO[bytes]) -> None:
+        super().__init__(fh)
+        self.terms: Dict[int, HPOTerm] = {}
+
+    def persistent_load(self, pid: int) -> HPOTerm:
+        return self.terms[pid]
+
+
+def data_version(data_dir: str = '') -> Dict[str, Any]:
+    """
+    Identifies the master data and the code that a snapshot is built from
+
+    Parameters
+    ----------
+    data_dir: str, default ``''``
+        Folder of the master data. Uses the builtin
+        data of ``pyhpo`` if empty
+
+    Returns
+    -------
+    dict
+    """
+    if not data_dir:
+        data_dir = os.path.join(os.path.dirname(pyhpo.__file__), 'data')
+
+    hpo_version = None
+    checksums = {}
+    for filename in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, filename)
+        if not os.path.isfile(path):
+            continue
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                checksum.update(chunk)
+        checksums[filename] = checksum.hexdigest()
+
+        if filename == 'hp.obo':
+            with open(path, encoding='utf-8') as fh:
+                for line in fh:
+                    if line.startswith('data-version:'):
+                        hpo_version = line.split(':', 1)[1].strip()
+                        break
+                    if line.startswith('[Term]'):
+                        break
+
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'pyhpo': pyhpo.__version__,
+        'pyhpoapi': config.VERSION,
+        'hpo': hpo_version,
+        'files': checksums,
+    }
+
+
+def write_snapshot(
+    path: str,
+    models: Dict[str, Any],
+    data_dir: str = ''
+) -> None:
+    """
+    Writes the loaded Ontology and ``models`` to a snapshot file
+
+    The file is written to a temporary file first and then moved,
+    so that workers that start in the meantime never read a
+    partial snapshot.
+
+    Parameters
+    ----------
+    path: str
+        Path of the snapshot file
+    models: dict
+        Any picklable objects that are derived from the Ontology
+    data_dir: str, default ``''``
+        Folder of the master data that the Ontology was loaded from
+    """
+    terms: List[HPOTerm] = list(Ontology)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        pickler = _Pickler(fh, protocol=pickle.HIGHEST_PROTOCOL)
+        pickler.dump(data_version(data_dir))
+        # The hash of every term must be known before the term is
+        # added to any set or dict, so the private attributes
+        # are stored before the remaining state of all terms
+        pickler.dump([
+            (term.index, term.__pydantic_private__) for term in terms
+        ])
+        pickler.dump([term.__getstate__() for term in terms])
+        pickler.dump({
+            'ontology': Ontology.__dict__,
+            'annotations': {
+                name: (dict(registry), registry.__dict__)
+                for name, registry in ANNOTATION_REGISTRIES.items()
+            },
+            'models': models,
+        })
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, data_dir: str = '') -> Optional[Dict[str, Any]]:
+    """
+    Loads the Ontology from a snapshot file
+
+    The global ``Ontology`` and the annotation registries of ``pyhpo``
+    are replaced by the state from the snapshot.
+
+    Parameters
+    ----------
+    path: str
+        Path of the snapshot file
+    data_dir: str, default ``''``
+        Folder of the master data that the Ontology should be loaded from
+
+    Returns
+    -------
+    dict or None
+        The models of the snapshot or ``None`` if the
+        snapshot is missing or does not match the master data
+        or the installed ``pyhpo`` version
+    """
+    if not os.path.isfile(path):
+        logger.info(f'No Ontology snapshot at {path}')
+        return None
+
+    with open(path, 'rb') as fh:
+        unpickler = _Unpickler(fh)
+        header = unpickler.load()
+        if header.get('pyhpo') != pyhpo.__version__:
+            logger.warning(
+                f'Ontology snapshot {path} was built with pyhpo '
+                f'{header.get("pyhpo")}, but {pyhpo.__version__} '
+                'is installed'
+            )
+            return None
+        if header != data_version(data_dir):
+            logger.warning(f'Ontology snapshot {path} is outdated')
+            return None
+
+        for index, private in unpickler.load():
+            term = HPOTerm.__new__(HPOTerm)
+            object.__setattr__(term, '__pydantic_private__', private)
+            unpickler.terms[index] = term
+        states = unpickler.load()
+        for term, state in zip(unpickler.terms.values(), states):
+            term.__setstate__(state)
+        data = unpickler.load()
+
+    Ontology.__dict__.clear()
+    Ontology.__dict__.update(data['ontology'])
+    for name, (items, attributes) in data['annotations'].items():
+        registry = ANNOTATION_REGISTRIES[name]
+        dict.clear(registry)
+        dict.update(registry, items)
+        registry.__dict__.update(attributes)
+
+    return data['models']
+
+
+def main(argv: List[str]) -> None:
+    # Imported here, because the server imports this module
+    from pyhpoapi import server
+
+    path = argv[0] if argv else config.SNAPSHOT
+    if not path:
+        sys.exit('Usage: python -m pyhpoapi.snapshot <path>')
+    logging.basicConfig(level=logging.INFO)
+
+    server.load_ontology()
+    write_snapshot(path, server.build_models(vector=True), config.MASTER_DATA)
+    logger.info(f'Wrote Ontology snapshot to {path}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
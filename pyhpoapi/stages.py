@@ -0,0 +1,155 @@
+"""
+Startup stages of the API
+
+Loading the Ontology and building all derived models takes a long time.
+With staged startup, the server accepts requests right away and loads
+everything in the background. Term lookups are served as soon as the
+Ontology is loaded, while the indicies and enrichment models are still
+being built. The health endpoints report the progress of all stages.
+"""
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from pyhpoapi import config
+
+# All stages, in the order in which they are completed
+#
+# * **ontology** - The Ontology and all annotations are loaded
+# * **indicies** - The search and annotation indicies are built
+# * **enrichment** - The enrichment models are built
+STAGES = ('ontology', 'indicies', 'enrichment')
+
+
+class Stages:
+    """
+    Tracks which startup stages are completed
+    """
+    def __init__(self) -> None:
+        self._events = {name: threading.Event() for name in STAGES}
+        self._completed: Dict[str, float] = {}
+        self._started = time.monotonic()
+        self.error: Optional[str] = None
+        # Requests are only served after this stage is completed
+        self.serving_stage = 'ontology'
+
+    def done(self, name: str) -> None:
+        """
+        Marks the stage as completed
+        """
+        self._completed[name] = time.monotonic() - self._started
+        self._events[name].set()
+
+    def is_done(self, name: str) -> bool:
+        return self._events[name].is_set()
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> None:
+        """
+        Blocks until the stage is completed
+
+        Parameters
+        ----------
+        name: str
+            The stage
+        timeout: float, default ``config.STAGE_TIMEOUT``
+            Maximum number of seconds to wait
+
+        Raises
+        ------
+        HTTPException
+            The stage is not completed in time (HTTP 503)
+        """
+        if timeout is None:
+            timeout = config.STAGE_TIMEOUT
+        if not self._events[name].wait(timeout):
+            raise HTTPException(
+                status_code=503,
+                detail=f'The server is still starting up ({name})',
+                headers={'Retry-After': '10'}
+            )
+
+    def fail(self, error: str) -> None:
+        """
+        Records that the startup failed
+        """
+        self.error = error
+
+    def reset(self) -> None:
+        """
+        Marks all stages as not completed
+        """
+        for event in self._events.values():
+            event.clear()
+        self._completed = {}
+        self._started = time.monotonic()
+        self.error = None
+
+    def is_ready(self) -> bool:
+        """
+        Indicates if requests can be served
+        """
+        return self.is_done(self.serving_stage) and self.error is None
+
+    def status(self) -> Dict[str, Optional[float]]:
+        """
+        Seconds since startup after which each stage was completed,
+        ``None`` for stages that are not completed yet
+        """
+        return {name: self._completed.get(name) for name in STAGES}
+
+
+stages = Stages()
+
+
+class StartupGate:
+    """
+    ASGI middleware that rejects requests until the Ontology is loaded
+
+    Requests to the health endpoints, the metrics and the API
+    documentation are always passed through.
+
+    Parameters
+    ----------
+    app: ASGI application
+    """
+    ALWAYS_OPEN = (
+        '/health/',
+        '/metrics',
+        '/docs',
+        '/redoc',
+        '/openapi.json',
+        '/logo'
+    )
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._open = False
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self._open or scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        if stages.is_done(stages.serving_stage):
+            self._open = True
+            await self.app(scope, receive, send)
+            return
+        if scope['path'].startswith(self.ALWAYS_OPEN):
+            await self.app(scope, receive, send)
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'retry-after', b'10'),
+            ]
+        })
+        detail = f'The server is still starting up ({stages.serving_stage})'
+        await send({
+            'type': 'http.response.body',
+            'body': json.dumps({'detail': detail}).encode()
+        })
@@ -0,0 +1,59 @@
+"""
+Streaming responses with one JSON object per line (NDJSON)
+
+Large similarity batches are sent to the client while they are
+calculated, instead of building (and validating) the complete
+response in memory first.
+"""
+import itertools
+import json
+from typing import Any, Dict, Iterator, Union
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+NDJSON_RESPONSE: Dict[Union[int, str], Dict[str, Any]] = {
+    200: {
+        'description': 'One JSON object per line for every scored set',
+        'content': {NDJSON_MEDIA_TYPE: {}}
+    }
+}
+
+
+async def ndjson_response(rows: Iterator[dict]) -> StreamingResponse:
+    """
+    Streams every row as a single line of JSON
+
+    The first row is calculated before the response starts, so that
+    invalid parameters still return a proper HTTP error. Errors that
+    occur later are sent as a final line with a ``detail`` key.
+    All rows are calculated in the threadpool, not in the event loop.
+
+    Parameters
+    ----------
+    rows: iterator of dict
+        A lazy iterator of the rows to send
+
+    Returns
+    -------
+    StreamingResponse
+    """
+    first = await run_in_threadpool(next, rows, None)
+    if first is None:
+        return StreamingResponse(iter([]), media_type=NDJSON_MEDIA_TYPE)
+
+    return StreamingResponse(
+        _ndjson_lines(itertools.chain([first], rows)),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+def _ndjson_lines(rows: Iterator[dict]) -> Iterator[str]:
+    try:
+        for row in rows:
+            yield json.dumps(row) + '\n'
+    except HTTPException as ex:
+        yield json.dumps({'detail': ex.detail}) + '\n'
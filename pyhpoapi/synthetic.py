@@ -0,0 +1,372 @@
+"""
+Synthetic HPO master data of any size
+
+Generates a random, but reproducible Ontology with gene and disease
+annotations. The files are written in the same format as the HPO
+master data, so the folder can be used as ``PYHPOAPI_DATA_DIR``.
+This allows to test the indicies, caches and batch endpoints with much
+larger Ontologies than the real HPO, without any external data.
+
+Generate an Ontology that is 10 times the size of the HPO::
+
+    python -m pyhpoapi.synthetic /tmp/hpo-10x --scale 10
+
+The default sizes are similar to the HPO. The same seed and sizes
+always generate identical files.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set
+
+ROOT = 1
+PHENOTYPIC_ABNORMALITY = 118
+
+# Generated terms start at this HPO id
+FIRST_ID = 1000
+
+# Default sizes, similar to the HPO
+TERMS = 17000
+GENES = 5000
+OMIM = 8000
+ORPHA = 4000
+DECIPHER = 50
+
+HPOA_HEADER = (
+    'database_id', 'disease_name', 'qualifier', 'hpo_id', 'reference',
+    'evidence', 'onset', 'frequency', 'sex', 'modifier', 'aspect',
+    'biocuration'
+)
+GENES_HEADER = (
+    'hpo_id', 'hpo_name', 'ncbi_gene_id', 'gene_symbol', 'disease_id'
+)
+
+SYLLABLES = (
+    'ab', 'ac', 'al', 'an', 'ar', 'at', 'bra', 'cal', 'car', 'cer', 'chon',
+    'cra', 'cu', 'cy', 'dac', 'der', 'dys', 'en', 'fa', 'gas', 'glo', 'hem',
+    'hy', 'in', 'lar', 'lep', 'lo', 'ma', 'me', 'mi', 'my', 'na', 'neu', 'no',
+    'or', 'os', 'pa', 'per', 'pha', 'ple', 'pul', 'ra', 're', 'ri', 'sal',
+    'scle', 'sep', 'ta', 'ten', 'tha', 'to', 'tri', 'tro', 'ty', 'ul', 'va',
+    've', 'xa', 'zy'
+)
+SUFFIXES = (
+    'al', 'ia', 'ic', 'ism', 'itis', 'oma', 'osis', 'ous', 'pathy', 'plasia'
+)
+
+
+class Term(NamedTuple):
+    id: int
+    name: str
+    parents: List[int]
+    synonyms: List[str]
+
+
+class Disease(NamedTuple):
+    source: str
+    id: int
+    name: str
+    terms: List[int]
+    negative_terms: List[int]
+
+
+class Gene(NamedTuple):
+    id: int
+    symbol: str
+    terms: List[int]
+
+
+def hpo_id(idx: int) -> str:
+    return f'HP:{idx:07d}'
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    words: Set[str] = set()
+    while len(words) < size:
+        syllables = rng.choices(SYLLABLES, k=rng.randint(1, 3))
+        words.add(''.join(syllables) + rng.choice(SUFFIXES))
+    return sorted(words)
+
+
+def _name(rng: random.Random, vocabulary: Sequence[str]) -> str:
+    words = rng.choices(vocabulary, k=rng.randint(2, 4))
+    return ' '.join(words).capitalize()
+
+
+def generate_terms(
+    rng: random.Random,
+    n: int,
+    extra_parents: float = 0.2,
+    max_parents: int = 3
+) -> List[Term]:
+    """
+    Generates a random DAG of HPOTerms
+
+    Every term is a descendant of ``Phenotypic abnormality``. Parents
+    are always chosen from the previously generated terms, so the graph
+    can not contain cycles.
+
+    Parameters
+    ----------
+    rng: random.Random
+        The random number generator
+    n: int
+        Number of generated terms, in addition to the two root terms
+    extra_parents: float, default ``0.2``
+        Probability of a term to have more than one parent
+    max_parents: int, default ``3``
+        Maximum number of parents of a term
+
+    Returns
+    -------
+    list of Term
+    """
+    vocabulary = _vocabulary(rng, max(50, int(n ** 0.5) * 4))
+    terms = [
+        Term(ROOT, 'All', [], []),
+        Term(PHENOTYPIC_ABNORMALITY, 'Phenotypic abnormality', [ROOT], []),
+    ]
+    ids = [PHENOTYPIC_ABNORMALITY]
+    for idx in range(FIRST_ID, FIRST_ID + n):
+        parents = {rng.choice(ids)}
+        if rng.random() < extra_parents:
+            for _ in range(rng.randint(1, max_parents - 1)):
+                parents.add(rng.choice(ids))
+        synonyms = [
+            _name(rng, vocabulary)
+            for _ in range(rng.choice((0, 0, 0, 1, 2)))
+        ]
+        terms.append(
+            Term(idx, _name(rng, vocabulary), sorted(parents), synonyms)
+        )
+        ids.append(idx)
+    return terms
+
+
+def _term_sampler(rng: random.Random, terms: List[Term], skew: float):
+    """
+    Samples terms with a long-tailed popularity, like in the HPO,
+    where a few terms are annotated to many genes and diseases
+    """
+    population = [term.id for term in terms[2:]]
+    rng.shuffle(population)
+    cum_weights = list(itertools.accumulate(
+        1 / (rank + 1) ** skew for rank in range(len(population))
+    ))
+
+    def sample(k: int) -> List[int]:
+        return sorted(set(
+            rng.choices(population, cum_weights=cum_weights, k=k)
+        ))
+    return sample
+
+
+def generate_diseases(
+    rng: random.Random,
+    terms: List[Term],
+    source: str,
+    n: int,
+    min_terms: int = 3,
+    max_terms: int = 30,
+    negative: float = 0.05,
+    skew: float = 0.8
+) -> List[Disease]:
+    """
+    Generates diseases with random HPOTerm annotations
+
+    Parameters
+    ----------
+    rng: random.Random
+        The random number generator
+    terms: list of Term
+        The generated Ontology
+    source: str
+        ``OMIM``, ``ORPHA`` or ``DECIPHER``
+    n: int
+        Number of diseases
+    min_terms, max_terms: int
+        Minimum and maximum number of annotated terms per disease
+    negative: float, default ``0.05``
+        Probability of a disease to have a negative annotation
+    skew: float, default ``0.8``
+        Exponent of the term popularity. ``0`` annotates all terms
+        equally often
+
+    Returns
+    -------
+    list of Disease
+    """
+    if not n:
+        return []
+    sample = _term_sampler(rng, terms, skew)
+    first_id = {'OMIM': 100000, 'ORPHA': 1, 'DECIPHER': 1}.get(source, 1)
+    diseases = []
+    for idx in range(first_id, first_id + n):
+        annotated = sample(rng.randint(min_terms, max_terms))
+        negative_terms = []
+        if rng.random() < negative:
+            negative_terms = [
+                x for x in sample(rng.randint(1, 3)) if x not in annotated
+            ]
+        diseases.append(Disease(
+            source,
+            idx,
+            f'{source.capitalize()} synthetic disease {idx}',
+            annotated,
+            negative_terms
+        ))
+    return diseases
+
+
+def generate_genes(
+    rng: random.Random,
+    terms: List[Term],
+    n: int,
+    min_terms: int = 3,
+    max_terms: int = 60,
+    skew: float = 0.8
+) -> List[Gene]:
+    """
+    Generates genes with random HPOTerm annotations
+
+    See :func:`generate_diseases` for the parameters
+    """
+    if not n:
+        return []
+    sample = _term_sampler(rng, terms, skew)
+    return [
+        Gene(idx, f'SYN{idx}', sample(rng.randint(min_terms, max_terms)))
+        for idx in range(1, n + 1)
+    ]
+
+
+def write_obo(path: str, terms: List[Term], data_version: str) -> None:
+    names = {term.id: term.name for term in terms}
+    with open(path, 'w') as fh:
+        fh.write('format-version: 1.2\n')
+        fh.write(f'data-version: {data_version}\n')
+        for term in terms:
+            fh.write('\n[Term]\n')
+            fh.write(f'id: {hpo_id(term.id)}\n')
+            fh.write(f'name: {term.name}\n')
+            fh.write(f'def: "Synthetic term {hpo_id(term.id)}" []\n')
+            for synonym in term.synonyms:
+                fh.write(f'synonym: "{synonym}" EXACT []\n')
+            for parent in term.parents:
+                fh.write(f'is_a: {hpo_id(parent)} ! {names[parent]}\n')
+
+
+def write_hpoa(path: str, diseases: List[Disease], data_version: str) -> None:
+    with open(path, 'w') as fh:
+        fh.write('#description: Synthetic HPO annotations\n')
+        fh.write(f'#version: {data_version}\n')
+        fh.write('\t'.join(HPOA_HEADER) + '\n')
+        for disease in diseases:
+            disease_id = f'{disease.source}:{disease.id}'
+            rows = [('', term) for term in disease.terms] + [
+                ('NOT', term) for term in disease.negative_terms
+            ]
+            for qualifier, term in rows:
+                fh.write('\t'.join((
+                    disease_id, disease.name, qualifier, hpo_id(term),
+                    disease_id, 'TAS', '', '', '', '', 'P',
+                    'HPO:synthetic'
+                )) + '\n')
+
+
+def write_genes(path: str, genes: List[Gene]) -> None:
+    with open(path, 'w') as fh:
+        fh.write('\t'.join(GENES_HEADER) + '\n')
+        for gene in genes:
+            for term in gene.terms:
+                fh.write('\t'.join((
+                    hpo_id(term), '-', str(gene.id), gene.symbol, 'synthetic'
+                )) + '\n')
+
+
+def generate(
+    folder: str,
+    terms: int = TERMS,
+    genes: int = GENES,
+    omim: int = OMIM,
+    orpha: int = ORPHA,
+    decipher: int = DECIPHER,
+    seed: int = 42,
+    scale: float = 1.0
+) -> None:
+    """
+    Writes synthetic HPO master data into ``folder``
+
+    Parameters
+    ----------
+    folder: str
+        The output folder, it is created if it does not exist
+    terms, genes, omim, orpha, decipher: int
+        Number of generated HPOTerms, genes and diseases
+    seed: int, default ``42``
+        Seed of the random number generator
+    scale: float, default ``1.0``
+        Multiplies all numbers of terms, genes and diseases
+    """
+    sizes: Dict[str, int] = {
+        name: int(value * scale) for name, value in (
+            ('terms', terms),
+            ('genes', genes),
+            ('omim', omim),
+            ('orpha', orpha),
+            ('decipher', decipher),
+        )
+    }
+    data_version = 'synthetic/{}'.format(
+        '-'.join(f'{key}{value}' for key, value in sizes.items())
+    ) + f'-seed{seed}'
+
+    rng = random.Random(seed)
+    ontology = generate_terms(rng, sizes['terms'])
+    diseases = (
+        generate_diseases(rng, ontology, 'OMIM', sizes['omim']) +
+        generate_diseases(rng, ontology, 'ORPHA', sizes['orpha']) +
+        generate_diseases(rng, ontology, 'DECIPHER', sizes['decipher'])
+    )
+    gene_list = generate_genes(rng, ontology, sizes['genes'])
+
+    os.makedirs(folder, exist_ok=True)
+    write_obo(os.path.join(folder, 'hp.obo'), ontology, data_version)
+    write_hpoa(
+        os.path.join(folder, 'phenotype.hpoa'),
+        diseases,
+        data_version
+    )
+    write_genes(os.path.join(folder, 'phenotype_to_genes.txt'), gene_list)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m pyhpoapi.synthetic',
+        description='Generates synthetic HPO master data'
+    )
+    parser.add_argument('folder')
+    parser.add_argument('--terms', type=int, default=TERMS)
+    parser.add_argument('--genes', type=int, default=GENES)
+    parser.add_argument('--omim', type=int, default=OMIM)
+    parser.add_argument('--orpha', type=int, default=ORPHA)
+    parser.add_argument('--decipher', type=int, default=DECIPHER)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scale', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    generate(
+        args.folder,
+        terms=args.terms,
+        genes=args.genes,
+        omim=args.omim,
+        orpha=args.orpha,
+        decipher=args.decipher,
+        seed=args.seed,
+        scale=args.scale
+    )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
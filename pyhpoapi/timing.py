@@ -0,0 +1,226 @@
+"""
+Server-Timing breakdown of every request
+
+The work of a request is split into stages:
+
+* **parse** - Resolving HPOTerms and HPOSets from the query
+* **queue** - Waiting for a worker of the compute executor
+* **compute** - Similarity, enrichment and all other work of the handler
+* **json** - Building the response dicts, e.g. via ``toJSON``
+* **validate** - Validation and serialization of the response model
+
+All time of a handler that is not part of another stage counts as
+``compute``. Stages can be nested, the time of a nested stage is only
+counted for the innermost stage.
+
+The durations are sent in the ``Server-Timing`` header, together with
+the ``total`` time until the response is sent. Streaming responses only
+include the work until the stream starts.
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+
+from pyhpoapi import config
+
+ENABLED = config.SERVER_TIMING
+
+STAGES = ('parse', 'queue', 'compute', 'json', 'validate')
+
+
+class Timings:
+    """
+    Durations of all stages of a single request
+    """
+    def __init__(self) -> None:
+        self.durations: Dict[str, float] = {}
+        self.handler_done: Optional[float] = None
+
+    def add(self, name: str, duration: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def header(self, total: float) -> bytes:
+        """
+        The value of the ``Server-Timing`` header
+
+        Parameters
+        ----------
+        total: float
+            Total duration of the request in seconds
+        """
+        metrics = [
+            f'{name};dur={self.durations[name] * 1000:.3f}'
+            for name in STAGES
+            if name in self.durations
+        ]
+        metrics.append(f'total;dur={total * 1000:.3f}')
+        return ', '.join(metrics).encode()
+
+
+class _Frame:
+    """
+    A running stage and the time spent in its nested stages
+    """
+    __slots__ = ('nested',)
+
+    def __init__(self) -> None:
+        self.nested = 0.0
+
+
+_timings: 'contextvars.ContextVar[Optional[Timings]]' = (
+    contextvars.ContextVar('pyhpoapi_timings', default=None)
+)
+_frame: 'contextvars.ContextVar[Optional[_Frame]]' = (
+    contextvars.ContextVar('pyhpoapi_timing_frame', default=None)
+)
+
+
+def _record(timings: Timings, name: str, duration: float) -> None:
+    timings.add(name, duration)
+    parent = _frame.get()
+    if parent is not None:
+        parent.nested += duration
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Records the time spent inside the ``with`` block
+
+    Parameters
+    ----------
+    name: str
+        The stage, e.g. ``parse`` or ``json``
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    frame = _Frame()
+    token = _frame.set(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _frame.reset(token)
+        timings.add(name, elapsed - frame.nested)
+        parent = _frame.get()
+        if parent is not None:
+            parent.nested += elapsed
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator that records all calls of the function as a stage
+
+    Parameters
+    ----------
+    name: str
+        The stage, e.g. ``parse``
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _timings.get() is None:
+                return func(*args, **kwargs)
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(func: Callable) -> Callable:
+    """
+    Records the stages of ``func`` when it runs in another thread
+
+    The time until ``func`` starts is recorded as ``queue``.
+
+    Parameters
+    ----------
+    func: Callable
+        The function that will run in another thread
+
+    Returns
+    -------
+    Callable
+        ``func`` itself if the request is not timed
+    """
+    timings = _timings.get()
+    if timings is None:
+        return func
+    context = contextvars.copy_context()
+    submitted = time.perf_counter()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        _record(timings, 'queue', time.perf_counter() - submitted)
+        return func(*args, **kwargs)
+
+    return functools.partial(context.run, run)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    async def timed_endpoint(*args: Any, **kwargs: Any) -> Any:
+        with stage('compute'):
+            res = await endpoint(*args, **kwargs)
+        timings = _timings.get()
+        if timings is not None:
+            timings.handler_done = time.perf_counter()
+        return res
+    return timed_endpoint
+
+
+class TimedRoute(APIRoute):
+    """
+    API route that records the handler as ``compute`` stage
+
+    Everything between the end of the handler and the start of the
+    response is recorded as ``validate`` stage.
+    """
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any) -> None:
+        if ENABLED and asyncio.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that adds the ``Server-Timing`` header to all responses
+
+    Parameters
+    ----------
+    app: ASGI application
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+        start = time.perf_counter()
+
+        async def send_with_timing(message) -> None:
+            if message['type'] == 'http.response.start':
+                now = time.perf_counter()
+                if timings.handler_done is not None:
+                    timings.add('validate', now - timings.handler_done)
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'server-timing', timings.header(now - start))
+                ]
+            await send(message)
+
+        token = _timings.set(timings)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
@@ -1,10 +1,16 @@
+import asyncio
+import json
 import os
 import unittest
+from unittest.mock import patch
 
 from pyhpo import Ontology
 
 from fastapi.testclient import TestClient
 from pyhpoapi.server import main
+from pyhpoapi.executor import ShardedExecutor
+from pyhpoapi.routers import terms
+from pyhpoapi.registry import AnnotationSets
 
 client = TestClient(main())
 
@@ -83,6 +89,132 @@ class OmimTests(unittest.TestCase):
         self.assertEqual(len(res['set1']), 3)
         self.assertEqual(len(res['other_sets']), 2)
 
+    def test_all_omim_sharded_similarity(self):
+        url = '/similarity/omim/all?set1=HP:0000021,HP:0000013,HP:0000031'
+        expected = client.get(url).json()
+
+        sharded = ShardedExecutor(2)
+        with patch('pyhpoapi.routers.annotations.ranking', sharded):
+            res = client.get(url).json()
+        sharded.shutdown()
+
+        self.assertEqual(res, expected)
+
+    def test_all_omim_sharded_errors(self):
+        url = '/similarity/omim/all?set1=HP:0000021,HP:0000013,HP:0000031'
+        expected = client.get(url).json()
+
+        sharded = ShardedExecutor(2)
+        with patch('pyhpoapi.routers.annotations.ranking', sharded):
+            res = client.get(f'{url}&method=foobar')
+            self.assertEqual(res.status_code, 400)
+            res = client.get(
+                '/similarity/omim/all?set1=HP:0000021,HP:9999999'
+            )
+            self.assertEqual(res.status_code, 400)
+            # The shard processes are still usable
+            res = client.get(url)
+        sharded.shutdown()
+
+        self.assertEqual(res.json(), expected)
+
+    def test_all_omim_similarity_registry(self):
+        url = '/similarity/omim/all?set1=HP:0000021,HP:0000013,HP:0000031'
+        expected = client.get(url).json()
+
+        registry = AnnotationSets.omim()
+        with patch('pyhpoapi.routers.annotations.omim_sets', registry):
+            res = client.get(url).json()
+
+        self.assertEqual(res, expected)
+
+    def test_all_omim_similarity_top_k(self):
+        url = '/similarity/omim/all?set1=HP:0000021,HP:0000013,HP:0000031'
+        scores = sorted(
+            x['similarity'] for x in client.get(url).json()['other_sets']
+        )
+
+        res = client.get(f'{url}&sort=desc&limit=1').json()
+        self.assertEqual(len(res['set1']), 3)
+        self.assertEqual(len(res['other_sets']), 1)
+        self.assertEqual(res['other_sets'][0]['similarity'], scores[-1])
+
+        res = client.get(f'{url}&sort=asc').json()
+        self.assertEqual(
+            [x['similarity'] for x in res['other_sets']],
+            scores
+        )
+
+        res = client.get(f'{url}&min_similarity={scores[-1] + 0.1}').json()
+        self.assertEqual(res['other_sets'], [])
+
+        # A limit without sort order returns the best results
+        res = client.get(f'{url}&limit=2').json()
+        self.assertEqual(
+            [x['similarity'] for x in res['other_sets']],
+            scores[::-1][:2]
+        )
+
+    def test_all_omim_sharded_top_k(self):
+        url = (
+            '/similarity/omim/all?set1=HP:0000021,HP:0000013,HP:0000031'
+            '&sort=desc&limit=1'
+        )
+        expected = client.get(url).json()
+
+        sharded = ShardedExecutor(2)
+        with patch('pyhpoapi.routers.annotations.ranking', sharded):
+            res = client.get(url).json()
+        sharded.shutdown()
+
+        self.assertEqual(res, expected)
+
+    def test_all_omim_similarity_stream(self):
+        set1 = 'HP:0000021,HP:0000013,HP:0000031'
+        expected = client.get(f'/similarity/omim/all?set1={set1}').json()
+        response = client.get(f'/similarity/omim/all/stream?set1={set1}')
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(x) for x in response.text.splitlines()]
+        self.assertEqual(lines, expected['other_sets'])
+
+        response = client.get(
+            f'/similarity/omim/all/stream?set1={set1}&min_similarity=2'
+        )
+        self.assertEqual(response.text, '')
+
+    def test_all_omim_similarity_stream_threadpool(self):
+        in_event_loop = []
+        get_hpo_set = terms.get_hpo_set
+
+        def record_thread(*args):
+            try:
+                asyncio.get_running_loop()
+                in_event_loop.append(True)
+            except RuntimeError:
+                in_event_loop.append(False)
+            return get_hpo_set(*args)
+
+        with patch.object(terms, 'get_hpo_set', record_thread):
+            response = client.get(
+                '/similarity/omim/all/stream?set1=HP:0000021,HP:0000013'
+            )
+        self.assertEqual(response.status_code, 200)
+        # The query set is not built in the event loop
+        self.assertEqual(in_event_loop, [False])
+
+        response = client.get('/similarity/omim/all/stream?set1=foobar')
+        self.assertEqual(response.status_code, 400)
+
+    def test_all_omim_similarity_invalid_sort(self):
+        response = client.get(
+            '/similarity/omim/all?set1=HP:0000021&sort=foobar'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {'detail': 'Invalid `limit` or `sort` parameter'}
+        )
+
     def test_omim_batch_similarity_missing_diseases(self):
         data = {
             'set1': 'HP:0000021,HP:0000013,HP:0000031',
@@ -177,6 +309,45 @@ class GeneTests(unittest.TestCase):
         self.assertEqual(len(res['set1']), 2)
         self.assertEqual(len(res['other_sets']), 2)
 
+    def test_all_gene_sharded_similarity(self):
+        url = '/similarity/gene/all?set1=HP:0000041,HP:0000031'
+        expected = client.get(url).json()
+
+        sharded = ShardedExecutor(2)
+        with patch('pyhpoapi.routers.annotations.ranking', sharded):
+            res = client.get(url).json()
+        sharded.shutdown()
+
+        self.assertEqual(res, expected)
+
+    def test_all_gene_similarity_registry(self):
+        url = '/similarity/gene/all?set1=HP:0000041,HP:0000031'
+        expected = client.get(url).json()
+
+        registry = AnnotationSets.genes()
+        with patch('pyhpoapi.routers.annotations.gene_sets', registry):
+            res = client.get(url).json()
+
+        self.assertEqual(res, expected)
+
+    def test_all_gene_similarity_top_k(self):
+        url = '/similarity/gene/all?set1=HP:0000041,HP:0000031'
+        scores = sorted(
+            x['similarity'] for x in client.get(url).json()['other_sets']
+        )
+
+        res = client.get(f'{url}&sort=desc&limit=1').json()
+        self.assertEqual(len(res['other_sets']), 1)
+        self.assertEqual(res['other_sets'][0]['similarity'], scores[-1])
+
+    def test_all_gene_similarity_stream(self):
+        set1 = 'HP:0000041,HP:0000031'
+        expected = client.get(f'/similarity/gene/all?set1={set1}').json()
+        response = client.get(f'/similarity/gene/all/stream?set1={set1}')
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(x) for x in response.text.splitlines()]
+        self.assertEqual(lines, expected['other_sets'])
+
     def test_gene_batch_similarity_missing_diseases(self):
         data = {
             'set1': 'HP:0000041,HP:0000031',
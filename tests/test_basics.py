@@ -83,6 +83,30 @@ class TestSetGetter(unittest.TestCase):
         res = helpers.get_hpo_set("HP:0000012, HP:0000013 ,HP:0000021")
         self.assertEqual(len(res), 3)
 
+    def test_set_cache(self):
+        helpers.term_set_cache.clear()
+        res = helpers.get_hpo_set("HP:0000012,HP:0000013")
+        self.assertEqual(helpers.term_set_cache.misses, 1)
+        self.assertEqual(helpers.term_set_cache.hits, 0)
+
+        res2 = helpers.get_hpo_set("13, 12")
+        self.assertEqual(helpers.term_set_cache.misses, 1)
+        self.assertEqual(helpers.term_set_cache.hits, 1)
+        self.assertEqual(set(res), set(res2))
+
+        # Keeps the order of the query
+        self.assertEqual(
+            [x['int'] for x in res2.toJSON()],
+            [13, 12]
+        )
+
+    def test_set_cache_does_not_cache_errors(self):
+        helpers.term_set_cache.clear()
+        for _ in range(2):
+            with self.assertRaises(HTTPException):
+                helpers.get_hpo_set("HP:0000012,HP:00000130")
+        self.assertEqual(len(helpers.term_set_cache), 0)
+
     def test_set_missing_term(self):
         with self.assertRaises(HTTPException) as err:
             helpers.get_hpo_set("HP:0000012,HP:00000130")
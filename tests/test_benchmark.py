@@ -0,0 +1,84 @@
+import asyncio
+import os
+import unittest
+
+from pyhpo import Ontology
+
+from pyhpoapi.server import main
+from pyhpoapi import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+
+    def test_queries_are_reproducible(self):
+        self.assertEqual(
+            benchmark.build_queries(5, seed=1),
+            benchmark.build_queries(5, seed=1)
+        )
+        self.assertNotEqual(
+            benchmark.build_queries(5, seed=1),
+            benchmark.build_queries(5, seed=2)
+        )
+
+    def test_percentile(self):
+        values = [float(x) for x in range(1, 101)]
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([3.0], 95), 3)
+        self.assertEqual(benchmark.percentile([], 95), 0)
+
+    def test_run(self):
+        cases = benchmark.select_cases(
+            benchmark.build_cases(
+                benchmark.build_queries(5),
+                methods=['graphic', 'resnik']
+            ),
+            ['/term/{term_id}/parents', '/terms/similarity']
+        )
+        self.assertEqual(
+            set(cases),
+            {
+                'GET /term/{term_id}/parents',
+                'GET /terms/similarity [graphic]',
+                'GET /terms/similarity [resnik]',
+                'POST /terms/similarity',
+            }
+        )
+        results = asyncio.run(
+            benchmark.run(main(), cases, iterations=4, warmup=1)
+        )
+        for result in results.values():
+            self.assertEqual(result['requests'], 4)
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['p50'], 0)
+            self.assertLessEqual(result['p50'], result['p99'])
+
+    def test_all_methods(self):
+        cases = benchmark.build_cases(benchmark.build_queries(5))
+        # All methods of ``GET /terms/similarity``
+        for method in ('graphic', 'resnik', 'lin', 'jc', 'jc2', 'rel',
+                       'ic', 'dist', 'equal'):
+            self.assertIn(f'GET /terms/similarity [{method}]', cases)
+
+    def test_compare(self):
+        baseline = {'results': {
+            'a': {'p50': 10.0},
+            'b': {'p50': 10.0},
+            'c': {'p50': 10.0},
+        }}
+        current = {'results': {
+            'a': {'p50': 11.0},
+            'b': {'p50': 13.0},
+            'd': {'p50': 50.0},
+        }}
+        regressions = benchmark.compare(baseline, current, 0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('b:'))
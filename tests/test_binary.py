@@ -0,0 +1,151 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+from fastapi import HTTPException
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main
+from pyhpoapi import binary
+
+
+client = TestClient(main())
+
+
+class TestNegotiation(unittest.TestCase):
+    def test_json(self):
+        for accept in (None, '', 'application/json', '*/*', 'text/html',
+                       'text/html, application/*;q=0.8'):
+            self.assertEqual(binary.negotiate(accept), binary.JSON)
+
+    def test_quality(self):
+        with patch.object(binary, 'HAS_MSGPACK', True):
+            self.assertEqual(
+                binary.negotiate('application/msgpack'),
+                binary.MSGPACK
+            )
+            self.assertEqual(
+                binary.negotiate(
+                    'application/json;q=0.5, application/x-msgpack'
+                ),
+                binary.MSGPACK
+            )
+            self.assertEqual(
+                binary.negotiate('application/msgpack;q=0.5, */*'),
+                binary.JSON
+            )
+            self.assertEqual(
+                binary.negotiate('application/msgpack;q=0, */*;q=0.1'),
+                binary.JSON
+            )
+        with patch.object(binary, 'HAS_PYARROW', True):
+            self.assertEqual(
+                binary.negotiate('application/vnd.apache.arrow.stream'),
+                binary.ARROW
+            )
+
+    def test_not_installed(self):
+        with patch.object(binary, 'HAS_MSGPACK', False):
+            with self.assertRaises(HTTPException) as ctx:
+                binary.negotiate('application/msgpack')
+            self.assertEqual(ctx.exception.status_code, 406)
+
+            # Falls back to other accepted formats
+            self.assertEqual(
+                binary.negotiate('application/msgpack, */*;q=0.1'),
+                binary.JSON
+            )
+
+
+class TestBinaryResponses(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+        self.set1 = 'HP:0000021,HP:0000013,HP:0000031'
+        self.body = {
+            'set1': self.set1,
+            'other_sets': [
+                {'name': 'a', 'set2': 'HP:0000041'},
+                {'name': 'b', 'set2': 'HP:9999999'},
+            ]
+        }
+
+    def test_not_acceptable(self):
+        with patch.object(binary, 'HAS_MSGPACK', False):
+            res = client.post(
+                '/terms/similarity',
+                json=self.body,
+                headers={'Accept': 'application/msgpack'}
+            )
+            self.assertEqual(res.status_code, 406)
+            res = client.get(
+                '/similarity/gene/all',
+                params={'set1': self.set1},
+                headers={'Accept': 'application/msgpack'}
+            )
+            self.assertEqual(res.status_code, 406)
+
+    def test_openapi_schema(self):
+        schema = client.get('/openapi.json').json()
+        content = schema['paths']['/similarity/omim/all']['get'][
+            'responses']['200']['content']
+        self.assertEqual(
+            sorted(content),
+            sorted([
+                'application/json',
+                binary.MSGPACK_MEDIA_TYPE,
+                binary.ARROW_MEDIA_TYPE
+            ])
+        )
+
+    @unittest.skipUnless(binary.HAS_MSGPACK, 'msgpack is not installed')
+    def test_msgpack(self):
+        import msgpack
+        for output_format in ('rows', 'columnar'):
+            params = {'format': output_format}
+            expected = client.post(
+                '/terms/similarity', json=self.body, params=params
+            )
+            res = client.post(
+                '/terms/similarity',
+                json=self.body,
+                params=params,
+                headers={'Accept': 'application/msgpack'}
+            )
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(
+                res.headers['content-type'],
+                binary.MSGPACK_MEDIA_TYPE
+            )
+            self.assertEqual(msgpack.unpackb(res.content), expected.json())
+
+    @unittest.skipUnless(binary.HAS_PYARROW, 'pyarrow is not installed')
+    def test_arrow(self):
+        import pyarrow
+        expected = client.get(
+            '/similarity/omim/all',
+            params={'set1': self.set1}
+        ).json()
+        res = client.get(
+            '/similarity/omim/all',
+            params={'set1': self.set1},
+            headers={'Accept': binary.ARROW_MEDIA_TYPE}
+        )
+        self.assertEqual(res.status_code, 200)
+        table = pyarrow.ipc.open_stream(res.content).read_all()
+        self.assertEqual(table.schema.field('similarity').type, 'double')
+        self.assertEqual(
+            table.to_pylist(),
+            expected['other_sets']
+        )
+        self.assertEqual(
+            json.loads(table.schema.metadata[b'set1']),
+            expected['set1']
+        )
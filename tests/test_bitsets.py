@@ -0,0 +1,14 @@
+import unittest
+
+from pyhpoapi.bitsets import bit_positions
+
+
+class TestBitPositions(unittest.TestCase):
+    def test_sparse(self):
+        self.assertEqual(bit_positions(0), [])
+        self.assertEqual(bit_positions(1), [0])
+        self.assertEqual(bit_positions((1 << 500) | (1 << 3)), [3, 500])
+
+    def test_dense(self):
+        bits = (1 << 200) - 1
+        self.assertEqual(bit_positions(bits), list(range(200)))
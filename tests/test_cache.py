@@ -0,0 +1,143 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from pyhpo import Ontology
+
+from pyhpoapi.server import initialize_ontology
+from pyhpoapi import helpers
+from pyhpoapi.cache import LRUCache, NullCache, make_cache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 1)
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 1)
+
+    def test_ttl(self):
+        cache = LRUCache(2, ttl=0.01)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_max_bytes(self):
+        cache = LRUCache(100, max_bytes=500)
+        for i in range(20):
+            cache.set(('key', i), float(i))
+        self.assertLessEqual(cache.nbytes, 500)
+        self.assertLess(len(cache), 20)
+        self.assertEqual(cache.get(('key', 19)), 19.0)
+        self.assertIsNone(cache.get(('key', 0)))
+
+    def test_replace_value(self):
+        cache = LRUCache(2, max_bytes=1000)
+        cache.set('a', 1)
+        nbytes = cache.nbytes
+        cache.set('a', 2)
+        self.assertEqual(cache.get('a'), 2)
+        self.assertEqual(cache.nbytes, nbytes)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'Requires fork')
+    def test_reset_after_fork(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache._lock.acquire()
+        try:
+            pid = os.fork()
+            if pid == 0:
+                # The lock must not be held in the forked process
+                ok = not cache._lock.locked() and cache.get('a') is None
+                os._exit(0 if ok else 1)
+            _, status = os.waitpid(pid, 0)
+        finally:
+            cache._lock.release()
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_make_cache(self):
+        self.assertIsInstance(make_cache('lru', 10), LRUCache)
+        self.assertIsInstance(make_cache('none', 10), NullCache)
+        with self.assertRaises(ValueError):
+            make_cache('foobar', 10)
+
+
+class TestSimilarityCache(unittest.TestCase):
+    def setUp(self):
+        folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=folder)
+
+    def test_cached_similarity(self):
+        cache = LRUCache(10)
+        set1 = helpers.get_hpo_set('HP:0000011,HP:0000021')
+        set2 = helpers.get_hpo_set('HP:0000012,HP:0000031')
+        expected = set1.similarity(set2, kind='omim', method='graphic')
+        with patch('pyhpoapi.helpers.similarity_cache', cache):
+            for _ in range(2):
+                res = helpers.set_similarity(
+                    set1, set2, 'omim', 'graphic', 'funSimAvg'
+                )
+                self.assertEqual(res, expected)
+            helpers.set_similarity(
+                helpers.get_hpo_set('21,11'),
+                set2, 'omim', 'graphic', 'funSimAvg'
+            )
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 2)
+
+    def test_errors_are_not_cached(self):
+        cache = LRUCache(10)
+        set1 = helpers.get_hpo_set('HP:0000011,HP:0000021')
+        with patch('pyhpoapi.helpers.similarity_cache', cache):
+            with self.assertRaises(RuntimeError):
+                helpers.set_similarity(set1, set1, 'omim', 'foobar', 'BMA')
+        self.assertEqual(len(cache), 0)
+
+    def test_cleared_on_reload(self):
+        folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        set1 = helpers.get_hpo_set('HP:0000011,HP:0000021')
+        set2 = helpers.get_hpo_set('HP:0000012,HP:0000031')
+        helpers.set_similarity(set1, set2, 'omim', 'graphic', 'funSimAvg')
+        self.assertGreater(len(helpers.similarity_cache), 0)
+        with patch.multiple(
+            'pyhpoapi.config',
+            MASTER_DATA=folder,
+            SNAPSHOT=''
+        ):
+            initialize_ontology()
+        self.assertEqual(len(helpers.similarity_cache), 0)
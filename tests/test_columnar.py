@@ -0,0 +1,119 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main
+from pyhpoapi import responses
+
+
+client = TestClient(main())
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+        self.set1 = 'HP:0000021,HP:0000013,HP:0000031'
+
+    def requests(self):
+        yield '/terms/similarity', {
+            'set1': self.set1,
+            'other_sets': [
+                {'name': 'a', 'set2': 'HP:0000041'},
+                {'name': 'b', 'set2': 'HP:9999999'},
+                {'name': 'c', 'set2': 'HP:0000021'},
+            ]
+        }
+        yield '/similarity/omim', {
+            'set1': self.set1,
+            'omim_diseases': [600001, 9999999, 600002]
+        }
+        yield '/similarity/gene', {
+            'set1': self.set1,
+            'genes': ['Gene1', 'Foobar', 'Gene2']
+        }
+
+    def test_same_as_rows(self):
+        for path, body in self.requests():
+            with self.subTest(path=path):
+                rows = client.post(path, json=body).json()
+                res = client.post(
+                    path,
+                    json=body,
+                    params={'format': 'columnar'}
+                )
+                self.assertEqual(res.status_code, 200)
+                columns = res.json()
+                self.assertEqual(columns['set1'], rows['set1'])
+                self.assertEqual(
+                    columns['names'],
+                    [x['name'] for x in rows['other_sets']]
+                )
+                self.assertEqual(
+                    columns['scores'],
+                    [x['similarity'] for x in rows['other_sets']]
+                )
+                # Only failed items are listed, by their index
+                self.assertEqual(
+                    columns['errors'],
+                    {'1': rows['other_sets'][1]['error']}
+                )
+                self.assertIsNone(columns['scores'][1])
+
+    def test_all_similarity(self):
+        for path in ('/similarity/omim/all', '/similarity/gene/all'):
+            with self.subTest(path=path):
+                params = {'set1': self.set1, 'sort': 'desc', 'limit': 2}
+                rows = client.get(path, params=params).json()
+                params['format'] = 'columnar'
+                columns = client.get(path, params=params).json()
+                self.assertEqual(
+                    columns['names'],
+                    [x['name'] for x in rows['other_sets']]
+                )
+                self.assertEqual(
+                    columns['scores'],
+                    [x['similarity'] for x in rows['other_sets']]
+                )
+                self.assertEqual(columns['errors'], {})
+
+    def test_exclude_set1(self):
+        path, body = next(self.requests())
+        res = client.post(path, json=body, params={
+            'format': 'columnar',
+            'include_set1': 'false'
+        })
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('set1', res.json())
+
+        # ``set1`` is required in the ``rows`` format
+        res = client.post(path, json=body, params={'include_set1': 'false'})
+        self.assertIn('set1', res.json())
+
+    def test_fast_json(self):
+        for path, body in self.requests():
+            with self.subTest(path=path):
+                params = {'format': 'columnar'}
+                with patch.object(responses, 'ENABLED', False):
+                    expected = client.post(path, json=body, params=params)
+                with patch.object(responses, 'ENABLED', True):
+                    res = client.post(path, json=body, params=params)
+                self.assertEqual(res.json(), expected.json())
+
+    def test_invalid_format(self):
+        for path, body in self.requests():
+            res = client.post(path, json=body, params={'format': 'foobar'})
+            self.assertEqual(res.status_code, 400)
+        res = client.get(
+            '/similarity/omim/all',
+            params={'set1': self.set1, 'format': 'foobar'}
+        )
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,125 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main, initialize_ontology
+from pyhpoapi import compression
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+        compression.response_cache.clear()
+        with patch('pyhpoapi.config.COMPRESSION_MIN_SIZE', 200), \
+                patch.object(compression, 'ENABLED', True):
+            self.client = TestClient(main())
+
+    def test_select_encoding(self):
+        with patch.object(compression, 'HAS_BROTLI', False):
+            for accept, expected in (
+                (None, 'identity'),
+                ('identity', 'identity'),
+                ('gzip, deflate', 'gzip'),
+                ('br', 'identity'),
+                ('br, gzip;q=0.5', 'gzip'),
+                ('gzip;q=0', 'identity'),
+                ('*', 'gzip'),
+            ):
+                self.assertEqual(
+                    compression.select_encoding(accept),
+                    expected
+                )
+        with patch.object(compression, 'HAS_BROTLI', True):
+            self.assertEqual(compression.select_encoding('gzip, br'), 'br')
+
+    def test_gzip(self):
+        path = '/terms/search/child'
+        plain = self.client.get(path, headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('content-encoding', plain.headers)
+
+        res = self.client.get(path, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(res.headers['content-encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res.headers['vary'])
+        self.assertLess(
+            int(res.headers['content-length']),
+            int(plain.headers['content-length'])
+        )
+        self.assertEqual(res.json(), plain.json())
+
+    def test_minimum_size(self):
+        res = self.client.get(
+            '/term/HP:0000011',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('content-encoding', res.headers)
+
+    def test_streaming(self):
+        res = self.client.post(
+            '/terms/similarity/stream',
+            headers={'Accept-Encoding': 'gzip'},
+            json={
+                'set1': 'HP:0000021,HP:0000013',
+                'other_sets': [
+                    {'name': str(idx), 'set2': 'HP:0000041'}
+                    for idx in range(10)
+                ]
+            }
+        )
+        self.assertEqual(res.headers['content-encoding'], 'gzip')
+        self.assertNotIn('content-length', res.headers)
+        rows = [json.loads(line) for line in res.text.splitlines()]
+        self.assertEqual(
+            [x['name'] for x in rows],
+            [str(x) for x in range(10)]
+        )
+
+    def test_cached_response(self):
+        path = '/term/HP:0000011/neighbours'
+        for encoding in ('gzip', 'identity'):
+            expected = self.client.get(
+                path,
+                headers={'Accept-Encoding': encoding}
+            )
+            with patch(
+                'pyhpoapi.routers.term.get_hpo_term',
+                side_effect=AssertionError('not cached')
+            ):
+                res = self.client.get(
+                    path,
+                    headers={'Accept-Encoding': encoding}
+                )
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.content, expected.content)
+            self.assertEqual(
+                res.headers.get('content-encoding'),
+                expected.headers.get('content-encoding')
+            )
+        self.assertEqual(compression.response_cache.hits, 2)
+        self.assertEqual(len(compression.response_cache), 2)
+
+    def test_not_cached(self):
+        self.client.get('/terms/search/child')
+        self.client.get('/term/HP:9999999')
+        self.assertEqual(len(compression.response_cache), 0)
+
+    def test_cleared_on_reload(self):
+        self.client.get('/term/HP:0000011')
+        self.assertEqual(len(compression.response_cache), 1)
+        with patch.multiple(
+            'pyhpoapi.config',
+            MASTER_DATA=self.folder,
+            SNAPSHOT=''
+        ):
+            initialize_ontology()
+        self.assertEqual(len(compression.response_cache), 0)
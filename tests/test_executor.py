@@ -0,0 +1,146 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from pyhpo import Ontology
+
+from pyhpoapi import helpers, server
+from pyhpoapi.routers import terms
+from pyhpoapi.executor import ComputeExecutor, ShardedExecutor, split_shards
+
+
+class TestComputeExecutor(unittest.TestCase):
+    def setUp(self):
+        folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=folder)
+
+    def test_invalid_kind(self):
+        with self.assertRaises(ValueError):
+            ComputeExecutor('foobar', {'similarity': 1})
+
+    def test_inline(self):
+        executor = ComputeExecutor('inline', {'similarity': 1})
+        self.assertIsNone(executor.pool('similarity'))
+        res = asyncio.run(
+            executor.run('similarity', helpers.get_hpo_set, '12,13')
+        )
+        self.assertEqual(len(res), 2)
+
+    def test_thread(self):
+        executor = ComputeExecutor('thread', {'similarity': 1, 'batch': 2})
+        res = asyncio.run(
+            executor.run('similarity', helpers.get_hpo_set, '12,13')
+        )
+        self.assertEqual(len(res), 2)
+        self.assertIsNot(executor.pool('similarity'), executor.pool('batch'))
+        executor.shutdown()
+
+    def test_process(self):
+        executor = ComputeExecutor('process', {'similarity': 1})
+        res = asyncio.run(
+            executor.run(
+                'similarity',
+                terms._terms_similarity,
+                'HP:0000031,HP:0000041',
+                'HP:0000031,HP:0000041',
+                'graphic',
+                'funSimAvg',
+                'omim'
+            )
+        )
+        self.assertEqual(res['similarity'], 1)
+        executor.shutdown()
+
+    def test_pools_start_before_serving(self):
+        # Worker processes must not be forked while requests are served
+        with patch.object(server.compute, 'start') as compute_start, \
+                patch.object(server.ranking, 'start') as ranking_start:
+            with TestClient(server.main()):
+                compute_start.assert_called_once_with()
+                ranking_start.assert_called_once_with()
+
+    def test_exceptions_are_raised(self):
+        for kind in ('thread', 'process'):
+            with self.subTest(kind=kind):
+                executor = ComputeExecutor(kind, {'similarity': 1})
+                with self.assertRaises(HTTPException) as err:
+                    asyncio.run(executor.run(
+                        'similarity',
+                        helpers.get_hpo_set,
+                        '12,foobar'
+                    ))
+                self.assertEqual(err.exception.status_code, 400)
+                self.assertEqual(
+                    err.exception.headers,
+                    {'X-TermNotFound': 'foobar'}
+                )
+
+                # The pool is still usable
+                res = asyncio.run(executor.run(
+                    'similarity',
+                    terms._terms_similarity,
+                    'HP:0000031',
+                    'HP:0000031',
+                    'graphic',
+                    'funSimAvg',
+                    'omim'
+                ))
+                self.assertEqual(res['similarity'], 1)
+                executor.shutdown()
+
+    def test_broken_process_pool(self):
+        executor = ComputeExecutor('process', {'similarity': 1})
+        with self.assertRaises(HTTPException) as err:
+            asyncio.run(executor.run('similarity', os._exit, 1))
+        self.assertEqual(err.exception.status_code, 503)
+
+        # The broken pool was replaced
+        res = asyncio.run(executor.run(
+            'similarity',
+            terms._terms_similarity,
+            'HP:0000031',
+            'HP:0000031',
+            'graphic',
+            'funSimAvg',
+            'omim'
+        ))
+        self.assertEqual(res['similarity'], 1)
+        executor.shutdown()
+
+
+def _crash_shard(shard):
+    os._exit(1)
+
+
+class TestShards(unittest.TestCase):
+    def test_broken_pool(self):
+        sharded = ShardedExecutor(2)
+        with self.assertRaises(HTTPException) as err:
+            asyncio.run(sharded.map(_crash_shard, [1, 2, 3]))
+        self.assertEqual(err.exception.status_code, 503)
+
+        # The broken pool was replaced
+        res = asyncio.run(sharded.map(list, [3, 1, 2]))
+        self.assertEqual(res, [3, 1, 2])
+        sharded.shutdown()
+
+    def test_split_shards(self):
+        items = list(range(10))
+        shards = split_shards(items, 3)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual([x for shard in shards for x in shard], items)
+
+    def test_split_more_shards_than_items(self):
+        shards = split_shards([1, 2], 4)
+        self.assertEqual(shards, [[1], [2]])
+
+    def test_split_empty(self):
+        self.assertEqual(split_shards([], 4), [])
@@ -0,0 +1,76 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from pyhpo import Ontology
+
+from pyhpoapi import fragments, helpers, models, responses
+
+
+class TestFragments(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+        fragments.fragment_cache.clear()
+
+    def test_same_as_model(self):
+        term = Ontology.get_hpo_object('HP:0000021')
+        for verbose in (False, True):
+            for exclude_none in (False, True):
+                self.assertEqual(
+                    json.loads(fragments.item_fragment(
+                        term,
+                        models.HpoTerm,
+                        verbose,
+                        exclude_none
+                    )),
+                    models.HpoTerm(**term.toJSON(verbose)).model_dump(
+                        exclude_none=exclude_none
+                    )
+                )
+        self.assertEqual(
+            json.loads(fragments.item_fragment(term)),
+            term.toJSON()
+        )
+
+    def test_cached(self):
+        gene = list(Ontology.genes)[0]
+        res = fragments.item_fragment(gene, models.Gene)
+        self.assertIs(fragments.item_fragment(gene, models.Gene), res)
+        self.assertEqual(fragments.fragment_cache.hits, 1)
+        self.assertEqual(fragments.fragment_cache.misses, 1)
+
+        # Different shapes of the same gene are cached separately
+        self.assertNotEqual(fragments.item_fragment(gene), res)
+        self.assertEqual(fragments.fragment_cache.misses, 2)
+
+    def test_assembly(self):
+        hposet = helpers.get_hpo_set('HP:0000031,HP:0000021')
+        with patch.object(responses, 'ENABLED', False):
+            expected = fragments.object_json({
+                'set1': fragments.hposet_json(hposet),
+                'scores': [1.5, None]
+            })
+        with patch.object(responses, 'ENABLED', True):
+            res = fragments.object_json({
+                'set1': fragments.hposet_json(hposet),
+                'scores': [1.5, None]
+            })
+        self.assertIsInstance(res, bytes)
+        self.assertEqual(json.loads(res), expected)
+
+    def test_hposet_order(self):
+        hposet = helpers.get_hpo_set('HP:0000031,HP:0000021,HP:0000013')
+        with patch.object(responses, 'ENABLED', True), patch.object(
+            type(hposet),
+            'toJSON',
+            side_effect=AssertionError('HPOSet.toJSON')
+        ):
+            res = json.loads(fragments.hposet_json(hposet))
+        self.assertEqual([x['int'] for x in res], [13, 21, 31])
@@ -0,0 +1,129 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import unittest
+import urllib.request
+
+
+# Starts the launcher, but restarts workers that die right after startup
+LAUNCHER = (
+    'import sys\n'
+    'from pyhpoapi import launcher\n'
+    'launcher.MIN_WORKER_LIFETIME = 0\n'
+    'launcher.main(sys.argv[1:])\n'
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def children(pid: int) -> set:
+    with open(f'/proc/{pid}/task/{pid}/children') as fh:
+        return {int(x) for x in fh.read().split()}
+
+
+def wait_for(condition, timeout: float = 30):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        res = condition()
+        if res:
+            return res
+        time.sleep(0.1)
+    raise AssertionError('Timeout')
+
+
+def is_running(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as fh:
+            # Zombie processes already exited
+            return fh.read().split(')')[-1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@unittest.skipUnless(
+    sys.platform.startswith('linux'),
+    'The launcher test requires fork and /proc'
+)
+class LauncherTests(unittest.TestCase):
+    def setUp(self):
+        folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.port = free_port()
+        env = dict(
+            os.environ,
+            PYHPOAPI_DATA_DIR=folder,
+            PYHPOAPI_SNAPSHOT='',
+            PYTHONPATH=root
+        )
+        self.process = subprocess.Popen(
+            [
+                sys.executable, '-c', LAUNCHER,
+                '--port', str(self.port),
+                '--workers', '2',
+                '--log-level', 'warning'
+            ],
+            env=env,
+            cwd=root,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def tearDown(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def get(self, path: str):
+        url = f'http://127.0.0.1:{self.port}{path}'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return json.loads(response.read())
+
+    def is_serving(self) -> bool:
+        try:
+            return self.get('/health/ready')['ready']
+        except OSError:
+            return False
+
+    def test_workers(self):
+        workers = wait_for(lambda: len(children(self.process.pid)) == 2 and (
+            children(self.process.pid)
+        ))
+        wait_for(self.is_serving)
+        self.assertEqual(self.get('/term/HP:0000011')['id'], 'HP:0000011')
+
+        # A crashed worker is replaced
+        killed = sorted(workers)[0]
+        os.kill(killed, signal.SIGKILL)
+        restarted = wait_for(lambda: (
+            len(children(self.process.pid)) == 2 and
+            killed not in children(self.process.pid) and
+            children(self.process.pid)
+        ))
+        self.assertEqual(len(restarted & workers), 1)
+        for _ in range(4):
+            wait_for(self.is_serving)
+            self.assertEqual(
+                self.get('/term/HP:0000011')['id'],
+                'HP:0000011'
+            )
+
+        # All workers stop on SIGTERM
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(timeout=30), 0)
+        for pid in restarted:
+            wait_for(lambda: not is_running(pid), timeout=10)
+        with self.assertRaises(OSError):
+            self.get('/health/live')
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import unittest
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main
+from pyhpoapi import benchmark, loadtest
+
+
+client = TestClient(main())
+
+
+@unittest.skipUnless(loadtest.HAS_HTTPX, 'httpx is not installed')
+class TestLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+        # The enrichment models are not built in the tests
+        self.weights = {
+            name: weight
+            for name, weight in loadtest.WORKLOAD.items()
+            if 'enrichment' not in name
+        }
+        self.workload = loadtest.build_workload(
+            benchmark.build_cases(
+                benchmark.build_queries(5),
+                methods=['graphic']
+            ),
+            self.weights
+        )
+
+    def _run(self, **kwargs):
+        import httpx
+
+        async def run():
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=main()),
+                base_url='http://testserver'
+            ) as client:
+                return await loadtest.run(client, self.workload, **kwargs)
+        return asyncio.run(run())
+
+    def test_unknown_route(self):
+        with self.assertRaises(ValueError):
+            loadtest.build_workload({}, {'GET /foo': 1})
+
+    def test_schedule(self):
+        requests = loadtest.schedule(self.workload, seed=1)
+        names = [next(requests)[0] for _ in range(1000)]
+        self.assertEqual(set(names), set(self.weights))
+        self.assertGreater(
+            names.count('GET /term/{term_id}'),
+            names.count('POST /terms/similarity')
+        )
+        requests = loadtest.schedule(self.workload, seed=1)
+        self.assertEqual(names, [next(requests)[0] for _ in range(1000)])
+
+    def test_concurrency(self):
+        results = self._run(duration=0.5, concurrency=4)
+        total = results['total']
+        self.assertGreater(total['requests'], 0)
+        self.assertEqual(total['errors'], 0)
+        self.assertEqual(total['error_rate'], 0)
+        self.assertEqual(
+            total['requests'],
+            sum(
+                res['requests']
+                for name, res in results.items()
+                if name != 'total'
+            )
+        )
+
+    def test_rate(self):
+        results = self._run(duration=0.5, rate=40)
+        self.assertEqual(results['total']['requests'], 20)
+        self.assertEqual(results['total']['errors'], 0)
@@ -0,0 +1,64 @@
+import os
+import unittest
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main
+from pyhpoapi import metrics
+
+
+client = TestClient(main())
+
+
+@unittest.skipUnless(metrics.ENABLED, 'prometheus_client is not installed')
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+
+    def test_route_templates(self):
+        client.get('/term/HP:0000118')
+        client.get('/term/HP:0000001')
+        client.get('/not-existing')
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/plain', response.headers['content-type'])
+        self.assertIn(
+            'pyhpoapi_requests_total{method="GET",'
+            'route="/term/{term_id}",status="200"}',
+            response.text
+        )
+        self.assertIn('route="unmatched",status="404"', response.text)
+        self.assertNotIn('HP:0000118', response.text)
+
+    def test_batch_size(self):
+        response = client.post(
+            '/terms/similarity',
+            json={
+                'set1': 'HP:0000118',
+                'other_sets': [
+                    {'name': 'a', 'set2': 'HP:0000118'},
+                    {'name': 'b', 'set2': 'HP:0000001'}
+                ]
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        response = client.get('/metrics')
+        self.assertIn(
+            'pyhpoapi_batch_size_bucket{le="10.0",route="/terms/similarity"}',
+            response.text
+        )
+
+    def test_cache_stats(self):
+        response = client.get('/metrics')
+        for cache in ('term_set', 'similarity', 'enrichment'):
+            self.assertIn(
+                f'pyhpoapi_cache_hits{{cache="{cache}"}}',
+                response.text
+            )
@@ -0,0 +1,147 @@
+import cProfile
+import os
+import pstats
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main
+from pyhpoapi import profiling
+
+
+client = TestClient(main())
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+
+    def test_disabled(self):
+        def func():
+            pass
+        self.assertIs(profiling.bind(func), func)
+        response = client.get(
+            '/term/HP:0000118',
+            headers={'X-Profile': '1'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('x-profile', response.headers)
+
+    @patch('pyhpoapi.profiling.ENABLED', True)
+    def test_inline(self):
+        profiled_client = TestClient(main())
+        response = profiled_client.get('/term/HP:0000118')
+        self.assertEqual(response.json()['id'], 'HP:0000118')
+
+        response = profiled_client.get(
+            '/term/HP:0000118',
+            headers={'X-Profile': '1'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['x-profile'], 'inline')
+        self.assertEqual(response.headers['x-profile-status'], '200')
+        self.assertIn('function calls', response.text)
+
+    @patch('pyhpoapi.profiling.ENABLED', True)
+    def test_executor_threads(self):
+        with tempfile.TemporaryDirectory() as folder:
+            with patch('pyhpoapi.config.PROFILE_DIR', folder):
+                profiled_client = TestClient(main())
+            response = profiled_client.get(
+                '/terms/search/child',
+                headers={'X-Profile': '1'}
+            )
+            stats = pstats.Stats(
+                os.path.join(folder, response.headers['x-profile'])
+            )
+            functions = {func for _, _, func in stats.stats}  # type: ignore
+            self.assertIn('_search', functions)
+
+    def test_other_profiler_active(self):
+        profile = profiling.RequestProfile()
+        with patch.object(cProfile.Profile, 'enable', side_effect=ValueError):
+            self.assertEqual(profile.run(sum, [1, 2]), 3)
+        self.assertEqual(profile.skipped, 1)
+
+    @patch('pyhpoapi.profiling.ENABLED', True)
+    def test_partial(self):
+        run = profiling.RequestProfile.run
+
+        def skip(profile, func, *args, **kwargs):
+            # As on Python 3.12+, where the event loop profiler is active
+            with patch.object(
+                cProfile.Profile,
+                'enable',
+                side_effect=ValueError
+            ):
+                return run(profile, func, *args, **kwargs)
+
+        profiled_client = TestClient(main())
+        with patch.object(profiling.RequestProfile, 'run', skip):
+            response = profiled_client.get(
+                '/terms/search/child',
+                headers={'X-Profile': '1'}
+            )
+        self.assertEqual(response.headers['x-profile-partial'], '1')
+        self.assertIn('Partial profile', response.text)
+        response = profiled_client.get(
+            '/terms/search/child',
+            headers={'X-Profile': '1'}
+        )
+        self.assertNotIn('x-profile-partial', response.headers)
+        self.assertNotIn('Partial profile', response.text)
+
+        with tempfile.TemporaryDirectory() as folder:
+            with patch('pyhpoapi.config.PROFILE_DIR', folder):
+                profiled_client = TestClient(main())
+            with patch.object(profiling.RequestProfile, 'run', skip):
+                response = profiled_client.get(
+                    '/terms/search/child',
+                    headers={'X-Profile': '1'}
+                )
+            self.assertEqual(response.headers['x-profile-partial'], '1')
+            self.assertTrue(response.headers['x-profile'].endswith('.prof'))
+
+    @patch('pyhpoapi.profiling.ENABLED', True)
+    def test_one_profile_at_a_time(self):
+        profiled_client = TestClient(main())
+        with profiling._lock:
+            response = profiled_client.get(
+                '/term/HP:0000118',
+                headers={'X-Profile': '1'}
+            )
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.headers['x-profile'], 'busy')
+
+            # Requests without profiling are not affected
+            response = profiled_client.get('/term/HP:0000118')
+            self.assertEqual(response.json()['id'], 'HP:0000118')
+
+        response = profiled_client.get(
+            '/term/HP:0000118',
+            headers={'X-Profile': '1'}
+        )
+        self.assertEqual(response.headers['x-profile'], 'inline')
+
+    @patch('pyhpoapi.profiling.ENABLED', True)
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as folder:
+            with patch('pyhpoapi.config.PROFILE_DIR', folder):
+                profiled_client = TestClient(main())
+            response = profiled_client.get(
+                '/term/HP:0000118',
+                headers={'X-Profile': '1'}
+            )
+            self.assertEqual(response.json()['id'], 'HP:0000118')
+            filename = response.headers['x-profile']
+            self.assertTrue(filename.endswith('.prof'))
+            self.assertEqual(os.listdir(folder), [filename])
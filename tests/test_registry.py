@@ -0,0 +1,43 @@
+import os
+import unittest
+
+from pyhpo import Ontology
+
+from pyhpoapi.registry import AnnotationSets
+
+
+class TestAnnotationSets(unittest.TestCase):
+    def setUp(self):
+        folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=folder)
+
+    def test_omim_registry(self):
+        registry = AnnotationSets.omim()
+        self.assertEqual(len(registry), len(Ontology.omim_diseases))
+        for disease in Ontology.omim_diseases:
+            self.assertEqual(
+                set(int(x) for x in registry.hposet(disease)),
+                set(disease.hpo)
+            )
+
+    def test_gene_registry(self):
+        registry = AnnotationSets.genes()
+        self.assertEqual(len(registry), len(Ontology.genes))
+        for gene in Ontology.genes:
+            self.assertEqual(
+                set(int(x) for x in registry.hposet(gene)),
+                set(gene.hpo)
+            )
+
+    def test_missing_items_are_built(self):
+        registry = AnnotationSets([])
+        for gene in Ontology.genes:
+            self.assertEqual(
+                set(int(x) for x in registry.hposet(gene)),
+                set(gene.hpo)
+            )
@@ -0,0 +1,95 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main
+from pyhpoapi import compression, fragments, responses
+
+
+client = TestClient(main())
+
+
+class TestFastJSON(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+        fragments.fragment_cache.clear()
+        compression.response_cache.clear()
+
+    def requests(self):
+        set1 = 'HP:0000021,HP:0000013,HP:0000031'
+        for path in ('/term/HP:0000011', '/term/HP:0000011/parents',
+                     '/term/HP:0000011/children',
+                     '/term/HP:0000011/neighbours',
+                     '/term/HP:0000021/genes', '/term/HP:0000021/omim',
+                     '/terms/search/child'):
+            for verbose in ('false', 'true'):
+                yield client.get, path, {'params': {'verbose': verbose}}
+        for path in ('/terms/intersect/genes', '/terms/intersect/omim',
+                     '/terms/union/genes', '/terms/union/omim',
+                     '/terms/hierarchy',
+                     '/similarity/omim/all', '/similarity/gene/all'):
+            yield client.get, path, {'params': {'set1': set1}}
+        yield client.post, '/terms/similarity', {'json': {
+            'set1': set1,
+            'other_sets': [
+                {'name': 'a', 'set2': 'HP:0000041'},
+                {'name': 'b', 'set2': 'HP:9999999'},
+            ]
+        }}
+        yield client.post, '/similarity/omim', {'json': {
+            'set1': set1,
+            'omim_diseases': [600001, 600002]
+        }}
+        yield client.post, '/similarity/gene', {'json': {
+            'set1': set1,
+            'genes': ['Gene1', 'Gene2']
+        }}
+
+    def test_same_response(self):
+        for method, path, kwargs in self.requests():
+            with self.subTest(path=path):
+                compression.response_cache.clear()
+                with patch.object(responses, 'ENABLED', False):
+                    expected = method(path, **kwargs)
+                compression.response_cache.clear()
+                with patch.object(responses, 'ENABLED', True):
+                    res = method(path, **kwargs)
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(
+                    res.headers['content-type'],
+                    'application/json'
+                )
+                self.assertEqual(res.json(), expected.json())
+
+    def test_skips_validation(self):
+        with patch(
+            'fastapi.routing.serialize_response',
+            side_effect=AssertionError('validated')
+        ):
+            with patch.object(responses, 'ENABLED', True):
+                for method, path, kwargs in self.requests():
+                    self.assertEqual(method(path, **kwargs).status_code, 200)
+            with patch.object(responses, 'ENABLED', False):
+                with self.assertRaises(AssertionError):
+                    client.get('/terms/union/genes?set1=HP:0000021')
+
+    def test_openapi_schema(self):
+        schema = client.get('/openapi.json').json()
+        response = schema['paths']['/terms/similarity']['post'][
+            'responses']['200']['content']['application/json']['schema']
+        self.assertEqual(
+            [x['$ref'] for x in response['anyOf']],
+            [
+                '#/components/schemas/SimilarityScore_Batch',
+                '#/components/schemas/SimilarityScore_Columnar'
+            ]
+        )
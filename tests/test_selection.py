@@ -0,0 +1,68 @@
+import unittest
+
+from pyhpoapi.selection import TopK
+
+
+class TestTopK(unittest.TestCase):
+    def setUp(self):
+        self.results = [
+            {'name': 'a', 'similarity': 0.2},
+            {'name': 'b', 'similarity': 0.8},
+            {'name': 'c', 'similarity': None},
+            {'name': 'd', 'similarity': 0.5},
+            {'name': 'e', 'similarity': 0.8},
+        ]
+
+    def names(self, results):
+        return [x['name'] for x in results]
+
+    def test_passthrough(self):
+        res = TopK().select(iter(self.results))
+        self.assertEqual(res, self.results)
+
+    def test_limit_unsorted(self):
+        # The best results, not the first ones
+        res = TopK(limit=2).select(iter(self.results))
+        self.assertEqual(self.names(res), ['b', 'e'])
+        res = TopK(limit=1).select(iter(self.results))
+        self.assertEqual(self.names(res), ['b'])
+
+    def test_desc(self):
+        res = TopK(sort='desc').select(iter(self.results))
+        self.assertEqual(self.names(res), ['b', 'e', 'd', 'a', 'c'])
+
+    def test_desc_limit(self):
+        res = TopK(limit=2, sort='desc').select(iter(self.results))
+        self.assertEqual(self.names(res), ['b', 'e'])
+
+        res = TopK(limit=3, sort='desc').select(iter(self.results))
+        self.assertEqual(self.names(res), ['b', 'e', 'd'])
+
+    def test_asc_limit(self):
+        res = TopK(limit=2, sort='asc').select(iter(self.results))
+        self.assertEqual(self.names(res), ['a', 'd'])
+
+    def test_min_similarity(self):
+        res = TopK(min_similarity=0.5).select(iter(self.results))
+        self.assertEqual(self.names(res), ['b', 'd', 'e'])
+
+        res = TopK(min_similarity=0.5, sort='asc').select(self.results)
+        self.assertEqual(self.names(res), ['d', 'b', 'e'])
+
+    def test_zero_limit(self):
+        self.assertEqual(TopK(limit=0).select(self.results), [])
+        self.assertEqual(TopK(limit=0, sort='desc').select(self.results), [])
+
+    def test_tuple_key(self):
+        results = [(x['name'], x['similarity']) for x in self.results]
+        res = TopK(limit=2, sort='desc', key=1).select(results)
+        self.assertEqual(res, [('b', 0.8), ('e', 0.8)])
+
+        res = TopK(min_similarity=0.5, key=1).select(results)
+        self.assertEqual([x[0] for x in res], ['b', 'd', 'e'])
+
+    def test_invalid_parameter(self):
+        with self.assertRaises(ValueError):
+            TopK(sort='foobar')
+        with self.assertRaises(ValueError):
+            TopK(limit=-1)
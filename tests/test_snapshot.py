@@ -0,0 +1,160 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pyhpo
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main, initialize_ontology
+from pyhpoapi import snapshot
+from pyhpoapi.routers import terms, annotations
+
+
+client = TestClient(main())
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'pyhpoapi.snapshot')
+        _ = Ontology(data_folder=self.folder)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_data_version(self):
+        version = snapshot.data_version(self.folder)
+        self.assertEqual(version['format'], snapshot.SNAPSHOT_FORMAT)
+        self.assertIn('hp.obo', version['files'])
+        self.assertNotEqual(version, snapshot.data_version())
+
+    def test_missing_snapshot(self):
+        self.assertIsNone(snapshot.read_snapshot(self.path, self.folder))
+
+    def test_outdated_snapshot(self):
+        snapshot.write_snapshot(self.path, {}, self.folder)
+        self.assertIsNone(snapshot.read_snapshot(self.path))
+
+    def test_other_pyhpo_version(self):
+        snapshot.write_snapshot(self.path, {}, self.folder)
+        with patch('pyhpo.__version__', '0.0.1'), self.assertLogs(
+            'uvicorn.error',
+            level='WARNING'
+        ) as logs, patch.object(
+            snapshot._Unpickler,
+            'persistent_load',
+            side_effect=AssertionError('HPOTerm unpickled')
+        ):
+            self.assertIsNone(snapshot.read_snapshot(self.path, self.folder))
+        self.assertIn('0.0.1 is installed', logs.output[0])
+
+        with open(self.path, 'rb') as fh:
+            header = pickle.load(fh)
+        self.assertEqual(header['pyhpo'], pyhpo.__version__)
+
+    def test_roundtrip(self):
+        expected = {
+            int(term): (
+                term.name,
+                sorted(int(x) for x in term.parents),
+                sorted(int(x) for x in term.children),
+                sorted(x.id for x in term.genes),
+                sorted(x.id for x in term.omim_diseases),
+                term.information_content.gene
+            )
+            for term in Ontology
+        }
+        snapshot.write_snapshot(
+            self.path,
+            {'index': terms.SearchIndex(Ontology)},
+            self.folder
+        )
+        _ = Ontology(data_folder=self.folder)
+
+        models = snapshot.read_snapshot(self.path, self.folder)
+        assert models is not None
+        res = {
+            int(term): (
+                term.name,
+                sorted(int(x) for x in term.parents),
+                sorted(int(x) for x in term.children),
+                sorted(x.id for x in term.genes),
+                sorted(x.id for x in term.omim_diseases),
+                term.information_content.gene
+            )
+            for term in Ontology
+        }
+        self.assertEqual(res, expected)
+        self.assertEqual(
+            [int(x) for x in models['index'].search('level')],
+            [int(x) for x in Ontology.search('level')]
+        )
+        self.assertIs(models['index'].search('level 1-2')[0], Ontology[12])
+        self.assertIs(
+            Ontology.get_hpo_object('HP:0000012'),
+            Ontology[12]
+        )
+
+    def test_initialize_from_snapshot(self):
+        with patch.multiple(
+            'pyhpoapi.routers.terms',
+            search_index=None,
+            gene_index=None,
+            omim_index=None,
+            gene_model=None,
+            omim_model=None,
+            hpo_model_genes=None,
+            hpo_model_omim=None
+        ), patch.multiple(
+            'pyhpoapi.routers.annotations',
+            omim_sets=None,
+            gene_sets=None
+        ), patch.multiple(
+            'pyhpoapi.config',
+            MASTER_DATA=self.folder,
+            SNAPSHOT=self.path
+        ):
+            # Falls back to parsing the master data
+            initialize_ontology()
+            expected = client.get(
+                '/terms/enrichment/genes?set1=HP:0000021,HP:0000013'
+            ).json()
+
+            snapshot.write_snapshot(
+                self.path,
+                {
+                    'search_index': terms.search_index,
+                    'gene_index': terms.gene_index,
+                    'omim_index': terms.omim_index,
+                    'gene_model': terms.gene_model,
+                    'omim_model': terms.omim_model,
+                    'hpo_model_genes': terms.hpo_model_genes,
+                    'hpo_model_omim': terms.hpo_model_omim,
+                    'omim_sets': annotations.omim_sets,
+                    'gene_sets': annotations.gene_sets,
+                },
+                self.folder
+            )
+            with patch(
+                'pyhpoapi.server.load_ontology',
+                side_effect=AssertionError('Ontology was parsed')
+            ):
+                initialize_ontology()
+
+            self.assertIs(
+                terms.search_index.search('level 1-2')[0],
+                Ontology[12]
+            )
+            res = client.get(
+                '/terms/enrichment/genes?set1=HP:0000021,HP:0000013'
+            ).json()
+            self.assertEqual(res, expected)
@@ -0,0 +1,192 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+from fastapi import HTTPException
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main, load_ontology, build_enrichment_models
+from pyhpoapi.stages import stages, Stages
+from pyhpoapi.executor import ComputeExecutor
+from pyhpoapi import metrics
+
+
+client = TestClient(main())
+
+
+class TestStagedStartup(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+
+    def test_stages(self):
+        stages = Stages()
+        self.assertEqual(
+            stages.status(),
+            {'ontology': None, 'indicies': None, 'enrichment': None}
+        )
+        stages.done('ontology')
+        self.assertTrue(stages.is_done('ontology'))
+        self.assertFalse(stages.is_done('enrichment'))
+        self.assertIsInstance(stages.status()['ontology'], float)
+        stages.wait('ontology', timeout=0)
+        with self.assertRaises(HTTPException) as ex:
+            stages.wait('enrichment', timeout=0)
+        self.assertEqual(ex.exception.status_code, 503)
+
+        stages.reset()
+        self.assertFalse(stages.is_done('ontology'))
+
+    def test_health(self):
+        with patch('pyhpoapi.routers.health.stages', Stages()) as stages:
+            self.assertEqual(client.get('/health/live').status_code, 200)
+            response = client.get('/health/ready')
+            self.assertEqual(response.status_code, 503)
+            self.assertFalse(response.json()['ready'])
+
+            stages.done('ontology')
+            response = client.get('/health/ready')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()['ready'])
+            self.assertIsNone(response.json()['stages']['enrichment'])
+
+            stages.fail('Missing data')
+            self.assertEqual(client.get('/health/live').status_code, 503)
+            self.assertEqual(client.get('/health/ready').status_code, 503)
+
+    def test_staged_startup(self):
+        loading = threading.Event()
+
+        def slow_load():
+            loading.wait(5)
+            load_ontology()
+
+        with patch.multiple(
+            'pyhpoapi.routers.terms',
+            search_index=None,
+            gene_index=None,
+            omim_index=None,
+            gene_model=None,
+            omim_model=None,
+            hpo_model_genes=None,
+            hpo_model_omim=None
+        ), patch.multiple(
+            'pyhpoapi.routers.annotations',
+            omim_sets=None,
+            gene_sets=None
+        ), patch(
+            'pyhpoapi.config.MASTER_DATA',
+            self.folder
+        ), patch(
+            'pyhpoapi.server.load_ontology',
+            side_effect=slow_load
+        ):
+            with TestClient(main(staged=True)) as staged_client:
+                response = staged_client.get('/term/HP:0000011')
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(
+                    staged_client.get('/health/live').status_code,
+                    200
+                )
+                self.assertEqual(
+                    staged_client.get('/health/ready').status_code,
+                    503
+                )
+                # Start-up can be monitored
+                self.assertEqual(
+                    staged_client.get('/metrics').status_code,
+                    200 if metrics.ENABLED else 404
+                )
+
+                loading.set()
+                stages.wait('ontology', timeout=5)
+                response = staged_client.get('/term/HP:0000011')
+                self.assertEqual(response.status_code, 200)
+
+                # Waits until the enrichment models are built
+                response = staged_client.get(
+                    '/terms/enrichment/genes?set1=HP:0000021,HP:0000013'
+                )
+                self.assertEqual(response.status_code, 200)
+                res = staged_client.get('/health/ready').json()
+                self.assertTrue(res['ready'])
+                self.assertNotIn(None, res['stages'].values())
+
+    def test_staged_startup_with_processes(self):
+        building = threading.Event()
+
+        def slow_build(vector):
+            building.wait(5)
+            return build_enrichment_models(vector)
+
+        process = ComputeExecutor(
+            'process',
+            {'similarity': 1, 'batch': 1, 'lookup': 1, 'enrichment': 1}
+        )
+        with patch.multiple(
+            'pyhpoapi.routers.terms',
+            search_index=None,
+            gene_index=None,
+            omim_index=None,
+            gene_model=None,
+            omim_model=None,
+            hpo_model_genes=None,
+            hpo_model_omim=None
+        ), patch.multiple(
+            'pyhpoapi.routers.annotations',
+            omim_sets=None,
+            gene_sets=None
+        ), patch(
+            'pyhpoapi.config.MASTER_DATA',
+            self.folder
+        ), patch(
+            'pyhpoapi.server.build_enrichment_models',
+            side_effect=slow_build
+        ), patch(
+            'pyhpoapi.executor.compute',
+            process
+        ), patch(
+            'pyhpoapi.server.compute',
+            process
+        ), patch.object(
+            stages,
+            'serving_stage',
+            'ontology'
+        ):
+            with TestClient(main(staged=True)) as staged_client:
+                stages.wait('indicies', timeout=5)
+                # Workers would not inherit the enrichment models yet
+                response = staged_client.get('/term/HP:0000011')
+                self.assertEqual(response.status_code, 503)
+                self.assertIn('enrichment', response.json()['detail'])
+                self.assertEqual(
+                    staged_client.get('/health/ready').status_code,
+                    503
+                )
+                self.assertEqual(process._pools, {})
+
+                building.set()
+                stages.wait('enrichment', timeout=5)
+                self.assertEqual(
+                    sorted(process._pools),
+                    ['batch', 'enrichment', 'lookup', 'similarity']
+                )
+                response = staged_client.get(
+                    '/similarity/gene'
+                    '?set1=HP:0000021,HP:0000013,HP:0000031&gene=Gene1'
+                )
+                self.assertEqual(response.status_code, 200)
+                response = staged_client.get(
+                    '/terms/enrichment/genes?set1=HP:0000021,HP:0000013'
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(
+                    staged_client.get('/health/ready').json()['ready']
+                )
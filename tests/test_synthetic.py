@@ -0,0 +1,73 @@
+import os
+import random
+import tempfile
+import unittest
+
+from pyhpo import Ontology
+
+from pyhpoapi import synthetic
+
+
+class TestSynthetic(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        self.sizes = {
+            'terms': 200,
+            'genes': 20,
+            'omim': 30,
+            'orpha': 10,
+            'decipher': 2,
+        }
+
+    def tearDown(self):
+        _ = Ontology(data_folder=self.folder)
+
+    def _read(self, folder):
+        res = {}
+        for filename in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, filename)) as fh:
+                res[filename] = fh.read()
+        return res
+
+    def test_reproducible(self):
+        with tempfile.TemporaryDirectory() as folder1, \
+                tempfile.TemporaryDirectory() as folder2, \
+                tempfile.TemporaryDirectory() as folder3:
+            synthetic.generate(folder1, seed=1, **self.sizes)
+            synthetic.generate(folder2, seed=1, **self.sizes)
+            synthetic.generate(folder3, seed=2, **self.sizes)
+            self.assertEqual(
+                set(self._read(folder1)),
+                {'hp.obo', 'phenotype.hpoa', 'phenotype_to_genes.txt'}
+            )
+            self.assertEqual(self._read(folder1), self._read(folder2))
+            self.assertNotEqual(self._read(folder1), self._read(folder3))
+
+    def test_terms_are_a_dag(self):
+        terms = synthetic.generate_terms(random.Random(1), 500)
+        self.assertEqual(len(terms), 502)
+        seen = set()
+        for term in terms:
+            for parent in term.parents:
+                self.assertIn(parent, seen)
+            seen.add(term.id)
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            synthetic.generate(folder, **self.sizes)
+            ontology = Ontology(data_folder=folder)
+            self.assertEqual(len(ontology), 202)
+            self.assertEqual(len(ontology.genes), 20)
+            self.assertEqual(len(ontology.omim_diseases), 30)
+            self.assertEqual(len(ontology.orpha_diseases), 10)
+            self.assertEqual(len(ontology.decipher_diseases), 2)
+            term = ontology.get_hpo_object('HP:0001000')
+            self.assertEqual(
+                [parent.id for parent in term.parents],
+                ['HP:0000118']
+            )
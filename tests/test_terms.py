@@ -1,3 +1,5 @@
+import asyncio
+import json
 import os
 import unittest
 from unittest.mock import patch, MagicMock
@@ -5,11 +7,16 @@ from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 from pyhpoapi.server import main
 from pyhpoapi.routers import terms
+from pyhpoapi.search import SearchIndex
+from pyhpoapi.bitsets import AnnotationIndex
+from pyhpoapi.enrichment import (
+    enrichment_cache, VectorEnrichmentModel, VectorHPOEnrichment
+)
 
 import pyhpo
-from pyhpo import Ontology
+from pyhpo import Ontology, HPOSet
 from pyhpo.annotations import Gene, Omim
-from pyhpo.stats import EnrichmentModel
+from pyhpo.stats import EnrichmentModel, HPOEnrichment
 
 
 
@@ -65,6 +72,30 @@ class TermsAPITests(unittest.TestCase):
             2
         )
 
+    def test_search_index(self):
+        index = SearchIndex(Ontology)
+        queries = ['', 'child', 'CHILD', 'level 1-', 'another', 'name', 'x']
+        for term in Ontology:
+            name = term.name.lower()
+            for start in range(len(name)):
+                queries.append(name[start:start+4])
+        for query in queries:
+            self.assertEqual(
+                index.search(query),
+                list(Ontology.search(query)),
+                query
+            )
+
+    def test_search_with_index(self):
+        expected = client.get('/terms/search/child?offset=1&limit=3').json()
+        with patch(
+            'pyhpoapi.routers.terms.search_index',
+            SearchIndex(Ontology)
+        ):
+            response = client.get('/terms/search/child?offset=1&limit=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+
     def test_similarity(self):
         set1 = 'HP:0000011,HP:0000021'
         set2 = 'HP:0000012,HP:0000031'
@@ -190,6 +221,35 @@ class TermsAnnotationTests(unittest.TestCase):
             res
         )
 
+    def test_annotation_index(self):
+        queries = [
+            'HP:0000013,HP:0000021',
+            'HP:0000041,HP:0000031',
+            'HP:0000001',
+            'HP:0000011,HP:0000012,HP:0000013',
+        ]
+        indicies = {
+            'pyhpoapi.routers.terms.gene_index': AnnotationIndex.genes(),
+            'pyhpoapi.routers.terms.omim_index': AnnotationIndex.omim(),
+        }
+        for query in queries:
+            for url in [
+                '/terms/intersect/omim',
+                '/terms/intersect/genes',
+                '/terms/union/omim',
+                '/terms/union/genes',
+            ]:
+                expected = client.get(f'{url}?set1={query}').json()
+                with patch.multiple('pyhpoapi.routers.terms', **{
+                    k.split('.')[-1]: v for k, v in indicies.items()
+                }):
+                    res = client.get(f'{url}?set1={query}').json()
+                self.assertEqual(
+                    sorted(res, key=lambda x: x['id']),
+                    sorted(expected, key=lambda x: x['id']),
+                    f'{url}?set1={query}'
+                )
+
     def test_gene_enrichment(self):
         """
         Assuming the gene_model.enrichment method is propery tested
@@ -227,6 +287,95 @@ class TermsAnnotationTests(unittest.TestCase):
         )
         self.assertEqual(res[0]['count'], 2)
 
+    def test_enrichment_paging(self):
+        set1 = 'HP:0000021,HP:0000013,HP:0000041'
+        hposet = HPOSet.from_queries(set1.split(','))
+        expected = [
+            (x['item'].id, x['count'], x['enrichment'])
+            for x in terms.omim_model.enrichment('hypergeom', hposet)
+        ]
+
+        enrichment_cache.clear()
+        res = []
+        for offset in range(len(expected)):
+            response = client.get(
+                f'/terms/enrichment/omim?set1={set1}&limit=1&offset={offset}'
+            )
+            self.assertEqual(response.status_code, 200)
+            res += [
+                (x['omim']['id'], x['count'], x['enrichment'])
+                for x in response.json()
+            ]
+        self.assertEqual(res, expected)
+        self.assertEqual(enrichment_cache.misses, 1)
+        self.assertEqual(enrichment_cache.hits, len(expected) - 1)
+
+    def test_vector_enrichment(self):
+        for category in ['gene', 'omim']:
+            model = EnrichmentModel(category)
+            vector = VectorEnrichmentModel(category)
+            for query in [
+                'HP:0000021,HP:0000013,HP:0000041',
+                'HP:0000001',
+                'HP:0000031'
+            ]:
+                hposet = HPOSet.from_queries(query.split(','))
+                expected = {
+                    x['item'].id: (x['count'], x['enrichment'])
+                    for x in model.enrichment('hypergeom', hposet)
+                }
+                res = vector.enrichment('hypergeom', hposet)
+                self.assertEqual(len(res), len(expected))
+                self.assertEqual(
+                    [x['enrichment'] for x in res],
+                    sorted(x['enrichment'] for x in res)
+                )
+                for x in res:
+                    count, score = expected[x['item'].id]
+                    self.assertEqual(x['count'], count)
+                    self.assertAlmostEqual(x['enrichment'], score)
+
+            with self.assertRaises(NotImplementedError):
+                vector.enrichment('foobar', hposet)
+
+    def test_vector_hpo_enrichment(self):
+        for category, items in [
+            ('gene', list(Ontology.genes)[0:2]),
+            ('omim', list(Ontology.omim_diseases)[0:2]),
+        ]:
+            expected = {
+                int(x['hpo']): (x['count'], x['enrichment'])
+                for x in HPOEnrichment(category).enrichment('hypergeom', items)
+            }
+            res = VectorHPOEnrichment(category).enrichment('hypergeom', items)
+            self.assertEqual(len(res), len(expected))
+            for x in res:
+                count, score = expected[int(x['hpo'])]
+                self.assertEqual(x['count'], count)
+                self.assertAlmostEqual(x['enrichment'], score)
+
+    def test_vector_enrichment_endpoint(self):
+        set1 = 'HP:0000021,HP:0000013,HP:0000041'
+        expected = client.get(f'/terms/enrichment/omim?set1={set1}').json()
+        with patch(
+            'pyhpoapi.routers.terms.omim_model',
+            VectorEnrichmentModel('omim')
+        ):
+            res = client.get(f'/terms/enrichment/omim?set1={set1}').json()
+        self.assertEqual(
+            [(x['omim'], x['count']) for x in res],
+            [(x['omim'], x['count']) for x in expected]
+        )
+        for x, y in zip(res, expected):
+            self.assertAlmostEqual(x['enrichment'], y['enrichment'])
+
+    def test_enrichment_invalid_method(self):
+        response = client.get(
+            '/terms/enrichment/genes?set1=HP:0000021&method=foobar'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
 class SimilarityBatchTests(unittest.TestCase):
     def setUp(self):
         folder = os.path.join(
@@ -253,6 +402,78 @@ class SimilarityBatchTests(unittest.TestCase):
         )
 
 
+    def test_batch_similarity_stream(self):
+        data = {
+            'set1': 'HP:0000031,HP:0000041',
+            'other_sets': [
+                {'set2': 'HP:0000012,HP:0000031', 'name': 'Test1'},
+                {'set2': 'HP:0000031,HP:0000041,foobar', 'name': 'Test2'},
+                {'set2': 'HP:0000031,HP:0000041', 'name': 'Test3'}
+            ]
+        }
+        expected = client.post('/terms/similarity', json=data).json()
+        response = client.post('/terms/similarity/stream', json=data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers['content-type'],
+            'application/x-ndjson'
+        )
+        lines = [json.loads(x) for x in response.text.splitlines()]
+        self.assertEqual(lines, expected['other_sets'])
+
+    def test_batch_similarity_stream_invalid_method(self):
+        data = {
+            'set1': 'HP:0000031,HP:0000041',
+            'other_sets': [
+                {'set2': 'HP:0000012,HP:0000031', 'name': 'Test1'}
+            ]
+        }
+        response = client.post(
+            '/terms/similarity/stream?method=invalid',
+            json=data
+        )
+        self.assertEqual(response.status_code, 400)
+
+        data['set1'] = 'foobar'
+        response = client.post('/terms/similarity/stream', json=data)
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_similarity_stream_threadpool(self):
+        in_event_loop = []
+        iter_scores = terms._iter_hpo_scores
+
+        def record_thread(*args):
+            try:
+                asyncio.get_running_loop()
+                in_event_loop.append(True)
+            except RuntimeError:
+                in_event_loop.append(False)
+            yield from iter_scores(*args)
+
+        get_hpo_set = terms.get_hpo_set
+
+        def record_set_thread(*args):
+            try:
+                asyncio.get_running_loop()
+                in_event_loop.append(True)
+            except RuntimeError:
+                in_event_loop.append(False)
+            return get_hpo_set(*args)
+
+        data = {
+            'set1': 'HP:0000031,HP:0000041',
+            'other_sets': [
+                {'set2': 'HP:0000012,HP:0000031', 'name': 'Test1'}
+            ]
+        }
+        with patch.object(terms, '_iter_hpo_scores', record_thread), \
+                patch.object(terms, 'get_hpo_set', record_set_thread):
+            response = client.post('/terms/similarity/stream', json=data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.text.splitlines()), 1)
+        # Neither the HPOSets nor the first row are built in the event loop
+        self.assertEqual(in_event_loop, [False, False, False])
+
     def test_backwards_compatible_trailing_slash(self):
         """
         In version 1.0.0 there was an unitended trailing slash on the
@@ -0,0 +1,78 @@
+import os
+import time
+import unittest
+
+from pyhpo import Ontology
+
+from fastapi.testclient import TestClient
+from pyhpoapi.server import main
+from pyhpoapi import compression, timing
+
+
+client = TestClient(main())
+
+
+class TestServerTiming(unittest.TestCase):
+    def setUp(self):
+        self.folder = os.path.join(
+            os.path.dirname(
+                os.path.abspath(__file__)
+            ),
+            'data'
+        )
+        _ = Ontology(data_folder=self.folder)
+        # Cached responses skip the handler and all stages
+        compression.response_cache.clear()
+
+    def parse_header(self, response):
+        return {
+            metric.split(';')[0]: float(metric.split('=')[1])
+            for metric in response.headers['server-timing'].split(', ')
+        }
+
+    def test_nested_stages(self):
+        timings = timing.Timings()
+        token = timing._timings.set(timings)
+        try:
+            with timing.stage('compute'):
+                with timing.stage('parse'):
+                    time.sleep(0.02)
+                with timing.stage('json'):
+                    time.sleep(0.01)
+        finally:
+            timing._timings.reset(token)
+        self.assertGreaterEqual(timings.durations['parse'], 0.02)
+        self.assertGreaterEqual(timings.durations['json'], 0.01)
+        self.assertLess(timings.durations['compute'], 0.01)
+
+    def test_stage_without_request(self):
+        with timing.stage('parse'):
+            pass
+        self.assertIs(timing.bind(len), len)
+
+    def test_term(self):
+        response = client.get('/term/HP:0000118')
+        self.assertEqual(response.status_code, 200)
+        timings = self.parse_header(response)
+        for name in ('parse', 'compute', 'json', 'validate', 'total'):
+            self.assertIn(name, timings)
+        self.assertLessEqual(
+            sum(v for k, v in timings.items() if k != 'total'),
+            timings['total']
+        )
+
+    def test_executor(self):
+        response = client.get(
+            '/terms/similarity?set1=HP:0000118&set2=HP:0000001'
+        )
+        self.assertEqual(response.status_code, 200)
+        timings = self.parse_header(response)
+        for name in ('parse', 'queue', 'compute', 'json', 'total'):
+            self.assertIn(name, timings)
+
+    def test_errors(self):
+        response = client.get('/term/HP:9999999')
+        self.assertEqual(response.status_code, 404)
+        timings = self.parse_header(response)
+        self.assertIn('total', timings)
+        self.assertNotIn('validate', timings)